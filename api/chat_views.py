@@ -1,9 +1,12 @@
-from rest_framework.decorators import api_view, permission_classes
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 from chat.models import ChatConversation, ChatMessage
-from services.chat_service import ChatService
+from services.chat_service import ChatService, run_in_chat_pool
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,19 +30,7 @@ def send_chat_message(request):
             )
         
         # Get or create conversation
-        if conversation_id:
-            try:
-                conversation = ChatConversation.objects.get(id=conversation_id)
-            except ChatConversation.DoesNotExist:
-                conversation = None
-        else:
-            conversation = None
-        
-        if not conversation:
-            conversation = ChatConversation.objects.create(
-                conversation_type='movie' if movie_id else 'global',
-                movie_id=movie_id
-            )
+        conversation = get_or_create_conversation(conversation_id, movie_id)
         
         # Save user message
         ChatMessage.objects.create(
@@ -57,30 +48,14 @@ def send_chat_message(request):
             conversation=conversation,
             role='assistant',
             content=result['message'],
-            context_sections=[
-                {
-                    'section_id': source['section'].id,
-                    'similarity': source['similarity'],
-                    'movie_title': source['section'].movie.title,
-                    'section_type': source['section'].get_section_type_display()
-                }
-                for source in result['sources']
-            ]
+            context_sections=source_payload(result['sources'])
         )
         
         # Prepare response
         response_data = {
             'message': result['message'],
             'conversation_id': conversation.id,
-            'sources': [
-                {
-                    'section_id': source['section'].id,
-                    'similarity': source['similarity'],
-                    'movie_title': source['section'].movie.title,
-                    'section_type': source['section'].get_section_type_display()
-                }
-                for source in result['sources']
-            ]
+            'sources': source_payload(result['sources'])
         }
         
         return Response(response_data)
@@ -90,4 +65,246 @@ def send_chat_message(request):
         return Response(
             {'error': 'An error occurred while processing your message'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets clients send `Accept: text/event-stream`; the stream itself is a
+    StreamingHttpResponse, this only renders errors raised before it starts
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_chat_message(request):
+    """
+    Send a chat message and stream the AI response as Server-Sent Events:
+    `sources` first, then `token` events as the answer is generated, and
+    `done` (or `error`) once it has been saved
+    """
+    message = request.data.get('message')
+    movie_id = request.data.get('movie_id')
+    conversation_id = request.data.get('conversation_id')
+    
+    if not message:
+        return Response(
+            {'error': 'Message is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    conversation = get_or_create_conversation(conversation_id, movie_id)
+    
+    ChatMessage.objects.create(
+        conversation=conversation,
+        role='user',
+        content=message
+    )
+    
+    return event_stream_response(stream_chat_events(conversation, message, movie_id))
+
+
+def stream_chat_events(conversation, message, movie_id):
+    sources = []
+    try:
+        for event, data in ChatService().stream_chat(message, movie_id):
+            if event == 'sources':
+                sources = source_payload(data)
+                yield sse_event('sources', {'conversation_id': conversation.id, 'sources': sources})
+            
+            elif event == 'token':
+                yield sse_event('token', {'text': data})
+            
+            elif event == 'done':
+                # The assistant message is only saved once the whole answer is known
+                assistant_message = ChatMessage.objects.create(
+                    conversation=conversation,
+                    role='assistant',
+                    content=data['message'],
+                    context_sections=sources
+                )
+                yield sse_event('done', done_payload(conversation, assistant_message, sources, data))
+            
+            elif event == 'error':
+                # Same record send_chat_message keeps when the LLM call fails
+                ChatMessage.objects.create(conversation=conversation, role='assistant', content=data)
+                yield sse_event('error', {'error': data, 'conversation_id': conversation.id})
+    
+    except Exception as e:
+        logger.error(f"Chat stream error: {str(e)}")
+        yield sse_event('error', {'error': 'An error occurred while processing your message'})
+
+
+async def send_chat_message_async(request):
+    """
+    send_chat_message for ASGI deployments (CHAT_ASYNC_VIEWS): same request
+    and response, but no thread is held while the LLM answers. A plain
+    Django view, since DRF views cannot be async. ORM calls go through the
+    chat pool rather than Django 4.2's async ORM, which would give every
+    chat in flight a thread and a database connection of its own.
+    """
+    data, error = parse_async_chat_request(request)
+    if error is not None:
+        return error
+    
+    try:
+        message = data['message']
+        movie_id = data.get('movie_id')
+        
+        conversation = await run_in_chat_pool(get_or_create_conversation, data.get('conversation_id'), movie_id)
+        
+        await run_in_chat_pool(
+            ChatMessage.objects.create,
+            conversation=conversation,
+            role='user',
+            content=message
+        )
+        
+        # Building the service can hit the database (serving_version)
+        chat_service = await run_in_chat_pool(ChatService)
+        result = await chat_service.achat(message, movie_id)
+        sources = source_payload(result['sources'])
+        
+        await run_in_chat_pool(
+            ChatMessage.objects.create,
+            conversation=conversation,
+            role='assistant',
+            content=result['message'],
+            context_sections=sources
+        )
+        
+        return JsonResponse({
+            'message': result['message'],
+            'conversation_id': conversation.id,
+            'sources': sources
+        })
+        
+    except Exception as e:
+        logger.error(f"Chat error: {str(e)}")
+        return JsonResponse({'error': 'An error occurred while processing your message'}, status=500)
+
+
+async def stream_chat_message_async(request):
+    """stream_chat_message for ASGI deployments (CHAT_ASYNC_VIEWS)"""
+    data, error = parse_async_chat_request(request)
+    if error is not None:
+        return error
+    
+    message = data['message']
+    movie_id = data.get('movie_id')
+    
+    conversation = await run_in_chat_pool(get_or_create_conversation, data.get('conversation_id'), movie_id)
+    
+    await run_in_chat_pool(
+        ChatMessage.objects.create,
+        conversation=conversation,
+        role='user',
+        content=message
+    )
+    
+    return event_stream_response(astream_chat_events(conversation, message, movie_id))
+
+
+# Like @api_view does for the sync views; Django 4.2's csrf_exempt would turn them into sync views
+send_chat_message_async.csrf_exempt = True
+stream_chat_message_async.csrf_exempt = True
+
+
+async def astream_chat_events(conversation, message, movie_id):
+    sources = []
+    try:
+        chat_service = await run_in_chat_pool(ChatService)
+        async for event, data in chat_service.astream_chat(message, movie_id):
+            if event == 'sources':
+                sources = source_payload(data)
+                yield sse_event('sources', {'conversation_id': conversation.id, 'sources': sources})
+            
+            elif event == 'token':
+                yield sse_event('token', {'text': data})
+            
+            elif event == 'done':
+                assistant_message = await run_in_chat_pool(
+                    ChatMessage.objects.create,
+                    conversation=conversation,
+                    role='assistant',
+                    content=data['message'],
+                    context_sections=sources
+                )
+                yield sse_event('done', done_payload(conversation, assistant_message, sources, data))
+            
+            elif event == 'error':
+                await run_in_chat_pool(ChatMessage.objects.create, conversation=conversation, role='assistant', content=data)
+                yield sse_event('error', {'error': data, 'conversation_id': conversation.id})
+    
+    except Exception as e:
+        logger.error(f"Chat stream error: {str(e)}")
+        yield sse_event('error', {'error': 'An error occurred while processing your message'})
+
+
+def parse_async_chat_request(request):
+    """(data, None), or (None, error response) for what DRF would have rejected"""
+    if request.method != 'POST':
+        return None, HttpResponseNotAllowed(['POST'])
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return None, JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    if not isinstance(data, dict) or not data.get('message'):
+        return None, JsonResponse({'error': 'Message is required'}, status=400)
+    
+    return data, None
+
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def done_payload(conversation, assistant_message, sources, data):
+    return {
+        'message': data['message'],
+        'message_id': assistant_message.id,
+        'conversation_id': conversation.id,
+        'sources': sources,
+        'ttft': data['ttft']
+    }
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def get_or_create_conversation(conversation_id, movie_id):
+    if conversation_id:
+        conversation = ChatConversation.objects.filter(id=conversation_id).first()
+        if conversation:
+            return conversation
+    
+    return ChatConversation.objects.create(
+        conversation_type='movie' if movie_id else 'global',
+        movie_id=movie_id
+    )
+
+
+def source_payload(sources):
+    return [
+        {
+            'section_id': source['section'].id,
+            'similarity': source['similarity'],
+            'movie_title': source['section'].movie.title,
+            'section_type': source['section'].get_section_type_display()
+        }
+        for source in sources
+    ]
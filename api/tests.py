@@ -1,3 +1,1402 @@
-from django.test import TestCase
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.db import connection
+from django.test import AsyncRequestFactory, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from api import chat_views
+from chat.models import ChatConversation, ChatMessage
+from movies.models import Movie
+from reports.models import MovieSection, SectionEmbedding
+from reports.benchmarks import StandInLLM
+from services import llm_clients
+from services.answer_cache import SemanticAnswerCache
+from services.chat_service import ChatService, StreamingAnswerCleaner, clean_answer
+from services.chunking import chunk_text
+from services.movie_matrix_cache import MovieMatrix, MovieMatrixCache
+from services.openrouter_service import OpenRouterService
+import asyncio
+import httpx
+import io
+import json
+import numpy as np
+import os
+import threading
+import time
 
-# Create your tests here.
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector search requires PostgreSQL with pgvector')
+@override_settings(RAG_ANN_INDEX=False, RAG_HNSW_EF_SEARCH=None, RAG_IVFFLAT_PROBES=None)
+class ChatQueryCountTests(TestCase):
+    """A chat turn should cost one retrieval query, however many sections come back"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = np.random.default_rng(0)
+        cls.movies = []
+        for i in range(3):
+            movie = Movie.objects.create(tmdb_id=i + 1, title=f'Movie {i}', year=2000 + i)
+            for section_type, _ in MovieSection.SECTION_TYPES:
+                MovieSection.objects.create(
+                    movie=movie,
+                    section_type=section_type,
+                    content='word ' * 500,
+                    embedding=rng.normal(size=384).astype('float32')
+                )
+            cls.movies.append(movie)
+
+    def setUp(self):
+        llm_clients.reset_clients()
+        self.addCleanup(llm_clients.reset_clients)
+
+        patcher = mock.patch('services.llm_clients.openai.OpenAI')
+        self.client = patcher.start().return_value
+        self.client.chat.completions.create.return_value.choices = [
+            mock.Mock(message=mock.Mock(content='An answer.'))
+        ]
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            'services.rag_service.RAGService.embed_query',
+            return_value=np.ones(384, dtype='float32')
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.service = ChatService()
+
+    def test_global_chat_single_query(self):
+        with self.assertNumQueries(1):
+            result = self.service.process_message('What is the story about?')
+
+        self.assertEqual(len(result['sources']), 5)
+
+    def test_movie_chat_single_query(self):
+        movie = self.movies[1]
+
+        with self.assertNumQueries(1):
+            result = self.service.chat('Who directed it?', movie_id=movie.id)
+            titles = {source['section'].movie.title for source in result['sources']}
+
+        self.assertEqual(titles, {movie.title})
+
+    def test_sections_load_only_prompt_excerpt(self):
+        result = self.service.chat('What is the story about?')
+
+        for source in result['sources']:
+            section = source['section']
+            self.assertIn('embedding', section.get_deferred_fields())
+            self.assertIn('content', section.get_deferred_fields())
+            self.assertEqual(
+                len(source['content']),
+                self.service._get_context_length(section.section_type, None)
+            )
+
+    @override_settings(RAG_MOVIE_MATRIX_CACHE_SIZE=8, RAG_RETRIEVAL_CACHE=False)
+    def test_movie_chat_from_memory_after_first_turn(self):
+        movie = self.movies[2]
+        with override_settings(RAG_MOVIE_MATRIX_CACHE_SIZE=0):
+            expected = [source['section_id'] for source in self.service.chat('What happens?', movie_id=movie.id)['sources']]
+
+        with mock.patch('services.rag_service._movie_matrix_cache', None):
+            self.service.chat('What happens?', movie_id=movie.id)
+
+            with self.assertNumQueries(0):
+                result = self.service.chat('What happens?', movie_id=movie.id)
+
+        self.assertEqual([source['section_id'] for source in result['sources']], expected)
+
+    @override_settings(RAG_MOVIE_MATRIX_CACHE_SIZE=8, RAG_RETRIEVAL_CACHE=False)
+    def test_movie_chat_without_embedded_sections(self):
+        movie = Movie.objects.create(tmdb_id=98, title='Not embedded yet', year=2011)
+        MovieSection.objects.create(movie=movie, section_type='production', content='No vector yet')
+
+        with mock.patch('services.rag_service._movie_matrix_cache', None):
+            sources = self.service.rag.search_with_priority('What happens?', movie_id=str(movie.id))
+
+        self.assertEqual(sources, [])
+
+    def test_sql_rerank_matches_python_rerank(self):
+        from services.rag_service import SECTION_WEIGHTS
+
+        rag = self.service.rag
+        rng = np.random.default_rng(7)
+        for query_type in SECTION_WEIGHTS:
+            for movie_id in [None, self.movies[1].id]:
+                query = rng.normal(size=384).astype('float32')
+                candidates = list(rag._pgvector_queryset(query, 5 * 3, movie_id))
+                expected = rag._rerank(candidates, query_type, 5)
+
+                ranked = list(rag._pgvector_reranked_queryset(query, query_type, 5, movie_id))
+
+                self.assertEqual([s.id for s in ranked], [s.id for s in expected], query_type)
+                for section, reference in zip(ranked, expected):
+                    self.assertAlmostEqual(section.weighted_score, reference.weighted_score, places=5)
+                    self.assertAlmostEqual(section.distance, reference.distance, places=5)
+
+    @override_settings(RAG_ANSWER_CACHE_SIZE=16)
+    def test_repeated_question_reuses_answer(self):
+        movie = self.movies[0]
+
+        with mock.patch('services.chat_service._answer_cache', None):
+            first = self.service.chat('What happens?', movie_id=movie.id)
+
+            # Only the source check runs: no retrieval, no LLM call
+            with self.assertNumQueries(1):
+                second = self.service.chat('What happens?', movie_id=movie.id)
+
+            MovieSection.objects.filter(id=first['sources'][0]['section_id']).update(content='Rewritten.')
+            self.service.chat('What happens?', movie_id=movie.id)
+
+        self.assertEqual(second['message'], first['message'])
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+
+    @override_settings(RAG_TWO_STAGE_MOVIES=1)
+    def test_two_stage_global_chat_ranks_nearest_movie(self):
+        from services.rag_service import refresh_movie_embeddings
+
+        refresh_movie_embeddings()
+        query = np.ones(384, dtype='float32')
+        centroids = {
+            movie.id: np.mean([section.embedding for section in movie.sections.all()], axis=0)
+            for movie in self.movies
+        }
+        nearest = max(centroids, key=lambda movie_id: centroids[movie_id] @ query / np.linalg.norm(centroids[movie_id]))
+
+        with self.assertNumQueries(1):
+            result = self.service.chat('What is the story about?')
+            movie_ids = {source['section'].movie_id for source in result['sources']}
+
+        self.assertEqual(movie_ids, {nearest})
+
+    @override_settings(RAG_NEXT_EMBEDDING_MODEL='next-model', RAG_SERVE_NEXT_EMBEDDINGS=True)
+    def test_serves_next_version_only_when_fully_embedded(self):
+        from services import embedding_versions
+        from services.rag_service import RAGService, content_hash
+
+        self.addCleanup(embedding_versions.reset_serving_version)
+        sections = list(MovieSection.objects.order_by('id'))
+        # Flipped vectors, so the next version ranks sections differently
+        SectionEmbedding.objects.bulk_create([
+            SectionEmbedding(
+                section=section,
+                model_version='next-model',
+                embedding=-section.embedding,
+                content_hash=content_hash(section.content)
+            )
+            for section in sections[1:]
+        ])
+
+        embedding_versions.reset_serving_version()
+        self.assertFalse(RAGService().version.shadow)
+
+        SectionEmbedding.objects.create(
+            section=sections[0],
+            model_version='next-model',
+            embedding=-sections[0].embedding,
+            content_hash=content_hash(sections[0].content)
+        )
+        embedding_versions.reset_serving_version()
+        service = ChatService()
+        self.assertEqual(service.rag.embedding_version, 'next-model')
+
+        query = np.ones(384, dtype='float32')
+        vectors = np.stack([-section.embedding for section in sections])
+        similarities = vectors @ query / np.linalg.norm(vectors, axis=1) / np.linalg.norm(query)
+        nearest = {sections[i].id for i in np.argsort(-similarities)[:15]}
+
+        result = service.process_message('What is the story about?')
+        self.assertTrue({source['section_id'] for source in result['sources']} <= nearest)
+
+    @override_settings(RAG_NEXT_EMBEDDING_MODEL='next-model', RAG_SERVE_NEXT_EMBEDDINGS=True)
+    def test_embedding_endpoint_writes_both_versions_while_next_is_served(self):
+        from services import embedding_versions
+        from services.rag_service import RAGService, content_hash
+
+        self.addCleanup(embedding_versions.reset_serving_version)
+        SectionEmbedding.objects.bulk_create([
+            SectionEmbedding(
+                section=section,
+                model_version='next-model',
+                embedding=-section.embedding,
+                content_hash=content_hash(section.content)
+            )
+            for section in MovieSection.objects.all()
+        ])
+        embedding_versions.reset_serving_version()
+        # Decided once per process: the new section below does not switch it back
+        self.assertTrue(embedding_versions.serving_version().shadow)
+
+        movie = Movie.objects.create(tmdb_id=99, title='Added later', year=2010)
+        section = MovieSection.objects.create(movie=movie, section_type='production', content='New section')
+        model = mock.Mock()
+        model.encode.side_effect = lambda texts, **kwargs: np.full((len(texts), 384), 0.5, dtype='float32')
+
+        with mock.patch.object(RAGService, 'load_model', return_value=model):
+            response = Client().post(
+                '/api/generate-embedding/', {'section_id': section.id}, content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            SectionEmbedding.objects.filter(section=section, model_version='next-model').exists()
+        )
+        section.refresh_from_db()
+        self.assertIsNotNone(section.embedding)
+        self.assertEqual(section.embedding_model, embedding_versions.current_version().id)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector search requires PostgreSQL with pgvector')
+@override_settings(
+    RAG_ANN_INDEX=False, RAG_HNSW_EF_SEARCH=None, RAG_IVFFLAT_PROBES=None,
+    RAG_MOVIE_MATRIX_CACHE_SIZE=0, RAG_RETRIEVAL_CACHE=False
+)
+class MetricSwitchTests(TransactionTestCase):
+    """Committed rows: normalize_embeddings vacuums, which cannot run in a test transaction"""
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        for i in range(3):
+            movie = Movie.objects.create(tmdb_id=500 + i, title=f'Metric {i}', year=2004)
+            for section_type, _ in MovieSection.SECTION_TYPES:
+                MovieSection.objects.create(
+                    movie=movie,
+                    section_type=section_type,
+                    content='word ' * 20,
+                    embedding=(rng.normal(size=384) * rng.uniform(0.5, 3)).astype('float32')
+                )
+
+    def test_normalizing_keeps_similarities(self):
+        from django.core.management import call_command
+        from services.embedding_versions import current_version
+        from services.rag_service import RAGService
+
+        # The model returns unit-length queries once normalizing
+        query = np.ones(384, dtype='float32') / np.sqrt(384)
+        with mock.patch('services.rag_service.RAGService.embed_query', return_value=query):
+            before = RAGService().search_with_scores('What happens?', k=5)
+            call_command('normalize_embeddings', stdout=io.StringIO())
+
+            # What a worker restarted with the setting on serves
+            with override_settings(RAG_NORMALIZE_EMBEDDINGS=True):
+                rag = RAGService(current_version())
+                self.assertTrue(rag.normalize)
+                after = rag.search_with_scores('What happens?', k=5)
+
+        self.assertEqual([s['section_id'] for s in after], [s['section_id'] for s in before])
+        for section, reference in zip(after, before):
+            self.assertAlmostEqual(section['similarity'], reference['similarity'], places=5)
+            self.assertAlmostEqual(section['weighted_score'], reference['weighted_score'], places=5)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector norms require PostgreSQL with pgvector')
+class BackfillEmbeddingTagsTests(TestCase):
+    def test_tagged_sections_are_not_re_embedded(self):
+        from django.core.management import call_command
+        from services.embedding_versions import current_version
+        from services.rag_service import RAGService
+
+        movie = Movie.objects.create(tmdb_id=600, title='Untagged', year=2005)
+        unit = np.zeros(384, dtype='float32')
+        unit[0] = 1.0
+        for (section_type, _), embedding in zip(MovieSection.SECTION_TYPES, [unit, unit * 2]):
+            MovieSection.objects.create(movie=movie, section_type=section_type, content='word', embedding=embedding)
+        longer = MovieSection.objects.get(section_type=MovieSection.SECTION_TYPES[1][0])
+
+        rag = RAGService(current_version())
+        self.assertEqual(rag.needs_embedding(MovieSection.objects.all()).count(), 2)
+
+        call_command('backfill_embedding_tags', '--model', rag.model_name, '--normalized', stdout=io.StringIO())
+
+        # Only the unit-length one passes as a normalized embedding
+        rag.normalize = True
+        self.assertEqual(list(rag.needs_embedding(MovieSection.objects.all())), [longer])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Movie centroids require PostgreSQL with pgvector')
+class SimilarMoviesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = np.random.default_rng(1)
+        topics = rng.normal(size=(4, 384))
+        # Movies 0 and 2 share a topic, so each is the other's nearest neighbour
+        for i, topic in enumerate([topics[0], topics[1], topics[0], topics[2]]):
+            movie = Movie.objects.create(tmdb_id=100 + i, title=f'Similar {i}', year=2000)
+            for section_type, _ in MovieSection.SECTION_TYPES[:3]:
+                MovieSection.objects.create(
+                    movie=movie,
+                    section_type=section_type,
+                    content='word ' * 50,
+                    embedding=(topic + rng.normal(size=384) * 0.1).astype('float32')
+                )
+
+    def test_similar_movies_served_from_table(self):
+        from services.rag_service import refresh_movie_embeddings
+        from services.similar_movies import compute_similar_movies
+
+        refresh_movie_embeddings()
+        compute_similar_movies()
+        movies = list(Movie.objects.order_by('tmdb_id'))
+
+        with mock.patch('services.tmdb_service.requests.get') as http:
+            response = self.client.get(f'/api/movies/{movies[0].id}/similar/')
+
+        http.assert_not_called()
+        similar = [movie['id'] for movie in response.json()['similar']]
+        self.assertEqual(len(similar), 3)
+        self.assertEqual(similar[0], movies[2].id)
+
+    def test_new_movie_gets_neighbours_when_its_sections_are_saved(self):
+        from reports.models import SimilarMovie
+        from services.rag_service import refresh_movie_embeddings
+        from services.similar_movies import compute_similar_movies
+
+        refresh_movie_embeddings()
+        compute_similar_movies()
+        movies = list(Movie.objects.order_by('tmdb_id'))
+        neighbour = MovieSection.objects.filter(movie=movies[1]).first().embedding
+
+        movie = Movie.objects.create(tmdb_id=199, title='Similar late', year=2000)
+        with self.captureOnCommitCallbacks(execute=True):
+            MovieSection.objects.create(
+                movie=movie, section_type='production', content='word ' * 50, embedding=neighbour
+            )
+
+        similar = list(SimilarMovie.objects.filter(movie=movie).values_list('similar_id', flat=True))
+        self.assertEqual(len(similar), 4)
+        self.assertEqual(similar[0], movies[1].id)
+        # The other lists are re-ranked with the new movie in them
+        self.assertEqual(SimilarMovie.objects.filter(movie=movies[1]).values_list('similar_id', flat=True)[0], movie.id)
+
+
+class MovieRefreshSignalTests(TestCase):
+    """Section writes refresh centroids and similar movies once per transaction or bulk block"""
+
+    def setUp(self):
+        self.movies = [Movie.objects.create(tmdb_id=400 + i, title=f'Refresh {i}', year=2003) for i in range(2)]
+
+        patcher = mock.patch('services.rag_service.refresh_movie_embeddings')
+        self.centroids = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch('reports.signals.refresh_similar_movies')
+        self.similar = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_sections(self):
+        for movie in self.movies:
+            for section_type, _ in MovieSection.SECTION_TYPES[:2]:
+                MovieSection.objects.create(movie=movie, section_type=section_type, content='word ' * 10)
+
+    def test_one_refresh_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_sections()
+            self.movies[0].genres.create(tmdb_id=1, name='Drama')
+
+        self.centroids.assert_called_once_with(sorted(movie.id for movie in self.movies))
+        self.similar.assert_called_once_with()
+
+    def test_bulk_block_refreshes_once_at_its_end(self):
+        from reports.signals import bulk_section_writes
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with bulk_section_writes():
+                with bulk_section_writes():
+                    self.create_sections()
+                self.centroids.assert_not_called()
+
+        self.centroids.assert_called_once_with(sorted(movie.id for movie in self.movies))
+        self.similar.assert_called_once_with()
+
+
+class StreamingAnswerCleanerTests(SimpleTestCase):
+    def test_streamed_answer_matches_blocking_cleanup(self):
+        text = (
+            '  <s>The film opens. It<|eot_id|> follows a thief. She plans a heist. It fails. '
+            'The crew<</SYS>> splits. A chase follows. The end.</s>  '
+        )
+        expected = clean_answer(text)
+
+        for size in range(1, 12):
+            cleaner = StreamingAnswerCleaner()
+            pieces = [cleaner.feed(text[i:i + size]) for i in range(0, len(text), size)]
+            streamed = ''.join(pieces) + cleaner.finish()
+
+            self.assertEqual(streamed, expected)
+            self.assertEqual(cleaner.answer, expected)
+            self.assertNotIn('<', streamed)
+
+        self.assertTrue(expected.endswith('A chase follows.'))
+
+    def test_stops_at_the_sentence_limit(self):
+        from services.chat_service import MAX_ANSWER_SENTENCES
+
+        cleaner = StreamingAnswerCleaner()
+        sentences = [f'Sentence {i}.' for i in range(MAX_ANSWER_SENTENCES + 2)]
+        streamed = ''
+        for sentence in sentences:
+            streamed += cleaner.feed(sentence + ' ')
+            if cleaner.done:
+                break
+
+        self.assertTrue(cleaner.done)
+        self.assertEqual(streamed, ' '.join(sentences[:MAX_ANSWER_SENTENCES]))
+        self.assertEqual(cleaner.feed('More text. '), '')
+        self.assertEqual(cleaner.finish(), '')
+
+    def test_periods_inside_sentences_do_not_count(self):
+        text = 'It cost $2.5 million. Version 1.0 flopped. It was re-cut.A sequel followed.'
+        cleaner = StreamingAnswerCleaner()
+        streamed = ''.join(cleaner.feed(c) for c in text) + cleaner.finish()
+
+        self.assertEqual(streamed, text)
+        self.assertFalse(cleaner.done)
+
+    def test_trailing_whitespace_waits_for_more_text(self):
+        cleaner = StreamingAnswerCleaner()
+
+        self.assertEqual(cleaner.feed('It ends. '), 'It ends.')
+        self.assertEqual(cleaner.feed('Or not'), ' Or not')
+        self.assertEqual(cleaner.finish(), '')
+
+    def test_angle_bracket_that_is_not_a_token_is_shown(self):
+        cleaner = StreamingAnswerCleaner()
+
+        self.assertEqual(cleaner.feed('Budget <'), 'Budget')
+        self.assertEqual(cleaner.feed('|eot'), '')
+        self.assertEqual(cleaner.feed('_id|>: 3 < 5 million'), ' : 3 < 5 million')
+
+
+class EmbeddingServerTests(SimpleTestCase):
+    """The remote backend gets the server's rows exactly, and encodes in-process while it is down"""
+
+    def setUp(self):
+        import tempfile
+        from services.embedding_server import EmbeddingApp, make_server
+
+        self.model = mock.Mock()
+        self.model.encode.side_effect = lambda texts, **kwargs: np.array(
+            [[len(text), 0.5, -1.25] for text in texts], dtype='float32'
+        )
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.socket_path = os.path.join(directory, 'embeddings.sock')
+
+        self.server = make_server(EmbeddingApp(self.model, max_batch_size=4), socket_path=self.socket_path)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.stop_server)
+
+        self.local = mock.Mock()
+        self.local.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 3), dtype='float32')
+        self.loads = 0
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            os.unlink(self.socket_path)
+            self.server = None
+
+    def backend(self):
+        from services.embedding_backends import RemoteBackend
+
+        def fallback():
+            self.loads += 1
+            return self.local
+
+        return RemoteBackend(f'unix://{self.socket_path}', fallback=fallback, timeout=2, retry_after=60)
+
+    def test_rows_round_trip_through_the_server(self):
+        backend = self.backend()
+
+        np.testing.assert_array_equal(backend.encode(['ab', 'abcd']), [[2, 0.5, -1.25], [4, 0.5, -1.25]])
+        np.testing.assert_array_equal(backend.encode('abc'), [3, 0.5, -1.25])
+        # Bulk requests skip the server's batcher but give the same rows
+        np.testing.assert_array_equal(backend.encode(['a'] * 5)[:, 0], [1] * 5)
+        self.assertEqual(self.loads, 0)
+
+    def test_falls_back_while_the_server_is_down(self):
+        backend = self.backend()
+        self.stop_server()
+
+        np.testing.assert_array_equal(backend.encode(['ab']), [[1, 1, 1]])
+        backend.encode(['ab'])
+
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.local.encode.call_count, 2)
+        # Not retried before retry_after
+        self.assertGreater(backend._down_until, time.monotonic() + 50)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector search requires PostgreSQL with pgvector')
+@override_settings(RAG_ANN_INDEX=True, RAG_RETRIEVAL_CACHE=True, RAG_ANN_MAX_AGE=0)
+class SectionANNIndexTests(TestCase):
+    def test_rebuilds_after_writes_from_another_process(self):
+        from services.ann_index import SectionANNIndex
+        from services.rag_service import get_retrieval_cache
+
+        rng = np.random.default_rng(4)
+        movie = Movie.objects.create(tmdb_id=400, title='Indexed', year=2003)
+        MovieSection.objects.create(
+            movie=movie, section_type='production', content='word', embedding=rng.normal(size=384).astype('float32')
+        )
+        index = SectionANNIndex()
+        index.build()
+
+        # As a management command would: rows written, shared counters bumped, no signal here
+        embedding = rng.normal(size=384).astype('float32')
+        [added] = MovieSection.objects.bulk_create([
+            MovieSection(movie=movie, section_type='plot_structure', content='word', embedding=embedding)
+        ])
+        get_retrieval_cache().invalidate([movie.id])
+
+        with mock.patch.object(index, '_rebuild_in_background') as rebuild:
+            self.assertIsNone(index.query(embedding, 1))
+        rebuild.assert_called_once()
+
+        index.build()
+        self.assertEqual(index.query(embedding, 1)[0][0], added.id)
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector search requires PostgreSQL with pgvector')
+class SectionChunkSyncTests(TestCase):
+    def test_reencodes_passages_stored_under_another_mode(self):
+        from reports.models import SectionChunk
+        from services.chunking import chunk_text
+        from services.rag_service import RAGService
+
+        movie = Movie.objects.create(tmdb_id=500, title='Chunked', year=2004)
+        section = MovieSection.objects.create(movie=movie, section_type='production', content='word ' * 50)
+        rag = RAGService()
+        SectionChunk.objects.bulk_create([
+            SectionChunk(
+                section=section,
+                movie=movie,
+                section_type=section.section_type,
+                chunk_index=i,
+                start_char=start_char,
+                content=passage,
+                embedding=np.full(384, 3.0, dtype='float32'),
+                embedding_model=rag.embedding_model_id
+            )
+            for i, (start_char, passage) in enumerate(
+                chunk_text(section.content, settings.RAG_CHUNK_WORDS, settings.RAG_CHUNK_OVERLAP)
+            )
+        ])
+
+        encode = mock.patch.object(
+            RAGService, 'generate_embeddings',
+            side_effect=lambda texts, batch_size=None: np.full((len(texts), 384), 0.5, dtype='float32')
+        )
+        with encode as generate:
+            list(rag.sync_section_chunks([section]))
+        generate.assert_called_once_with([], mock.ANY)
+
+        rag.normalize = True
+        with encode as generate:
+            list(rag.sync_section_chunks([section]))
+        self.assertTrue(generate.call_args.args[0])
+
+        chunks = SectionChunk.objects.filter(section=section)
+        self.assertEqual({chunk.embedding_model for chunk in chunks}, {rag.embedding_model_id})
+        self.assertTrue(all(np.allclose(chunk.embedding, 0.5) for chunk in chunks))
+
+    @override_settings(RAG_CHUNK_WORDS=20, RAG_CHUNK_OVERLAP=5)
+    def test_edit_encodes_only_changed_passages(self):
+        from reports.models import SectionChunk
+        from services.rag_service import RAGService
+
+        movie = Movie.objects.create(tmdb_id=501, title='Edited', year=2004)
+        words = [f'w{i}' for i in range(60)]
+        section = MovieSection.objects.create(movie=movie, section_type='production', content=' '.join(words))
+        rag = RAGService()
+
+        encode = mock.patch.object(
+            RAGService, 'generate_embeddings',
+            side_effect=lambda texts, batch_size=None: np.full((len(texts), 384), 0.5, dtype='float32')
+        )
+        with encode as generate:
+            list(rag.sync_section_chunks([section]))
+        self.assertEqual(len(generate.call_args.args[0]), 4)
+
+        # Only the last window changes; the others keep their vectors
+        section.content = ' '.join(words[:-1] + ['edited'])
+        with encode as generate:
+            list(rag.sync_section_chunks([section]))
+        changed = generate.call_args.args[0]
+
+        self.assertEqual(len(changed), 1)
+        self.assertTrue(changed[0].endswith('edited'))
+        self.assertEqual(
+            list(SectionChunk.objects.filter(section=section).order_by('chunk_index').values_list('content', flat=True)),
+            [passage for _, passage in chunk_text(section.content, 20, 5)]
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+@override_settings(RAG_ANN_INDEX=False, RAG_HNSW_EF_SEARCH=None, RAG_IVFFLAT_PROBES=None, RAG_RETRIEVAL_CACHE=False)
+class HybridRetrievalTests(TestCase):
+    """Full-text rank is fused with vector rank by reciprocal rank fusion"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = np.random.default_rng(5)
+        cls.query = rng.normal(size=384).astype('float32')
+        for i in range(2):
+            movie = Movie.objects.create(tmdb_id=700 + i, title=f'Hybrid {i}', year=2006)
+            for section_type, _ in MovieSection.SECTION_TYPES:
+                MovieSection.objects.create(
+                    movie=movie,
+                    section_type=section_type,
+                    content='word ' * 30,
+                    embedding=rng.normal(size=384).astype('float32')
+                )
+        # The only section naming the term, and the farthest from the query
+        cls.named = MovieSection.objects.filter(section_type='production').order_by('id').last()
+        cls.named.content = 'The zeppelin sequence ' + 'word ' * 30
+        cls.named.embedding = -cls.query
+        cls.named.save()
+
+    def search(self, mode):
+        from services.embedding_versions import current_version
+        from services.rag_service import RAGService
+
+        with override_settings(RAG_RETRIEVAL_MODE=mode), mock.patch.object(RAGService, 'embed_query', return_value=self.query):
+            return RAGService(current_version()).search_with_priority('zeppelin budget', k=5)
+
+    def test_keyword_match_is_fused_into_vector_ranking(self):
+        from services.rag_service import RRF_K, SECTION_WEIGHTS
+
+        self.assertNotIn(self.named.id, [s.id for s in self.search('vector')])
+        results = self.search('hybrid')
+
+        sections = list(MovieSection.objects.all())
+        vectors = np.stack([s.embedding for s in sections])
+        distances = 1 - vectors @ self.query / np.linalg.norm(vectors, axis=1) / np.linalg.norm(self.query)
+        vector_rank = {sections[i].id: rank for rank, i in enumerate(np.argsort(distances)[:15], 1)}
+        weights = SECTION_WEIGHTS['facts']
+        expected = {
+            s.id: (
+                (1 / (RRF_K + vector_rank[s.id]) if s.id in vector_rank else 0)
+                + (1 / (RRF_K + 1) if s.id == self.named.id else 0)
+            ) * weights.get(s.section_type, 1.0)
+            for s in sections
+        }
+        top = sorted(expected, key=expected.get, reverse=True)[:5]
+
+        self.assertIn(self.named.id, [s.id for s in results])
+        self.assertEqual([s.id for s in results], top)
+        for section in results:
+            self.assertAlmostEqual(section.weighted_score, expected[section.id], places=6)
+
+
+class HybridQueryTests(SimpleTestCase):
+    def test_lexical_query_ors_each_word_once(self):
+        from services.rag_service import RAGService
+
+        self.assertEqual(RAGService._lexical_query("Who's the director? The DIRECTOR!"), "who | s | the | director")
+
+
+class OnnxBackendTests(SimpleTestCase):
+    """Pooling and normalization reproduce sentence-transformers around the ONNX session"""
+
+    def backend(self, pooling='mean', normalize=True):
+        from services.embedding_backends import OnnxBackend
+
+        backend = OnnxBackend.__new__(OnnxBackend)
+        backend.config = {'dimension': 3}
+        backend.pooling, backend.normalize = pooling, normalize
+        backend.input_names = {'input_ids', 'attention_mask'}
+
+        # One token per word, padded to the longest text; token vector = (id, 1, 0)
+        def encode_batch(texts):
+            width = max(len(text.split()) for text in texts)
+            return [
+                mock.Mock(
+                    ids=[len(word) for word in text.split()] + [0] * (width - len(text.split())),
+                    attention_mask=[1] * len(text.split()) + [0] * (width - len(text.split())),
+                    type_ids=[0] * width
+                )
+                for text in texts
+            ]
+        backend.tokenizer = mock.Mock(encode_batch=encode_batch)
+
+        def run(outputs, inputs):
+            ids = inputs['input_ids'].astype('float32')
+            return [np.stack([ids, np.ones_like(ids), np.zeros_like(ids)], axis=-1)]
+        backend.session = mock.Mock(run=run)
+        return backend
+
+    def test_mean_pooling_ignores_padding(self):
+        embeddings = self.backend(normalize=False).encode(['a abc', 'abcdef'])
+
+        np.testing.assert_allclose(embeddings, [[2.0, 1.0, 0.0], [6.0, 1.0, 0.0]])
+
+    def test_batches_and_single_text_match_one_pass(self):
+        backend = self.backend()
+        texts = ['a abc', 'abcdef', 'ab ab ab']
+
+        together = backend.encode(texts, batch_size=8)
+        np.testing.assert_allclose(backend.encode(texts, batch_size=1), together, rtol=1e-6)
+        np.testing.assert_allclose(backend.encode(texts[1]), together[1], rtol=1e-6)
+        np.testing.assert_allclose(np.linalg.norm(together, axis=1), 1.0, rtol=1e-6)
+
+    def test_cls_pooling_takes_first_token(self):
+        embeddings = self.backend(pooling='cls', normalize=False).encode(['abc a'])
+
+        np.testing.assert_allclose(embeddings, [[3.0, 1.0, 0.0]])
+
+
+@skipUnless(
+    os.path.exists(os.path.join(settings.RAG_ONNX_MODEL_DIR, 'model.onnx')),
+    'Needs an ONNX export (`manage.py export_onnx_model`) in RAG_ONNX_MODEL_DIR'
+)
+class OnnxParityTests(SimpleTestCase):
+    def test_onnx_matches_sentence_transformers(self):
+        from reports.management.commands.export_onnx_model import SAMPLE_TEXTS
+        from services.embedding_backends import ONNX_CONFIG_FILE, OnnxBackend, load_torch_backend
+
+        with open(os.path.join(settings.RAG_ONNX_MODEL_DIR, ONNX_CONFIG_FILE)) as f:
+            model_name = json.load(f)['model_name']
+
+        texts = list(SAMPLE_TEXTS)
+        expected = load_torch_backend(model_name).encode(texts, batch_size=8, convert_to_numpy=True)
+        embeddings = OnnxBackend(settings.RAG_ONNX_MODEL_DIR).encode(texts, batch_size=8)
+
+        np.testing.assert_allclose(embeddings, expected, atol=1e-4)
+
+
+class QuantizedIndexTests(SimpleTestCase):
+    """Quantized indexes skipped on an old pgvector can be created after upgrading"""
+
+    def schema_editor(self, pgvector_version):
+        schema_editor = mock.MagicMock()
+        schema_editor.connection.vendor = 'postgresql'
+        cursor = schema_editor.connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (pgvector_version,)
+        return schema_editor
+
+    def migration(self):
+        from importlib import import_module
+
+        return import_module('reports.migrations.0010_quantized_embedding_indexes')
+
+    def test_migration_skips_with_a_warning_before_pgvector_0_7(self):
+        schema_editor = self.schema_editor('0.6.2')
+
+        with self.assertWarnsRegex(UserWarning, '--create-missing'):
+            self.migration().create_indexes(None, schema_editor)
+
+        schema_editor.execute.assert_not_called()
+
+    def test_create_missing_builds_every_index(self):
+        from reports.management.commands import vector_index_status
+
+        schema_editor = self.schema_editor('0.7.4')
+        out = io.StringIO()
+        with mock.patch.object(vector_index_status, 'connection') as db:
+            db.schema_editor.return_value.__enter__.return_value = schema_editor
+            vector_index_status.Command(stdout=out)._create_missing()
+
+        db.schema_editor.assert_called_once_with(atomic=False)
+        statements = [call.args[0] for call in schema_editor.execute.call_args_list]
+        self.assertEqual(
+            statements,
+            [self.migration().index_sql(name, expression) for name, expression in self.migration().INDEXES.items()]
+        )
+        self.assertTrue(all(sql.startswith('CREATE INDEX CONCURRENTLY IF NOT EXISTS') for sql in statements))
+        for name in vector_index_status.QUANTIZED_INDEXES.values():
+            self.assertIn(name, out.getvalue())
+
+    def test_create_missing_refuses_before_pgvector_0_7(self):
+        from reports.management.commands import vector_index_status
+
+        schema_editor = self.schema_editor('0.6.2')
+        out = io.StringIO()
+        with mock.patch.object(vector_index_status, 'connection') as db:
+            db.schema_editor.return_value.__enter__.return_value = schema_editor
+            vector_index_status.Command(stdout=out)._create_missing()
+
+        schema_editor.execute.assert_not_called()
+        self.assertIn('pgvector >= 0.7', out.getvalue())
+
+
+class EmbeddingBatcherTests(SimpleTestCase):
+    """Concurrent queries share a forward pass of at most max_batch_size, each caller gets its own row"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.batches = []
+
+    def encode(self, texts):
+        self.batches.append(list(texts))
+        self.release.wait(5)
+        if 'fail' in texts:
+            raise RuntimeError('model failed')
+        return np.array([[float(text)] for text in texts], dtype='float32')
+
+    def batcher(self, **kwargs):
+        from services.embedding_batcher import EmbeddingBatcher
+
+        return EmbeddingBatcher(self.encode, **kwargs)
+
+    def test_lone_query_is_encoded_without_waiting(self):
+        self.release.set()
+        batcher = self.batcher(max_batch_size=8, max_wait_ms=1000)
+
+        started = time.monotonic()
+        self.assertEqual(batcher.encode('1', timeout=5)[0], 1.0)
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.batches, [['1']])
+
+    def test_queued_queries_fill_batches_up_to_max_size(self):
+        batcher = self.batcher(max_batch_size=4, max_wait_ms=100)
+        first = batcher.submit('0')
+        while not self.batches:
+            time.sleep(0.001)
+
+        # Queued while the model is busy with the first one
+        futures = [batcher.submit(str(i)) for i in range(1, 11)]
+        self.release.set()
+
+        self.assertEqual(first.result(timeout=5)[0], 0.0)
+        self.assertEqual([future.result(timeout=5)[0] for future in futures], [float(i) for i in range(1, 11)])
+        self.assertEqual([len(batch) for batch in self.batches], [1, 4, 4, 2])
+        self.assertEqual(batcher.stats()['full_batches'], 2)
+
+    def test_after_a_busy_batch_waits_up_to_max_wait_then_flushes(self):
+        self.release.set()
+        batcher = self.batcher(max_batch_size=4, max_wait_ms=50)
+        batcher._last_batch_size = 2
+
+        started = time.monotonic()
+        batcher.encode('7', timeout=5)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.045)
+        self.assertEqual(self.batches, [['7']])
+
+    def test_failure_reaches_every_caller_in_the_batch(self):
+        batcher = self.batcher(max_batch_size=4, max_wait_ms=1000)
+        first = batcher.submit('0')
+        while not self.batches:
+            time.sleep(0.001)
+        futures = [batcher.submit(text) for text in ['1', 'fail']]
+        self.release.set()
+
+        first.result(timeout=5)
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, 'model failed'):
+                future.result(timeout=5)
+
+
+class EmbeddingBackendTests(SimpleTestCase):
+    def test_missing_onnx_export_falls_back_to_torch(self):
+        from services import embedding_backends
+
+        with mock.patch.object(embedding_backends, 'load_torch_backend') as torch_backend:
+            backend = embedding_backends.load_backend('onnx', 'some-model', onnx_model_dir='/nonexistent', threads=2)
+
+        self.assertIs(backend, torch_backend.return_value)
+        torch_backend.assert_called_once_with('some-model', threads=2)
+
+    def test_unknown_backend_is_rejected(self):
+        from services.embedding_backends import load_backend
+
+        with self.assertRaises(ValueError):
+            load_backend('tpu', 'some-model')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector search requires PostgreSQL with pgvector')
+@override_settings(
+    RAG_ANN_INDEX=False, RAG_HNSW_EF_SEARCH=None, RAG_IVFFLAT_PROBES=None, RAG_TWO_STAGE_MOVIES=0,
+    RAG_RETRIEVAL_CACHE=True, RAG_MOVIE_MATRIX_CACHE_SIZE=0
+)
+class RetrievalCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = np.random.default_rng(6)
+        cls.query = rng.normal(size=384).astype('float32')
+        for i in range(3):
+            movie = Movie.objects.create(tmdb_id=800 + i, title=f'Cached {i}', year=2007)
+            for section_type, _ in MovieSection.SECTION_TYPES:
+                MovieSection.objects.create(
+                    movie=movie,
+                    section_type=section_type,
+                    content='word ' * 20,
+                    embedding=rng.normal(size=384).astype('float32')
+                )
+
+    def setUp(self):
+        from django.core.cache import caches
+        from services.embedding_versions import current_version
+        from services.rag_service import RAGService
+
+        caches[settings.RAG_RETRIEVAL_CACHE_ALIAS].clear()
+        patcher = mock.patch('services.rag_service._retrieval_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(RAGService, 'embed_query', return_value=self.query)
+        self.embed_query = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.rag = RAGService(current_version())
+
+    def search(self):
+        return [section.id for section in self.rag.search_with_priority('What happens?', k=5)]
+
+    def test_hit_skips_embedding_and_pgvector(self):
+        from services.rag_service import RAGService
+
+        expected = self.search()
+        with mock.patch.object(RAGService, '_pgvector_search') as pgvector:
+            self.assertEqual(self.search(), expected)
+
+        pgvector.assert_not_called()
+        self.embed_query.assert_called_once()
+
+    def test_cleanup_reports_deletes_invalidate(self):
+        from django.core.management import call_command
+        from services.rag_service import RAGService, get_retrieval_cache
+
+        expected = self.search()
+        movie_id = MovieSection.objects.get(id=expected[0]).movie_id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cleanup_reports', '--movie-id', str(movie_id), '--confirm', stdout=io.StringIO())
+
+        with mock.patch.object(RAGService, '_pgvector_search', wraps=self.rag._pgvector_search) as pgvector:
+            results = self.search()
+
+        pgvector.assert_called_once()
+        self.assertFalse(MovieSection.objects.filter(id__in=results, movie_id=movie_id).exists())
+        self.assertEqual(len(results), 5)
+        # A clean miss: the stale entry was never read back
+        self.assertEqual(get_retrieval_cache().stats()['stale'], 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RetrievalCacheKeyTests(SimpleTestCase):
+    """Writes to one movie drop its cached searches and global ones, not other movies'"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from services.retrieval_cache import RetrievalCache
+
+        cache.clear()
+        self.cache = RetrievalCache()
+
+    def key(self, movie_id, query='What happens?'):
+        return self.cache.make_key('model', query, movie_id, 5, 'plot')
+
+    def test_query_case_and_whitespace_share_a_key(self):
+        self.assertEqual(self.key(1, 'What  happens?'), self.key(1, ' what HAPPENS? '))
+        self.assertNotEqual(self.key(1), self.key(2))
+
+    def test_movie_write_drops_its_scope_and_global_searches(self):
+        keys = {scope: self.key(scope) for scope in [1, 2, None]}
+
+        self.cache.invalidate(['1'])
+
+        self.assertNotEqual(self.key(1), keys[1])
+        self.assertNotEqual(self.key(None), keys[None])
+        self.assertEqual(self.key(2), keys[2])
+
+    def test_full_invalidation_drops_everything(self):
+        keys = {scope: self.key(scope) for scope in [1, 2, None]}
+
+        self.cache.invalidate()
+
+        self.assertTrue(all(self.key(scope) != key for scope, key in keys.items()))
+
+
+class ChunkTextTests(SimpleTestCase):
+    def test_windows_overlap_and_cover_every_word(self):
+        text = '  '.join(f'w{i}.' for i in range(50))
+        chunks = chunk_text(text, max_words=20, overlap_words=5)
+
+        self.assertEqual([len(passage.split()) for _, passage in chunks], [20, 20, 20])
+        for start_char, passage in chunks:
+            self.assertEqual(text[start_char:start_char + len(passage)], passage)
+        self.assertEqual(chunks[0][1].split()[-5:], chunks[1][1].split()[:5])
+        self.assertTrue(chunks[-1][1].endswith('w49.'))
+
+    def test_short_and_empty_text(self):
+        self.assertEqual(chunk_text('A short one.', max_words=20), [(0, 'A short one.')])
+        self.assertEqual(chunk_text('   '), [])
+        self.assertEqual(chunk_text(None), [])
+
+
+@override_settings(RAG_QUERY_CACHE_SIZE=2, RAG_QUERY_CACHE_TTL=None, RAG_BATCHER_ENABLED=False)
+class QueryEmbeddingCacheTests(SimpleTestCase):
+    """Repeated queries skip the model; entries are bounded, shared read-only and per model"""
+
+    def setUp(self):
+        patcher = mock.patch('services.rag_service._query_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            'services.rag_service.RAGService.generate_embedding',
+            side_effect=lambda text: np.full(4, len(text), dtype='float32')
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_query_is_encoded_once(self):
+        from services.embedding_versions import current_version
+        from services.rag_service import RAGService
+
+        rag = RAGService(current_version())
+        first = rag.embed_query('Who directed it?')
+        second = rag.embed_query('  who DIRECTED   it? ')
+
+        self.generate.assert_called_once_with('Who directed it?')
+        self.assertIs(second, first)
+        self.assertFalse(second.flags.writeable)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        from services.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(max_size=2)
+        for text in ['a', 'b']:
+            cache.set(cache.make_key('model', text), np.zeros(4))
+        cache.get(cache.make_key('model', 'a'))
+        cache.set(cache.make_key('model', 'c'), np.zeros(4))
+
+        self.assertIsNotNone(cache.get(cache.make_key('model', 'a')))
+        self.assertIsNone(cache.get(cache.make_key('model', 'b')))
+        self.assertIsNone(cache.get(cache.make_key('other-model', 'a')))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire_after_ttl(self):
+        from services.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(ttl=60)
+        key = cache.make_key('model', 'a')
+        with mock.patch('services.embedding_cache.time.monotonic', return_value=100.0):
+            cache.set(key, np.zeros(4))
+        with mock.patch('services.embedding_cache.time.monotonic', return_value=161.0):
+            self.assertIsNone(cache.get(key))
+
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+
+class MovieMatrixCacheTests(SimpleTestCase):
+    """Entries are found and dropped whatever type the movie id arrives as"""
+
+    def entry(self, n_sections):
+        sections = [mock.Mock(id=i, section_type='plot', content='text') for i in range(n_sections)]
+        return MovieMatrix(sections, np.ones((n_sections, 4), dtype='float32'))
+
+    def test_empty_movie_keeps_embedding_width(self):
+        entry = self.entry(0)
+
+        self.assertEqual(entry.matrix.shape, (0, 4))
+        self.assertEqual(len(entry.ids), 0)
+
+    def test_string_and_int_ids_share_an_entry(self):
+        cache = MovieMatrixCache(max_movies=4)
+        entry = cache.set('7', self.entry(2))
+
+        self.assertIs(cache.get(7), entry)
+        cache.invalidate([7])
+        self.assertIsNone(cache.get('7'))
+
+
+@override_settings(RAG_BATCHER_ENABLED=True, RAG_QUERY_CACHE_SIZE=0)
+class QueryBatcherTests(SimpleTestCase):
+    """Queries are batched per embedding version and encoded with that version's model"""
+
+    def setUp(self):
+        from services import rag_service
+
+        for patcher in [mock.patch.dict(rag_service._query_batchers), mock.patch.dict(rag_service._rag_services)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        def generate_embeddings(service, texts, batch_size=None):
+            return np.full((len(texts), 4), 1.0 if service.version.shadow else 0.0, dtype='float32')
+
+        patcher = mock.patch('services.rag_service.RAGService.generate_embeddings', autospec=True)
+        patcher.start().side_effect = generate_embeddings
+        self.addCleanup(patcher.stop)
+
+    def test_each_version_encodes_with_its_own_model(self):
+        from services.embedding_versions import current_version, next_version
+        from services.rag_service import RAGService
+
+        current, upcoming = current_version(), next_version('next-model', 4)
+        self.assertEqual(RAGService(current).embed_query('a plot question')[0], 0.0)
+        self.assertEqual(RAGService(upcoming).embed_query('a plot question')[0], 1.0)
+        self.assertEqual(RAGService(current).embed_query('another question')[0], 0.0)
+
+
+class SemanticAnswerCacheTests(SimpleTestCase):
+    def test_concurrent_stale_lookups_miss_without_error(self):
+        cache = SemanticAnswerCache(max_size=1)
+        cache.set(None, np.ones(4), 'Old answer.', [], {}, 1.0)
+        barrier = threading.Barrier(2)
+
+        def is_valid(entry):
+            barrier.wait(timeout=5)
+            return False
+
+        results, errors = [], []
+
+        def lookup():
+            try:
+                results.append(cache.get(None, np.ones(4), is_valid))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=lookup) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [None, None])
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_entry_evicted_during_validation_misses(self):
+        cache = SemanticAnswerCache(max_size=1)
+        cache.set(None, np.ones(4), 'Old answer.', [], {}, 1.0)
+
+        def is_valid(entry):
+            cache.set('other', np.ones(4), 'New answer.', [], {}, 1.0)
+            return False
+
+        self.assertIsNone(cache.get(None, np.ones(4), is_valid))
+        self.assertEqual(cache.stats()['size'], 1)
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector search requires PostgreSQL with pgvector')
+@override_settings(RAG_ANN_INDEX=False, RAG_HNSW_EF_SEARCH=None, RAG_IVFFLAT_PROBES=None)
+class ChatStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = np.random.default_rng(2)
+        cls.movie = Movie.objects.create(tmdb_id=200, title='Streamed', year=2001)
+        for section_type, _ in MovieSection.SECTION_TYPES:
+            MovieSection.objects.create(
+                movie=cls.movie,
+                section_type=section_type,
+                content='word ' * 100,
+                embedding=rng.normal(size=384).astype('float32')
+            )
+
+    def setUp(self):
+        llm_clients.reset_clients()
+        self.addCleanup(llm_clients.reset_clients)
+
+        patcher = mock.patch('services.llm_clients.openai.OpenAI')
+        self.llm = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            'services.rag_service.RAGService.embed_query',
+            return_value=np.ones(384, dtype='float32')
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stream_sends_sources_then_tokens_and_saves_answer(self):
+        deltas = ['<|start|>It', ' is', ' a heist', ' film.', ' One. Two. Three. Four. Five. Six.', ' Never sent.']
+        stream = self.llm.chat.completions.create.return_value
+        stream.__iter__.return_value = [
+            mock.Mock(choices=[mock.Mock(delta=mock.Mock(content=delta))]) for delta in deltas
+        ]
+
+        response = self.client.post(
+            '/api/chat/stream/',
+            {'message': 'What is it about?', 'movie_id': self.movie.id},
+            content_type='application/json',
+            HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = [
+            (block.split('\n')[0].removeprefix('event: '), json.loads(block.split('\n')[1].removeprefix('data: ')))
+            for block in b''.join(response.streaming_content).decode().strip().split('\n\n')
+        ]
+
+        self.assertEqual(events[0][0], 'sources')
+        self.assertEqual(len(events[0][1]['sources']), 3)
+        self.assertEqual(events[-1][0], 'done')
+        answer = 'It is a heist film. One. Two. Three. Four. Five.'
+        self.assertEqual(''.join(data['text'] for event, data in events if event == 'token'), answer)
+        self.assertTrue(self.llm.chat.completions.create.call_args.kwargs['stream'])
+        stream.close.assert_called_once()
+
+        conversation = ChatConversation.objects.get(id=events[-1][1]['conversation_id'])
+        user, assistant = conversation.messages.order_by('id')
+        self.assertEqual((user.role, assistant.role), ('user', 'assistant'))
+        self.assertEqual(assistant.content, answer)
+        self.assertEqual(assistant.context_sections, events[0][1]['sources'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Vector search requires PostgreSQL with pgvector')
+@override_settings(RAG_ANN_INDEX=False, RAG_HNSW_EF_SEARCH=None, RAG_IVFFLAT_PROBES=None)
+class AsyncChatTests(TransactionTestCase):
+    """Committed rows: retrieval and writes run on the chat pool's own connections"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.movie = Movie.objects.create(tmdb_id=300, title='Async', year=2002)
+        for section_type, _ in MovieSection.SECTION_TYPES:
+            MovieSection.objects.create(
+                movie=self.movie,
+                section_type=section_type,
+                content='word ' * 100,
+                embedding=rng.normal(size=384).astype('float32')
+            )
+
+        llm_clients.reset_clients()
+        self.addCleanup(llm_clients.reset_clients)
+
+        patcher = mock.patch('services.llm_clients.openai.OpenAI')
+        self.sync_llm = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch('services.llm_clients.openai.AsyncOpenAI')
+        self.llm = patcher.start().return_value
+        self.llm.chat.completions.create = mock.AsyncMock(
+            return_value=mock.Mock(choices=[mock.Mock(message=mock.Mock(content='An async answer.'))])
+        )
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            'services.rag_service.RAGService.embed_query',
+            return_value=np.ones(384, dtype='float32')
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_async_send_answers_without_sync_client(self):
+        request = AsyncRequestFactory().post(
+            '/api/chat/send/',
+            {'message': 'What is it about?', 'movie_id': self.movie.id},
+            content_type='application/json'
+        )
+        response = await chat_views.send_chat_message_async(request)
+        data = json.loads(response.content)
+
+        self.assertEqual(data['message'], 'An async answer.')
+        self.assertEqual(len(data['sources']), 3)
+        self.llm.chat.completions.create.assert_awaited_once()
+        self.sync_llm.chat.completions.create.assert_not_called()
+
+        roles = [
+            message.role
+            async for message in ChatMessage.objects.filter(conversation_id=data['conversation_id']).order_by('id')
+        ]
+        self.assertEqual(roles, ['user', 'assistant'])
+
+    @override_settings(RAG_NEXT_EMBEDDING_MODEL='next-model', RAG_SERVE_NEXT_EMBEDDINGS=True)
+    async def test_async_views_choose_serving_version_off_the_event_loop(self):
+        from chat import views as chat_page_views
+        from services import embedding_versions
+
+        # Not decided yet: the first chat counts the next version's coverage
+        embedding_versions.reset_serving_version()
+        self.addCleanup(embedding_versions.reset_serving_version)
+
+        factory = AsyncRequestFactory()
+        payload = {'message': 'What is it about?', 'movie_id': self.movie.id}
+        response = await chat_views.send_chat_message_async(
+            factory.post('/api/chat/send/', payload, content_type='application/json')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['message'], 'An async answer.')
+
+        embedding_versions.reset_serving_version()
+        response = await chat_page_views.chat_message_async(
+            factory.post('/chat/message/', payload, content_type='application/json')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(embedding_versions.serving_version().shadow)
+
+
+@mock.patch('services.rag_service.model_status', return_value={'loaded': True})
+class ReadinessTests(TestCase):
+    def test_public_probe_shows_only_status(self, model_status):
+        response = Client().get('/healthz/ready')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'ready': True})
+
+    def test_staff_see_diagnostics(self, model_status):
+        from django.contrib.auth.models import User
+
+        client = Client()
+        client.force_login(User.objects.create_user('ops', is_staff=True))
+        data = client.get('/healthz/ready').json()
+
+        self.assertEqual(data['pid'], os.getpid())
+        self.assertIn('caches', data)
+
+    @override_settings(HEALTHZ_DETAILS=True)
+    def test_details_setting_shows_diagnostics(self, model_status):
+        self.assertIn('memory', Client().get('/healthz/ready').json())
+
+
+@override_settings(OPENROUTER_API_KEY='test')
+class LLMClientTests(TestCase):
+    """Services share one pooled client per process, and tests can swap its transport"""
+
+    def setUp(self):
+        self.requests = []
+        self.addCleanup(llm_clients.set_transport)
+
+    def completion(self, request):
+        self.requests.append(request)
+        return httpx.Response(200, json={
+            'id': 'mock',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': 'mock',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': 'A mocked section.'},
+                'finish_reason': 'stop',
+            }],
+        })
+
+    def test_services_share_client_over_injected_transport(self):
+        llm_clients.set_transport(httpx.MockTransport(self.completion))
+
+        openrouter = OpenRouterService()
+        self.assertIs(openrouter.client, OpenRouterService().client)
+        self.assertIs(openrouter.client, ChatService().client)
+
+        section = openrouter.generate_movie_section({'title': 'Mocked'}, 'production')
+        self.assertEqual(section, 'A mocked section.')
+        self.assertEqual(len(self.requests), 1)
+        self.assertTrue(self.requests[0].url.path.endswith('/chat/completions'))
+
+    def test_async_client_per_event_loop_over_injected_transport(self):
+        llm_clients.set_transport(httpx.MockTransport(self.completion))
+
+        async def complete():
+            client = llm_clients.get_async_client()
+            self.assertIs(client, llm_clients.get_async_client())
+            response = await client.chat.completions.create(model='mock', messages=[])
+            return client, response.choices[0].message.content
+
+        first, answer = asyncio.run(complete())
+        second, _ = asyncio.run(complete())
+
+        self.assertEqual(answer, 'A mocked section.')
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.requests), 2)
+
+    @override_settings(LLM_HTTP2=False)
+    def test_calls_reuse_one_connection(self):
+        llm = StandInLLM(latency=0).start()
+        self.addCleanup(llm.stop)
+
+        with override_settings(OPENROUTER_BASE_URL=llm.base_url):
+            llm_clients.reset_clients()
+            for _ in range(3):
+                ChatService()._complete([{'role': 'user', 'content': 'Hello'}])
+
+        self.assertEqual(llm.calls, 3)
+        self.assertEqual(llm.connections, 1)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -6,6 +7,12 @@ from .auth_views import (register, login, logout, update_profile, user_profile)
 from . import views as legacy_views
 from . import chat_views
 
+# ASGI deployments answer chat with the async views (see flickora/asgi.py)
+if settings.CHAT_ASYNC_VIEWS:
+    chat_send, chat_stream = chat_views.send_chat_message_async, chat_views.stream_chat_message_async
+else:
+    chat_send, chat_stream = chat_views.send_chat_message, chat_views.stream_chat_message
+
 router = DefaultRouter()
 router.register(r'genres', GenreViewSet, basename = 'genre')
 router.register(r'movies', MovieViewSet, basename = 'movie')
@@ -22,7 +29,8 @@ urlpatterns = [
     path('auth/profile/', user_profile, name='user_profile'),
     path('auth/profile/update/', update_profile, name='update_profile'),
     
-    path('chat/send/', chat_views.send_chat_message, name='chat_send'),
+    path('chat/send/', chat_send, name='chat_send'),
+    path('chat/stream/', chat_stream, name='chat_stream'),
     
     path('import-movie/', legacy_views.import_movie, name='api_import_movie'),
     path('generate-section/', legacy_views.generate_section, name='api_generate_section'),
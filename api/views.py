@@ -138,24 +138,24 @@ def generate_embedding(request):
         
         section = MovieSection.objects.get(id=section_id)
         
-        if section.embedding is not None and len(section.embedding) > 0:
-            return JsonResponse({'error': 'Embedding already exists'}, status=400)
-        
         rag = RAGService()
         
+        if not rag.needs_embedding(MovieSection.objects.filter(id=section.id)).exists():
+            return JsonResponse({'error': 'Embedding already exists'}, status=400)
+        
         try:
             logger.info(f"Generating embedding for section {section_id}")
-            embedding = rag.generate_embedding(section.content)
-            
-            section.embedding = embedding
-            section.save(update_fields=['embedding'])
+            # Written to the version this process serves, like every other write path
+            for _, error in rag.embed_sections([section]):
+                if error is not None:
+                    raise error
             
             logger.info(f"Successfully generated embedding for section {section_id}")
             
             return JsonResponse({
                 'success': True,
                 'section_id': section.id,
-                'embedding_dimensions': len(embedding) if embedding is not None else 0
+                'embedding_dimensions': rag.embedding_dim
             })
             
         except Exception as e:
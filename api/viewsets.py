@@ -1,5 +1,6 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.db.models import Q, Count
@@ -75,19 +76,12 @@ class MovieViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['get'])
     def similar(self, request, pk=None):
-        """Get similar movies from TMDB that exist in our database"""
-        movie = self.get_object()
-        tmdb = TMDBService()
-        similar_data = tmdb.get_similar_movies(movie.tmdb_id)
-        
-        if not similar_data:
-            return Response({'similar': []})
-        
-        tmdb_ids = [m['id'] for m in similar_data.get('results', [])[:20]]
+        """Get similar movies, precomputed from section embeddings and genres"""
+        movie = get_object_or_404(Movie.objects.only('id'), pk=pk)
         
         similar_movies = Movie.objects.filter(
-            tmdb_id__in=tmdb_ids
-        ).prefetch_related('genres')[:4]
+            similar_to__movie=movie
+        ).order_by('similar_to__rank').prefetch_related('genres')[:4]
         
         serializer = MovieListSerializer(similar_movies, many=True)
         return Response({'similar': serializer.data})
@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('message/', views.chat_message, name='chat_message'),
+    path(
+        'message/',
+        views.chat_message_async if settings.CHAT_ASYNC_VIEWS else views.chat_message,
+        name='chat_message'
+    ),
 ]
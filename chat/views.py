@@ -1,8 +1,8 @@
-from django.http import JsonResponse
+from django.http import HttpResponseNotAllowed, JsonResponse
 from django.views.decorators.http import require_POST
 import json
 from .models import ChatConversation, ChatMessage
-from services.chat_service import ChatService
+from services.chat_service import ChatService, run_in_chat_pool
 from django.views.decorators.csrf import csrf_exempt 
 
 @csrf_exempt
@@ -60,4 +60,72 @@ def chat_message(request):
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def chat_message_async(request):
+    """chat_message for ASGI deployments (CHAT_ASYNC_VIEWS)"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    
+    try:
+        data = json.loads(request.body)
+        message = data.get('message')
+        movie_id = data.get('movie_id')
+        
+        # Validation
+        if not message:
+            return JsonResponse({'error': 'Message is required'}, status=400)
+        
+        # Create conversation
+        conversation = await run_in_chat_pool(
+            ChatConversation.objects.create,
+            conversation_type='movie' if movie_id else 'global',
+            movie_id=movie_id
+        )
+        
+        # Save user message
+        await run_in_chat_pool(
+            ChatMessage.objects.create,
+            conversation=conversation,
+            role='user',
+            content=message
+        )
+        
+        # Get AI response without holding a thread; building the service
+        # can hit the database (serving_version), so not on the event loop
+        chat_service = await run_in_chat_pool(ChatService)
+        result = await chat_service.achat(message, movie_id)
+        
+        # Save assistant message
+        await run_in_chat_pool(
+            ChatMessage.objects.create,
+            conversation=conversation,
+            role='assistant',
+            content=result['message']
+        )
+        
+        # Serialize sources (convert MovieSection objects to dicts)
+        serialized_sources = [
+            {
+                'section_id': source['section_id'],
+                'similarity': source['similarity'],
+                'movie_title': source['movie_title'],
+                'section_type': source['section_type']
+            }
+            for source in result['sources']
+        ]
+        
+        return JsonResponse({
+            'message': result['message'],
+            'sources': serialized_sources
+        })
+    
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# Django 4.2's csrf_exempt would turn it into a sync view
+chat_message_async.csrf_exempt = True
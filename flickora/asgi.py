@@ -12,5 +12,20 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "flickora.settings")
+# Chat endpoints are served by the async views here (CHAT_ASYNC_VIEWS)
+os.environ.setdefault("CHAT_ASYNC_VIEWS", "True")
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from services.ann_index import build_section_index  # noqa: E402
+from services.embedding_versions import serving_version  # noqa: E402
+
+# Decided here, where the ORM may block, rather than on the first chat's event loop
+serving_version()
+build_section_index()
+
+if settings.RAG_PRELOAD_MODEL:
+    from services.rag_service import preload_model
+
+    preload_model()
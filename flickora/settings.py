@@ -132,6 +132,18 @@ else:
     }
 
 
+# Cache
+# Shared Redis cache when REDIS_URL is set (Railway), per-process memory otherwise
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -181,6 +193,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 TMDB_API_KEY = os.getenv('TMDB_API_KEY')
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+# OpenAI-compatible API the chat calls (a local stand-in for `manage.py loadtest_chat`)
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 
@@ -231,4 +245,145 @@ LOGGING = {
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
+
+# Retrieval (RAG)
+# In-process HNSW index over section embeddings (requires hnswlib);
+# when disabled, every search goes to pgvector. Embeddings written by other
+# processes (management commands) reach it through RAG_RETRIEVAL_CACHE's
+# shared counters with a shared cache, otherwise on the MAX_AGE rebuild.
+RAG_ANN_INDEX = os.getenv('RAG_ANN_INDEX', 'False') == 'True'
+RAG_ANN_M = int(os.getenv('RAG_ANN_M', '16'))
+RAG_ANN_EF_CONSTRUCTION = int(os.getenv('RAG_ANN_EF_CONSTRUCTION', '200'))
+RAG_ANN_EF_SEARCH = int(os.getenv('RAG_ANN_EF_SEARCH', '64'))
+RAG_ANN_MAX_AGE = int(os.getenv('RAG_ANN_MAX_AGE', '600'))  # seconds, 0 = never rebuild
+
+# pgvector query-time tuning, applied with SET LOCAL around each search
+# (empty = server default: hnsw.ef_search 40, ivfflat.probes 1)
+RAG_HNSW_EF_SEARCH = int(os.getenv('RAG_HNSW_EF_SEARCH', '0')) or None
+RAG_IVFFLAT_PROBES = int(os.getenv('RAG_IVFFLAT_PROBES', '0')) or None
+
+# LRU cache for query embeddings (0 disables), optional TTL in seconds
+RAG_QUERY_CACHE_SIZE = int(os.getenv('RAG_QUERY_CACHE_SIZE', '1024'))
+RAG_QUERY_CACHE_TTL = int(os.getenv('RAG_QUERY_CACHE_TTL', '0')) or None
+
+# Cache of retrieval results (section ids and scores) per query and movie,
+# invalidated on section writes. Use a shared cache (REDIS_URL) with several
+# workers, or invalidations from commands only reach entries via the TTL.
+RAG_RETRIEVAL_CACHE = os.getenv('RAG_RETRIEVAL_CACHE', 'False') == 'True'
+RAG_RETRIEVAL_CACHE_ALIAS = os.getenv('RAG_RETRIEVAL_CACHE_ALIAS', 'default')
+RAG_RETRIEVAL_CACHE_TTL = int(os.getenv('RAG_RETRIEVAL_CACHE_TTL', '300'))
+
+# Movie-scoped chat ranks the movie's sections in memory: number of movies
+# whose section embeddings each worker keeps (0 disables), TTL in seconds.
+# With RAG_RETRIEVAL_CACHE on, its shared counters also expire these entries.
+RAG_MOVIE_MATRIX_CACHE_SIZE = int(os.getenv('RAG_MOVIE_MATRIX_CACHE_SIZE', '0'))
+RAG_MOVIE_MATRIX_CACHE_TTL = int(os.getenv('RAG_MOVIE_MATRIX_CACHE_TTL', '300')) or None
+
+# Two-stage global chat: pick the N movies whose centroid (mean section
+# embedding) is nearest the query, then rank only their sections. Smaller N is
+# faster but can miss sections of other movies; 0 ranks every section.
+# Run `manage.py build_movie_embeddings` before enabling on existing data.
+RAG_TWO_STAGE_MOVIES = int(os.getenv('RAG_TWO_STAGE_MOVIES', '0'))
+
+# "Similar movies" from movie centroids blended with genre overlap (Jaccard,
+# this share of the score); neighbours stored per movie by
+# `manage.py compute_similar_movies`, which refreshes only what changed.
+# REFRESH_ON_SAVE runs that refresh once per transaction that changes
+# sections or genres; bulk commands and admin actions run it once at their
+# end (bulk_section_writes in reports/signals.py).
+SIMILAR_MOVIES_COUNT = int(os.getenv('SIMILAR_MOVIES_COUNT', '12'))
+SIMILAR_MOVIES_GENRE_WEIGHT = float(os.getenv('SIMILAR_MOVIES_GENRE_WEIGHT', '0.2'))
+SIMILAR_MOVIES_REFRESH_ON_SAVE = os.getenv('SIMILAR_MOVIES_REFRESH_ON_SAVE', 'True') == 'True'
+
+# Semantic answer cache: reuse a chat answer for a query within THRESHOLD
+# cosine similarity of an earlier one in the same movie scope, as long as
+# its source sections are unchanged. Size 0 disables; TTL in seconds.
+RAG_ANSWER_CACHE_SIZE = int(os.getenv('RAG_ANSWER_CACHE_SIZE', '0'))
+RAG_ANSWER_CACHE_TTL = int(os.getenv('RAG_ANSWER_CACHE_TTL', '3600')) or None
+RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv('RAG_ANSWER_CACHE_THRESHOLD', '0.92'))
+
+# Embedding model versions. RAG_EMBEDDING_MODEL fills MovieSection.embedding
+# (384 dimensions). `manage.py reembed_sections` embeds every section with
+# RAG_NEXT_EMBEDDING_MODEL into the SectionEmbedding shadow table while the
+# current model keeps serving; RAG_SERVE_NEXT_EMBEDDINGS then switches queries
+# and retrieval to it, in each process that starts once coverage is 100%.
+RAG_EMBEDDING_MODEL = os.getenv('RAG_EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+RAG_NEXT_EMBEDDING_MODEL = os.getenv('RAG_NEXT_EMBEDDING_MODEL', '')
+RAG_NEXT_EMBEDDING_DIM = int(os.getenv('RAG_NEXT_EMBEDDING_DIM', '384'))
+RAG_SERVE_NEXT_EMBEDDINGS = os.getenv('RAG_SERVE_NEXT_EMBEDDINGS', 'False') == 'True'
+
+# Texts per forward pass for bulk embedding (commands, admin actions)
+RAG_EMBEDDING_BATCH_SIZE = int(os.getenv('RAG_EMBEDDING_BATCH_SIZE', '32'))
+
+# Micro-batch concurrent query embeddings into one forward pass
+RAG_BATCHER_ENABLED = os.getenv('RAG_BATCHER_ENABLED', 'False') == 'True'
+RAG_BATCHER_MAX_BATCH = int(os.getenv('RAG_BATCHER_MAX_BATCH', '16'))
+RAG_BATCHER_MAX_WAIT_MS = float(os.getenv('RAG_BATCHER_MAX_WAIT_MS', '5'))
+
+# Store unit-length embeddings and rank with inner product (<#>).
+# Run `manage.py normalize_embeddings` before enabling on existing data, and
+# `manage.py vector_index_status --sync-metric-index` with the new value to
+# swap the HNSW indexes (only the metric in use is indexed).
+RAG_NORMALIZE_EMBEDDINGS = os.getenv('RAG_NORMALIZE_EMBEDDINGS', 'False') == 'True'
+
+# Passage-level retrieval over SectionChunk instead of whole sections.
+# Run `manage.py generate_chunks` before enabling on existing data.
+RAG_CHUNKS_ENABLED = os.getenv('RAG_CHUNKS_ENABLED', 'False') == 'True'
+RAG_CHUNK_WORDS = int(os.getenv('RAG_CHUNK_WORDS', '120'))
+RAG_CHUNK_OVERLAP = int(os.getenv('RAG_CHUNK_OVERLAP', '30'))
+
+# vector: embeddings only; hybrid: fuse with Postgres full-text rank (RRF);
+# auto: hybrid for fact-style queries (names, titles, figures), vector otherwise
+RAG_RETRIEVAL_MODE = os.getenv('RAG_RETRIEVAL_MODE', 'vector')
+
+# First-pass search over compact codes, then exact rescoring of the shortlist:
+# '' (off), 'halfvec' (float16) or 'binary' (1 bit per dimension). Needs
+# pgvector >= 0.7 and migration 0010; if that ran on an older pgvector, run
+# `manage.py vector_index_status --create-missing` after upgrading. The
+# shortlist is OVERSAMPLE times the candidates the rerank needs; binary codes
+# want a larger factor (~10).
+RAG_QUANTIZATION = os.getenv('RAG_QUANTIZATION', '')
+RAG_QUANTIZATION_OVERSAMPLE = int(os.getenv('RAG_QUANTIZATION_OVERSAMPLE', '4'))
+
+# Embedding backend: torch (sentence-transformers) or onnx (ONNX Runtime over
+# the export from `manage.py export_onnx_model`; falls back to torch if missing)
+RAG_EMBEDDING_BACKEND = os.getenv('RAG_EMBEDDING_BACKEND', 'torch')
+RAG_ONNX_MODEL_DIR = os.getenv('RAG_ONNX_MODEL_DIR', str(BASE_DIR / 'models' / 'all-MiniLM-L6-v2-onnx'))
+RAG_ONNX_QUANTIZED = os.getenv('RAG_ONNX_QUANTIZED', 'False') == 'True'
+RAG_EMBEDDING_THREADS = int(os.getenv('RAG_EMBEDDING_THREADS', '0')) or None  # None = library default
+
+# Load and warm up the embedding model when the app is imported instead of on
+# the first chat request. Under gunicorn this also turns on preload_app
+# (gunicorn.conf.py), so the master loads it once and workers share it.
+RAG_PRELOAD_MODEL = os.getenv('RAG_PRELOAD_MODEL', 'False') == 'True'
+
+# /healthz/ready answers {"ready": ...} plus the status code; the model,
+# database, memory and cache details are for staff users, or for everyone
+# when HEALTHZ_DETAILS is on (private networks only)
+HEALTHZ_DETAILS = os.getenv('HEALTHZ_DETAILS', 'False') == 'True'
+
+# Shared embedding server (`manage.py embedding_server`): unix:///path/to.sock
+# or http://127.0.0.1:8601. Empty = every process loads its own model. If the
+# server is unreachable, encoding falls back to RAG_EMBEDDING_BACKEND in-process.
+RAG_EMBEDDING_SERVER = os.getenv('RAG_EMBEDDING_SERVER', '')
+RAG_EMBEDDING_SERVER_TIMEOUT = float(os.getenv('RAG_EMBEDDING_SERVER_TIMEOUT', '5'))
+
+# Async chat views (AsyncOpenAI), on by default under ASGI (flickora/asgi.py);
+# WSGI keeps the sync views. Their embedding, retrieval and database writes run
+# on a pool of CHAT_POOL_THREADS threads: however many chats are in flight, at
+# most that many encode or hold a database connection at once.
+CHAT_ASYNC_VIEWS = os.getenv('CHAT_ASYNC_VIEWS', 'False') == 'True'
+CHAT_POOL_THREADS = int(os.getenv('CHAT_POOL_THREADS', '4'))
+
+# HTTP connections to the LLM API, pooled by one client per process
+# (services/llm_clients.py) and kept alive between requests. HTTP/2 multiplexes
+# concurrent chats over a connection when the optional h2 package is installed.
+# Connect timeout fails fast on an unreachable API; read timeout covers the
+# slowest completion (report sections), in seconds.
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '100'))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '20'))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '60'))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', '120'))
+LLM_HTTP2 = os.getenv('LLM_HTTP2', 'True') == 'True'
@@ -19,12 +19,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from . import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('movies.urls')),
     path('chat/', include('chat.urls')),
     path('api/', include('api.urls')),
+    path('healthz/ready', views.ready, name='healthz-ready'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+from services import chat_service, rag_service
+import os
+import resource
+import threading
+
+_model_loading = threading.Lock()
+
+
+def process_memory():
+    """
+    Memory of this process in MB. PSS splits pages shared copy-on-write with
+    the gunicorn master (preloaded model weights) across the workers using them.
+    """
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    memory[key.lower() + '_mb'] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        # No /proc (macOS): peak RSS only, reported in bytes there
+        memory['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024, 1)
+    return memory
+
+
+def _load_model_in_background():
+    if not _model_loading.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            rag_service.preload_model()
+        finally:
+            _model_loading.release()
+
+    threading.Thread(target=run, name='embedding-model-load', daemon=True).start()
+
+
+def cache_stats():
+    """Hit rates of this worker's embedding, retrieval and answer caches"""
+    caches = {
+        'query_embeddings': rag_service.get_query_cache(),
+        'retrieval': rag_service.get_retrieval_cache(),
+        'movie_matrices': rag_service.get_movie_matrix_cache(),
+        'answers': chat_service.get_answer_cache(),
+    }
+    return {name: cache.stats() if cache is not None else None for name, cache in caches.items()}
+
+
+def ready(request):
+    """
+    Readiness probe: 200 once the embedding model is loaded and the database
+    answers, 503 before. A worker that has not loaded the model yet starts
+    loading it in the background, so probes alone bring it to ready.
+    Diagnostics are only shown to staff, or with HEALTHZ_DETAILS.
+    """
+    model = rag_service.model_status()
+    if not model['loaded']:
+        _load_model_in_background()
+
+    database = {'ok': True}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception as e:
+        database = {'ok': False, 'error': str(e)}
+
+    is_ready = model['loaded'] and database['ok']
+    status = 200 if is_ready else 503
+
+    if not (settings.HEALTHZ_DETAILS or request.user.is_staff):
+        return JsonResponse({'ready': is_ready}, status=status)
+
+    return JsonResponse(
+        {
+            'ready': is_ready,
+            'model': model,
+            'database': database,
+            'pid': os.getpid(),
+            'memory': process_memory(),
+            'caches': cache_stats(),
+        },
+        status=status
+    )
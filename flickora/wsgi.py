@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "flickora.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+from services.ann_index import build_section_index  # noqa: E402
+
+build_section_index()
+
+if settings.RAG_PRELOAD_MODEL:
+    from services.rag_service import preload_model
+
+    preload_model()
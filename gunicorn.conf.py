@@ -0,0 +1,38 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn starts from the
+project root. Command-line options still override anything set here.
+
+RAG_PRELOAD_MODEL=True imports the app in the master before forking, which
+loads and warms up the embedding model once (see flickora/wsgi.py); workers
+start ready and share the weights copy-on-write.
+"""
+import os
+import time
+
+preload_app = os.getenv('RAG_PRELOAD_MODEL', 'False') == 'True'
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Workers must not inherit the master's database connections
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+
+    from flickora.views import process_memory
+    from services.rag_service import reset_model_after_fork
+
+    started = time.monotonic()
+    warm_up = reset_model_after_fork()
+    memory = process_memory()
+
+    server.log.info(
+        f"Worker {worker.pid} ready in {time.monotonic() - started:.2f}s "
+        f"(warm-up {warm_up * 1000 if warm_up else 0:.0f}ms, "
+        f"rss {memory.get('rss_mb')}MB, pss {memory.get('pss_mb')}MB)"
+    )
@@ -211,29 +211,30 @@ class MovieAdmin(admin.ModelAdmin):
     @admin.action(description='🔧 Regenerate embeddings for selected movies')
     def regenerate_embeddings_action(self, request, queryset):
         from services.rag_service import RAGService
+        from reports.models import MovieSection
         
         rag = RAGService()
         total_processed = 0
         
-        for movie in queryset:
-            sections = movie.sections.all()
-            
-            for section in sections:
-                try:
-                    embedding = rag.generate_embedding(section.content)
-                    section.embedding = embedding
-                    section.save(update_fields=['embedding'])
-                    total_processed += 1
-                except Exception as e:
-                    self.message_user(
-                        request,
-                        f'Error generating embedding for {movie.title} - {section.section_type}: {str(e)}',
-                        level=messages.ERROR
-                    )
+        movie_ids = list(queryset.values_list('id', flat=True))
+        sections = MovieSection.objects.filter(movie_id__in=movie_ids)
+        stale = rag.needs_embedding(sections)
+        skipped = sections.count() - stale.count()
+        
+        for section, error in rag.embed_sections(stale.select_related('movie')):
+            if error is None:
+                total_processed += 1
+            else:
+                self.message_user(
+                    request,
+                    f'Error generating embedding for {section.movie.title} - {section.section_type}: {str(error)}',
+                    level=messages.ERROR
+                )
         
         self.message_user(
             request,
-            f'Generated {total_processed} embeddings for {queryset.count()} movie(s)',
+            f'Generated {total_processed} embeddings for {queryset.count()} movie(s)'
+            f' ({skipped} unchanged, skipped)',
             level=messages.SUCCESS
         )
     
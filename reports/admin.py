@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.contrib import messages
 from .models import MovieSection
+from .signals import bulk_section_writes
 
 
 @admin.register(MovieSection)
@@ -59,6 +60,7 @@ class MovieSectionAdmin(admin.ModelAdmin):
     embedding_info.short_description = 'Embedding Info'
     
     @admin.action(description='🔧 Regenerate embeddings for selected sections')
+    @bulk_section_writes()
     def regenerate_embeddings(self, request, queryset):
         from services.rag_service import RAGService
         
@@ -66,17 +68,17 @@ class MovieSectionAdmin(admin.ModelAdmin):
         success = 0
         failed = 0
         
-        for section in queryset:
-            try:
-                embedding = rag.generate_embedding(section.content)
-                section.embedding = embedding
-                section.save(update_fields=['embedding'])
+        sections = rag.needs_embedding(queryset)
+        skipped = queryset.count() - sections.count()
+        
+        for section, error in rag.embed_sections(sections.select_related('movie')):
+            if error is None:
                 success += 1
-            except Exception as e:
+            else:
                 failed += 1
                 self.message_user(
                     request,
-                    f'Failed for {section.movie.title} - {section.section_type}: {str(e)}',
+                    f'Failed for {section.movie.title} - {section.section_type}: {str(error)}',
                     level=messages.ERROR
                 )
         
@@ -93,8 +95,16 @@ class MovieSectionAdmin(admin.ModelAdmin):
                 f'Failed to generate {failed} embeddings',
                 level=messages.ERROR
             )
+        
+        if skipped > 0:
+            self.message_user(
+                request,
+                f'Skipped {skipped} embeddings already up to date (same content and model)',
+                level=messages.INFO
+            )
     
     @admin.action(description='❌ Delete embeddings (keep content)')
+    @bulk_section_writes()
     def delete_embeddings(self, request, queryset):
         count = 0
         for section in queryset:
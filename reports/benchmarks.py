@@ -0,0 +1,446 @@
+"""
+Helpers for retrieval benchmarks on synthetic data.
+
+scratch_schema() shadows the movie and section tables with empty copies in
+a scratch schema placed first on the search_path, so the unmodified ORM and
+RAGService code runs against synthetic rows and real data is never touched.
+
+ExactIndex is the brute-force NumPy reference: the same ranking as
+RAGService (k*3 nearest by cosine, then section weights) with no index, so
+it gives the true results that recall is measured against.
+
+StandInLLM is a local OpenAI-compatible chat completions endpoint with a
+fixed response time, for chat load tests that should measure the app and
+not the provider.
+"""
+from contextlib import contextmanager
+from django.db import connection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from movies.models import Movie
+from reports.models import MovieEmbedding, MovieSection
+import json
+import numpy as np
+import threading
+import time
+
+BENCH_SCHEMA = 'flickora_bench'
+
+SECTION_TYPES = [section_type for section_type, _ in MovieSection.SECTION_TYPES]
+
+
+@contextmanager
+def scratch_schema():
+    tables = [Movie._meta.db_table, MovieSection._meta.db_table, MovieEmbedding._meta.db_table]
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT current_schema()')
+        source_schema = cursor.fetchone()[0]
+
+        cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+        cursor.execute(f'CREATE SCHEMA {BENCH_SCHEMA}')
+        for table in tables:
+            cursor.execute(
+                f'CREATE TABLE {BENCH_SCHEMA}."{table}" '
+                f'(LIKE "{source_schema}"."{table}" INCLUDING DEFAULTS INCLUDING IDENTITY)'
+            )
+        cursor.execute(f'SET search_path TO {BENCH_SCHEMA}, "{source_schema}"')
+
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('RESET search_path')
+            cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+
+
+def load_synthetic_corpus(n_movies, seed=42, dim=384, content_words=450, cohesion=0.0):
+    """
+    Fill the scratch tables with n_movies x 8 sections of seeded random
+    embeddings, generated server-side so large corpora load quickly. With
+    cohesion > 0 each section is that share of a per-movie topic vector
+    plus noise, so a movie's sections resemble each other as real ones do.
+    """
+    movie_table = Movie._meta.db_table
+    section_table = MovieSection._meta.db_table
+    filler = 'synthetic analysis text '
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT setseed(%s)', [(seed % 1000) / 1000.0])
+
+        cursor.execute(
+            f"""
+            INSERT INTO "{movie_table}"
+                (id, tmdb_id, title, year, director, plot_summary,
+                 poster_url, backdrop_url, created_at, updated_at)
+            SELECT g, -g, 'Synthetic movie ' || g, 2000 + g %% 25, '', '', '', '', now(), now()
+            FROM generate_series(1, %s) g
+            """,
+            [n_movies]
+        )
+
+        # The correlated subquery forces one fresh random vector per row
+        cursor.execute(
+            f"""
+            WITH topics AS (
+                SELECT m, array_agg(random() - 0.5 ORDER BY d) AS topic
+                FROM generate_series(1, %s) m
+                CROSS JOIN generate_series(1, %s) d
+                GROUP BY m
+            )
+            INSERT INTO "{section_table}"
+                (id, movie_id, section_type, content, word_count, key_topics, generated_at,
+                 content_hash, embedding_model, embedding)
+            SELECT (m - 1) * %s + t.ord, m, t.section_type, repeat(%s, %s), %s, '[]'::jsonb, now(), '', '',
+                   (SELECT array_agg(%s * topic[d] + (1 - %s) * (random() - 0.5) ORDER BY d)
+                    FROM generate_series(1, %s) d
+                    WHERE m > 0 AND t.ord > 0)::vector
+            FROM topics
+            CROSS JOIN unnest(%s::text[]) WITH ORDINALITY AS t(section_type, ord)
+            """,
+            [
+                n_movies, dim,
+                len(SECTION_TYPES), filler, content_words // 3, content_words,
+                cohesion, cohesion, dim, SECTION_TYPES,
+            ]
+        )
+
+
+def create_indexes(maintenance_work_mem='512MB'):
+    """Primary keys, movie FK index and the HNSW index, then ANALYZE."""
+    movie_table = Movie._meta.db_table
+    section_table = MovieSection._meta.db_table
+    centroid_table = MovieEmbedding._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SET maintenance_work_mem = '{maintenance_work_mem}'")
+        cursor.execute(f'ALTER TABLE "{movie_table}" ADD PRIMARY KEY (id)')
+        cursor.execute(f'ALTER TABLE "{section_table}" ADD PRIMARY KEY (id)')
+        cursor.execute(f'ALTER TABLE "{centroid_table}" ADD PRIMARY KEY (movie_id)')
+        cursor.execute(f'CREATE INDEX ON "{section_table}" (movie_id)')
+
+        started = time.time()
+        cursor.execute(
+            f'CREATE INDEX ON "{section_table}" USING hnsw (embedding vector_cosine_ops) '
+            f'WITH (m = 16, ef_construction = 64)'
+        )
+        build_seconds = time.time() - started
+
+        cursor.execute(f'ANALYZE "{movie_table}"')
+        cursor.execute(f'ANALYZE "{section_table}"')
+        cursor.execute('RESET maintenance_work_mem')
+
+    return build_seconds
+
+
+def load_movie_embeddings(maintenance_work_mem='512MB'):
+    """
+    Centroids of the scratch movies and their HNSW index, for two-stage
+    retrieval. Returns (centroid seconds, index build seconds).
+    """
+    from services.rag_service import refresh_movie_embeddings
+
+    centroid_table = MovieEmbedding._meta.db_table
+
+    started = time.time()
+    refresh_movie_embeddings()
+    centroid_seconds = time.time() - started
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SET maintenance_work_mem = '{maintenance_work_mem}'")
+        started = time.time()
+        cursor.execute(
+            f'CREATE INDEX ON "{centroid_table}" USING hnsw (embedding vector_cosine_ops) '
+            f'WITH (m = 16, ef_construction = 64)'
+        )
+        build_seconds = time.time() - started
+        cursor.execute(f'ANALYZE "{centroid_table}"')
+        cursor.execute('RESET maintenance_work_mem')
+
+    return centroid_seconds, build_seconds
+
+
+def create_quantized_indexes(dim=384, maintenance_work_mem='512MB'):
+    """
+    The halfvec and binary expression indexes of migration 0010 on the
+    scratch table (pgvector >= 0.7). Returns {index name: build seconds}.
+    """
+    section_table = MovieSection._meta.db_table
+    indexes = {
+        'bench_embedding_half_hnsw': f'(embedding::halfvec({dim})) halfvec_cosine_ops',
+        'bench_embedding_bit_hnsw': f'(binary_quantize(embedding)::bit({dim})) bit_hamming_ops',
+    }
+    timings = {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SET maintenance_work_mem = '{maintenance_work_mem}'")
+        for name, expression in indexes.items():
+            started = time.time()
+            cursor.execute(
+                f'CREATE INDEX {name} ON "{section_table}" USING hnsw ({expression}) '
+                f'WITH (m = 16, ef_construction = 64)'
+            )
+            timings[name] = time.time() - started
+        cursor.execute('RESET maintenance_work_mem')
+
+    return timings
+
+
+def index_sizes():
+    """{index name: bytes} for the vector indexes on the current section table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_relation_size(c.oid)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE i.indrelid = %s::regclass AND am.amname IN ('hnsw', 'ivfflat')
+            ORDER BY c.relname
+            """,
+            [MovieSection._meta.db_table]
+        )
+        return dict(cursor.fetchall())
+
+
+def pgvector_version():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+    return tuple(int(part) for part in row[0].split('.'))
+
+
+def fetch_corpus():
+    """(ids, movie_ids, section_types, embeddings) of every embedded section in the current tables"""
+    rows = MovieSection.objects.filter(embedding__isnull=False).order_by('id').values_list(
+        'id', 'movie_id', 'section_type', 'embedding'
+    )
+
+    ids, movie_ids, section_types, embeddings = [], [], [], []
+    for section_id, movie_id, section_type, embedding in rows.iterator(chunk_size=5000):
+        ids.append(section_id)
+        movie_ids.append(movie_id)
+        section_types.append(section_type)
+        embeddings.append(embedding)
+
+    return ids, movie_ids, section_types, np.asarray(embeddings, dtype='float32')
+
+
+def synthetic_corpus(n_movies, seed=42, dim=384, cohesion=0.0):
+    """
+    In-memory counterpart of load_synthetic_corpus() for runs without
+    PostgreSQL: same ids and layout, vectors from NumPy's generator
+    """
+    rng = np.random.default_rng(seed)
+    n_types = len(SECTION_TYPES)
+
+    ids = np.arange(1, n_movies * n_types + 1)
+    movie_ids = np.repeat(np.arange(1, n_movies + 1), n_types)
+    section_types = SECTION_TYPES * n_movies
+    topics = np.repeat(rng.random((n_movies, dim), dtype='float32') - 0.5, n_types, axis=0)
+    embeddings = cohesion * topics + (1 - cohesion) * (rng.random((len(ids), dim), dtype='float32') - 0.5)
+
+    return ids, movie_ids, section_types, embeddings
+
+
+class ExactIndex:
+    def __init__(self, ids, movie_ids, section_types, embeddings):
+        from services.rag_service import SECTION_WEIGHTS
+
+        self.ids = np.asarray(ids, dtype='int64')
+        self.weights = {
+            query_type: np.array([weights.get(t, 1.0) for t in section_types], dtype='float32')
+            for query_type, weights in SECTION_WEIGHTS.items()
+        }
+
+        matrix = np.asarray(embeddings, dtype='float32')
+        self.matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        movie_ids = np.asarray(movie_ids)
+        order = np.argsort(movie_ids, kind='stable')
+        movies, starts = np.unique(movie_ids[order], return_index=True)
+        self.movie_rows = dict(zip(movies.tolist(), np.split(order, starts[1:])))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query_embedding, query_type, k, movie_id=None):
+        """Section ids in rank order"""
+        rows = None
+        if movie_id is not None:
+            rows = self.movie_rows.get(movie_id)
+            if rows is None:
+                return []
+
+        query_embedding = np.asarray(query_embedding, dtype='float32')
+        query_embedding = query_embedding / max(np.linalg.norm(query_embedding), 1e-12)
+
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        distances = 1.0 - matrix @ query_embedding
+
+        limit = min(k*3, len(distances))
+        nearest = np.argpartition(distances, limit - 1)[:limit] if limit < len(distances) else np.arange(limit)
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+
+        positions = nearest if rows is None else rows[nearest]
+        weights = self.weights.get(query_type, self.weights['general'])[positions]
+        scores = (1.0 - distances[nearest]) * weights
+
+        # Highest weighted score first, nearer distance breaks ties
+        order = np.lexsort((distances[nearest], -scores))[:k]
+        return self.ids[positions[order]].tolist()
+
+
+def random_queries(n, seed=0, dim=384):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n, dim), dtype='float32') - 0.5).astype('float32')
+
+
+def row_bytes(section):
+    """Approximate payload of one fetched MovieSection row."""
+    size = 64
+    if 'content' in section.__dict__:
+        size += len(section.content.encode())
+    if section.__dict__.get('embedding') is not None:
+        size += np.asarray(section.embedding, dtype='float32').nbytes
+    return size
+
+
+def latency_summary(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99)),
+        'mean': float(samples.mean()),
+    }
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of chats open their connections at once
+    request_queue_size = 1024
+
+
+class StandInLLM:
+    """
+    Answers POST .../chat/completions on 127.0.0.1 after `latency` seconds,
+    spread over the chunks when the request asks for a stream. Tracks how
+    many calls are in flight at once, and how many connections they came on.
+    """
+    ANSWER = 'This is a stand-in answer. It took as long as a real one would.'
+
+    def __init__(self, latency=2.0, port=0):
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        self.server = _StandInServer(('127.0.0.1', port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='stand-in-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.connections = 0
+            self.peak_in_flight = self.in_flight
+
+    def _connect(self):
+        with self._lock:
+            self.connections += 1
+
+    def _enter(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler_class(self):
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                llm._connect()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                llm._enter()
+                try:
+                    if body.get('stream'):
+                        self._stream(body)
+                    else:
+                        time.sleep(llm.latency)
+                        self._send_json(body)
+                finally:
+                    llm._leave()
+
+            def _send_json(self, body):
+                payload = json.dumps({
+                    'id': 'stand-in',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'stand-in'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': llm.ANSWER},
+                        'finish_reason': 'stop',
+                    }],
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body):
+                words = llm.ANSWER.split(' ')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for i, word in enumerate(words):
+                    time.sleep(llm.latency / len(words))
+                    chunk = {
+                        'id': 'stand-in',
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': body.get('model', 'stand-in'),
+                        'choices': [{
+                            'index': 0,
+                            'delta': {'content': word if i == 0 else f" {word}"},
+                            'finish_reason': None,
+                        }],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F, FloatField, Func
+from django.db.models.functions import Abs, MD5
+from reports.models import MovieSection
+
+
+class Command(BaseCommand):
+    help = (
+        'Tag embeddings stored before content hashes were tracked with their content hash and model, '
+        'so embedding commands skip sections that have not changed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            default=settings.RAG_EMBEDDING_MODEL,
+            help='Model the stored embeddings came from (default: RAG_EMBEDDING_MODEL)'
+        )
+        parser.add_argument(
+            '--normalized',
+            action='store_true',
+            default=settings.RAG_NORMALIZE_EMBEDDINGS,
+            help='They were stored unit length (default: RAG_NORMALIZE_EMBEDDINGS); only unit-length rows are tagged'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1e-4,
+            help='Rows whose norm is within this distance of 1.0 count as unit length'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count rows that would be tagged'
+        )
+
+    def handle(self, *args, **options):
+        model_id = options['model']
+        if options['normalized']:
+            model_id += '+normalized'
+
+        # Rows written since tracking began already carry a hash
+        rows = MovieSection.objects.filter(embedding__isnull=False, content_hash='')
+        untagged = rows.count()
+        if options['normalized']:
+            # The rest are renormalized or re-encoded by the embedding commands
+            rows = rows.annotate(
+                norm=Func(F('embedding'), function='vector_norm', output_field=FloatField())
+            ).annotate(
+                error=Abs(F('norm') - 1.0)
+            ).filter(error__lte=options['tolerance'])
+
+        self.stdout.write(f"Untagged embeddings: {untagged}")
+        self.stdout.write(f"Tagging as {model_id}: {rows.count()}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("DRY RUN - No data was changed"))
+            return
+
+        tagged = MovieSection.objects.filter(
+            id__in=rows.values('id')
+        ).update(content_hash=MD5('content'), embedding_model=model_id)
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Tagged {tagged} section embeddings"))
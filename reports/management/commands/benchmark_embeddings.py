@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reports.management.commands.export_onnx_model import sample_texts
+import numpy as np
+import time
+
+BACKENDS = {
+    'torch': ('torch', False),
+    'onnx': ('onnx', False),
+    'onnx-int8': ('onnx', True),
+}
+
+
+class Command(BaseCommand):
+    help = 'Embedding throughput (sentences/sec) per backend across batch sizes and thread counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends',
+            nargs='+',
+            choices=list(BACKENDS),
+            default=list(BACKENDS),
+            help='Backends to compare (onnx variants need `manage.py export_onnx_model`)'
+        )
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 64])
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--sentences', type=int, default=256, help='Texts encoded per measurement')
+
+    def handle(self, *args, **options):
+        from services.embedding_backends import OnnxBackend, load_torch_backend
+        from services.rag_service import RAGService
+
+        rag = RAGService()
+        texts = sample_texts(options['sentences'])
+        # Repeat the sample on small databases so every run encodes the same amount
+        texts = (texts * (options['sentences'] // len(texts) + 1))[:options['sentences']]
+
+        self.stdout.write("="*70)
+        self.stdout.write(f"EMBEDDING THROUGHPUT ({len(texts)} texts, sentences/sec)")
+        self.stdout.write("="*70)
+
+        reference = None
+
+        for label in options['backends']:
+            name, quantized = BACKENDS[label]
+
+            for threads in options['threads']:
+                started = time.time()
+                try:
+                    if name == 'onnx':
+                        backend = OnnxBackend(settings.RAG_ONNX_MODEL_DIR, quantized=quantized, threads=threads)
+                    else:
+                        backend = load_torch_backend(rag.model_name, threads=threads)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"\n✗ {label}: {e}"))
+                    break
+                load_seconds = time.time() - started
+
+                self.stdout.write(f"\n⚙️  {label}, {threads} thread(s), loaded in {load_seconds:.2f}s")
+
+                # Warm-up: first calls allocate buffers and pick kernels
+                backend.encode(texts[:8], batch_size=8, show_progress_bar=False)
+
+                for batch_size in options['batch_sizes']:
+                    started = time.perf_counter()
+                    embeddings = backend.encode(texts, batch_size=batch_size, show_progress_bar=False, normalize_embeddings=True)
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f"  batch {batch_size:<4} {len(texts) / elapsed:9.1f} sentences/sec")
+
+                embeddings = np.asarray(embeddings, dtype='float32')
+                if reference is None:
+                    reference = (label, embeddings)
+                elif threads == options['threads'][0]:
+                    similarity = np.sum(reference[1] * embeddings, axis=1)
+                    self.stdout.write(
+                        f"  cosine to {reference[0]}: min {similarity.min():.5f}  mean {similarity.mean():.5f}"
+                    )
+
+        self.stdout.write("\n" + "="*70)
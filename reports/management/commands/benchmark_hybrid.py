@@ -0,0 +1,109 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import connection
+from movies.models import Movie
+from reports import benchmarks
+from reports.models import MovieSection
+import random
+import re
+import time
+
+_WORD = re.compile(r'[a-z]{4,}')
+
+
+class Command(BaseCommand):
+    help = 'Compare hybrid (full-text + vector) and pure-vector retrieval on known-item queries: latency and recall@k'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=100, help='Queries per query set')
+        parser.add_argument('--k', type=int, default=5, help='Results per query')
+        parser.add_argument('--terms', type=int, default=3, help='Rare words per exact-term query')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for query sampling')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR("Benchmark requires PostgreSQL with pgvector"))
+            return
+
+        from services.rag_service import RAGService
+
+        rag = RAGService()
+        rng = random.Random(options['seed'])
+
+        query_sets = {
+            'exact terms': self._term_queries(rng, options['queries'], options['terms']),
+            'people': self._people_queries(rng, options['queries']),
+        }
+
+        self.stdout.write("="*70)
+        self.stdout.write(f"HYBRID vs VECTOR RETRIEVAL (k={options['k']})")
+        self.stdout.write("="*70)
+
+        for name, queries in query_sets.items():
+            if not queries:
+                self.stdout.write(self.style.WARNING(f"\nNo data for '{name}' queries, skipping"))
+                continue
+
+            self.stdout.write(f"\n🔎 {name}: {len(queries)} queries (e.g. \"{queries[0][0]}\")")
+
+            # Embedding time is the same for both paths, so it is left out
+            prepared = [
+                (query, rag.embed_query(query), rag._classify_query_type(query), target)
+                for query, target in queries
+            ]
+
+            for mode in ['vector', 'hybrid']:
+                latencies = []
+                hits = 0
+                reciprocal_ranks = 0.0
+
+                for query, query_embedding, query_type, target in prepared:
+                    started = time.perf_counter()
+                    if mode == 'hybrid':
+                        results = rag._hybrid_search(query, query_embedding, query_type, options['k'])
+                    else:
+                        results = rag._pgvector_search(query_embedding, query_type, options['k'])
+                    latencies.append(time.perf_counter() - started)
+
+                    for rank, section in enumerate(results, 1):
+                        if target(section):
+                            hits += 1
+                            reciprocal_ranks += 1.0 / rank
+                            break
+
+                latency = benchmarks.latency_summary(latencies)
+                self.stdout.write(
+                    f"  {mode:<7} p50 {latency['p50']:7.2f}ms  p95 {latency['p95']:7.2f}ms  "
+                    f"recall@{options['k']} {hits / len(prepared):6.1%}  MRR {reciprocal_ranks / len(prepared):.3f}"
+                )
+
+        self.stdout.write("\n" + "="*70)
+
+    def _term_queries(self, rng, n, terms):
+        """Rarest words of a sampled section; the hit is that section"""
+        document_frequency = Counter()
+        for content in MovieSection.objects.values_list('content', flat=True).iterator():
+            document_frequency.update(set(_WORD.findall(content.lower())))
+
+        ids = list(MovieSection.objects.filter(embedding__isnull=False).values_list('id', flat=True))
+        sample = MovieSection.objects.filter(id__in=rng.sample(ids, min(n, len(ids)))).only('id', 'content')
+
+        queries = []
+        for section in sample:
+            words = sorted(set(_WORD.findall(section.content.lower())), key=lambda w: (document_frequency[w], w))
+            if words:
+                queries.append((' '.join(words[:terms]), lambda s, section_id=section.id: s.id == section_id))
+        return queries
+
+    def _people_queries(self, rng, n):
+        """A director's name; the hit is any section of their movie"""
+        movies = list(
+            Movie.objects.filter(sections__embedding__isnull=False)
+            .exclude(director='')
+            .distinct()
+            .values_list('id', 'director')
+        )
+        return [
+            (f"Who is {director}?", lambda s, movie_id=movie_id: s.movie_id == movie_id)
+            for movie_id, director in rng.sample(movies, min(n, len(movies)))
+        ]
@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from reports import benchmarks
+from services.rag_service import RAGService
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compare float32, halfvec and binary-code retrieval on synthetic corpora (index size, latency, recall@k)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[100000],
+            help='Corpus sizes in sections (8 sections per synthetic movie)'
+        )
+        parser.add_argument('--queries', type=int, default=50, help='Queries per corpus size')
+        parser.add_argument('--k', type=int, default=15, help='Neighbours per query (the rerank fetches k*3 = 15 for chat)')
+        parser.add_argument(
+            '--oversample',
+            type=int,
+            nargs='+',
+            default=[1, 2, 4, 10],
+            help='RAG_QUANTIZATION_OVERSAMPLE values to try'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Seed for corpus and queries')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR("Benchmark requires PostgreSQL with pgvector"))
+            return
+
+        version = benchmarks.pgvector_version()
+        quantized = version is not None and version >= (0, 7)
+
+        rag = RAGService()
+        # Synthetic vectors are not unit length
+        rag.normalize = False
+
+        k = options['k']
+        queries = benchmarks.random_queries(options['queries'], seed=options['seed'])
+
+        self.stdout.write("="*70)
+        self.stdout.write(f"QUANTIZATION BENCHMARK (k={k})")
+        self.stdout.write("="*70)
+
+        if not quantized:
+            self.stdout.write(self.style.WARNING(
+                "⚠️  halfvec and binary codes need pgvector >= 0.7; measuring float32 only"
+            ))
+
+        for size in options['sizes']:
+            n_movies = max(1, size // len(benchmarks.SECTION_TYPES))
+
+            with benchmarks.scratch_schema():
+                self.stdout.write(f"\n📦 {n_movies * len(benchmarks.SECTION_TYPES)} sections")
+
+                benchmarks.load_synthetic_corpus(n_movies, seed=options['seed'])
+                build_seconds = {'float32': benchmarks.create_indexes()}
+                if quantized:
+                    timings = benchmarks.create_quantized_indexes(dim=rag.embedding_dim)
+                    build_seconds['halfvec'] = timings['bench_embedding_half_hnsw']
+                    build_seconds['binary'] = timings['bench_embedding_bit_hnsw']
+
+                self.stdout.write("\n  Index sizes:")
+                for name, size_bytes in benchmarks.index_sizes().items():
+                    self.stdout.write(f"    {name:<32} {size_bytes / 1024 / 1024:8.1f} MB")
+                for mode, seconds in build_seconds.items():
+                    self.stdout.write(f"    {mode} build: {seconds:.1f}s")
+
+                exact = [self._exact_ids(rag, q, k) for q in queries]
+
+                self.stdout.write("\n  Recall and latency:")
+                self._report(rag, queries, exact, k, 'float32 hnsw', '', 1)
+
+                if quantized:
+                    for mode in ['halfvec', 'binary']:
+                        for oversample in options['oversample']:
+                            self._report(rag, queries, exact, k, f"{mode} x{oversample}", mode, oversample)
+
+    def _exact_ids(self, rag, query_embedding, k):
+        # Sequential scan gives the true nearest neighbours
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_indexscan = off')
+            with override_settings(RAG_QUANTIZATION=''):
+                return {s.id for s in rag._pgvector_queryset(query_embedding, k)}
+
+    def _report(self, rag, queries, exact, k, label, mode, oversample):
+        latencies = []
+        found = 0
+
+        with override_settings(RAG_QUANTIZATION=mode, RAG_QUANTIZATION_OVERSAMPLE=oversample):
+            min_ef_search = rag._shortlist_size(k) if mode else None
+
+            for query_embedding, truth in zip(queries, exact):
+                started = time.perf_counter()
+                results = rag._tuned_list(rag._pgvector_queryset(query_embedding, k), min_ef_search)
+                latencies.append(time.perf_counter() - started)
+                found += len(truth & {s.id for s in results})
+
+        latency = benchmarks.latency_summary(latencies)
+        self.stdout.write(
+            f"    {label:<14} p50 {latency['p50']:7.2f}ms  p95 {latency['p95']:7.2f}ms  "
+            f"recall@{k} {found / (k * len(queries)):6.1%}"
+        )
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from reports import benchmarks
+from services.rag_service import RAGService, SECTION_WEIGHTS
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compare Python vs SQL section-type reranking on synthetic corpora (rows transferred, latency)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 1000000],
+            help='Corpus sizes in sections (8 sections per synthetic movie)'
+        )
+        parser.add_argument('--queries', type=int, default=50, help='Queries per corpus size')
+        parser.add_argument('--k', type=int, default=5, help='Results per query')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for corpus and queries')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR("Benchmark requires PostgreSQL with pgvector"))
+            return
+
+        rag = RAGService()
+        # Synthetic vectors are not unit length
+        rag.normalize = False
+
+        k = options['k']
+        query_types = list(SECTION_WEIGHTS.keys())
+        queries = benchmarks.random_queries(options['queries'], seed=options['seed'])
+
+        self.stdout.write("="*70)
+        self.stdout.write("RERANK BENCHMARK: Python (k*3 rows) vs SQL CASE (k rows)")
+        self.stdout.write("="*70)
+
+        for size in options['sizes']:
+            n_movies = max(1, size // len(benchmarks.SECTION_TYPES))
+
+            with benchmarks.scratch_schema():
+                self.stdout.write(f"\n📦 {n_movies * len(benchmarks.SECTION_TYPES)} sections")
+
+                started = time.time()
+                benchmarks.load_synthetic_corpus(n_movies, seed=options['seed'])
+                self.stdout.write(f"  Loaded in {time.time() - started:.1f}s")
+
+                build_seconds = benchmarks.create_indexes()
+                self.stdout.write(f"  HNSW index built in {build_seconds:.1f}s")
+
+                python_stats = {'latency': [], 'rows': 0, 'bytes': 0}
+                sql_stats = {'latency': [], 'rows': 0, 'bytes': 0}
+                mismatches = 0
+
+                for i, query_embedding in enumerate(queries):
+                    query_type = query_types[i % len(query_types)]
+
+                    started = time.perf_counter()
+                    candidates = list(rag._pgvector_queryset(query_embedding, k*3))
+                    python_results = rag._rerank(candidates, query_type, k)
+                    python_stats['latency'].append(time.perf_counter() - started)
+                    python_stats['rows'] += len(candidates)
+                    python_stats['bytes'] += sum(benchmarks.row_bytes(s) for s in candidates)
+
+                    started = time.perf_counter()
+                    sql_results = rag._pgvector_search(query_embedding, query_type, k)
+                    sql_stats['latency'].append(time.perf_counter() - started)
+                    sql_stats['rows'] += len(sql_results)
+                    sql_stats['bytes'] += sum(benchmarks.row_bytes(s) for s in sql_results)
+
+                    if [s.id for s in python_results] != [s.id for s in sql_results]:
+                        mismatches += 1
+
+                for label, stats in [('Python rerank', python_stats), ('SQL rerank', sql_stats)]:
+                    latency = benchmarks.latency_summary(stats['latency'])
+                    self.stdout.write(
+                        f"  {label:<14} p50 {latency['p50']:7.2f}ms  p95 {latency['p95']:7.2f}ms  "
+                        f"rows/query {stats['rows'] / len(queries):5.1f}  "
+                        f"KB/query {stats['bytes'] / len(queries) / 1024:7.1f}"
+                    )
+
+                if mismatches:
+                    self.stdout.write(self.style.WARNING(f"  ⚠️  {mismatches} queries ranked differently"))
+                else:
+                    self.stdout.write(self.style.SUCCESS("  ✓ Identical results for every query"))
@@ -0,0 +1,246 @@
+from contextlib import ExitStack
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from reports import benchmarks
+from unittest import mock
+import json
+import numpy as np
+import time
+
+BACKENDS = ['pgvector', 'two-stage', 'ann', 'movie-matrix', 'numpy']
+
+# One query per RAGService query type, so every rerank weight table is exercised
+QUERY_TEMPLATES = [
+    'What happens at the ending',
+    'How was the cinematography and camera work',
+    'What do the themes mean',
+    'Who directed it and who is in the cast',
+    'Tell me about this movie',
+]
+
+# Retrieval as configured, minus caches and modes the scratch tables cannot serve
+BASE_SETTINGS = {
+    'RAG_ANN_INDEX': False,
+    'RAG_MOVIE_MATRIX_CACHE_SIZE': 0,
+    'RAG_RETRIEVAL_CACHE': False,
+    'RAG_RETRIEVAL_MODE': 'vector',
+    'RAG_QUANTIZATION': '',
+    'RAG_TWO_STAGE_MOVIES': 0,
+}
+
+
+class Command(BaseCommand):
+    help = 'Retrieval latency (p50/p95/p99), QPS and recall@k per backend on seeded synthetic corpora'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--movies',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Corpus sizes in movies (8 sections each)'
+        )
+        parser.add_argument('--queries', type=int, default=200, help='Queries per scope')
+        parser.add_argument('--k', type=int, default=5, help='Results per query (global chat uses 5, movie chat 3)')
+        parser.add_argument(
+            '--backends',
+            nargs='+',
+            choices=BACKENDS,
+            default=BACKENDS,
+            help='numpy is the exact reference; the others go through RAGService.search_with_priority'
+        )
+        parser.add_argument(
+            '--scopes',
+            nargs='+',
+            choices=['global', 'movie'],
+            default=['global', 'movie'],
+            help='Global chat queries and/or movie-scoped ones'
+        )
+        parser.add_argument(
+            '--two-stage-movies',
+            type=int,
+            nargs='+',
+            default=[20, 100],
+            help='RAG_TWO_STAGE_MOVIES values to measure the two-stage backend at (global scope only)'
+        )
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed passes over the queries per backend')
+        parser.add_argument(
+            '--movie-cohesion',
+            type=float,
+            default=0.0,
+            help='Share of each section vector taken from a per-movie topic (0 = independent sections)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Seed for corpus and queries')
+        parser.add_argument('--json', type=str, help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        from services.rag_service import RAGService
+
+        rag = RAGService()
+        # Synthetic vectors are not unit length
+        rag.normalize = False
+
+        backends = options['backends']
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                "⚠️  No PostgreSQL: corpus generated in memory, measuring the numpy backend only"
+            ))
+            backends = [b for b in backends if b == 'numpy']
+
+        # One run of the two-stage backend per shortlist size
+        backends = [
+            variant
+            for backend in backends
+            for variant in (
+                [f"two-stage/{m}" for m in options['two_stage_movies']] if backend == 'two-stage' else [backend]
+            )
+        ]
+
+        self.stdout.write("="*70)
+        self.stdout.write(f"RETRIEVAL BENCHMARK (k={options['k']}, {options['queries']} queries per scope)")
+        self.stdout.write("="*70)
+
+        report = []
+        for n_movies in options['movies']:
+            if connection.vendor == 'postgresql':
+                with benchmarks.scratch_schema():
+                    started = time.time()
+                    benchmarks.load_synthetic_corpus(
+                        n_movies, seed=options['seed'], dim=rag.embedding_dim, cohesion=options['movie_cohesion']
+                    )
+                    build_seconds = benchmarks.create_indexes()
+                    exact = benchmarks.ExactIndex(*benchmarks.fetch_corpus())
+                    self.stdout.write(
+                        f"\n📦 {len(exact)} sections loaded in {time.time() - started:.1f}s "
+                        f"(HNSW build {build_seconds:.1f}s)"
+                    )
+                    if any(backend.startswith('two-stage') for backend in backends):
+                        centroid_seconds, build_seconds = benchmarks.load_movie_embeddings()
+                        self.stdout.write(
+                            f"   {n_movies} movie centroids in {centroid_seconds:.1f}s (HNSW build {build_seconds:.1f}s)"
+                        )
+                    report += self._run_corpus(rag, exact, n_movies, backends, options)
+            else:
+                exact = benchmarks.ExactIndex(
+                    *benchmarks.synthetic_corpus(
+                        n_movies, seed=options['seed'], dim=rag.embedding_dim, cohesion=options['movie_cohesion']
+                    )
+                )
+                self.stdout.write(f"\n📦 {len(exact)} sections (in memory)")
+                report += self._run_corpus(rag, exact, n_movies, backends, options)
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n✓ Results written to {options['json']}"))
+
+        self.stdout.write("\n" + "="*70)
+
+    def _run_corpus(self, rag, exact, n_movies, backends, options):
+        k = options['k']
+        rng = np.random.default_rng(options['seed'])
+        embeddings = benchmarks.random_queries(options['queries'], seed=options['seed'], dim=rag.embedding_dim)
+        texts = [f"{QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)]} #{i}" for i in range(options['queries'])]
+        vectors = dict(zip(texts, embeddings))
+
+        # The fixed query set bypasses the embedding model
+        rag.embed_query = vectors.__getitem__
+
+        # Built once per corpus: the ANN index is the expensive one
+        states = {backend: self._backend(rag, exact, backend, n_movies) for backend in backends}
+
+        results = []
+        for scope in options['scopes']:
+            movie_ids = (
+                rng.integers(1, n_movies + 1, size=len(texts)).tolist()
+                if scope == 'movie' else [None] * len(texts)
+            )
+            queries = [
+                (text, rag._classify_query_type(text), movie_id)
+                for text, movie_id in zip(texts, movie_ids)
+            ]
+            truth = [exact.search(vectors[text], query_type, k, movie_id) for text, query_type, movie_id in queries]
+
+            self.stdout.write(f"\n  {scope} scope:")
+            for backend in backends:
+                if backend == 'movie-matrix' and scope != 'movie':
+                    continue
+                if backend.startswith('two-stage') and scope != 'global':
+                    continue
+
+                search, patches = states[backend]
+                with override_settings(**self._settings(backend, n_movies)), ExitStack() as stack:
+                    for patch in patches:
+                        stack.enter_context(patch)
+
+                    for _ in range(options['warmup']):
+                        for query in queries:
+                            search(*query, k)
+
+                    latencies, found = [], 0
+                    for query, expected in zip(queries, truth):
+                        started = time.perf_counter()
+                        ids = search(*query, k)
+                        latencies.append(time.perf_counter() - started)
+                        found += len(set(ids) & set(expected))
+
+                latency = benchmarks.latency_summary(latencies)
+                recall = found / max(sum(len(expected) for expected in truth), 1)
+                qps = len(latencies) / sum(latencies)
+
+                self.stdout.write(
+                    f"    {backend:<13} p50 {latency['p50']:7.2f}ms  p95 {latency['p95']:7.2f}ms  "
+                    f"p99 {latency['p99']:7.2f}ms  {qps:8.1f} QPS  recall@{k} {recall:6.1%}"
+                )
+                results.append({
+                    'sections': len(exact),
+                    'scope': scope,
+                    'backend': backend,
+                    'k': k,
+                    'queries': len(queries),
+                    'qps': qps,
+                    'recall': recall,
+                    **{f"{name}_ms": value for name, value in latency.items()},
+                })
+
+        del rag.embed_query
+        return results
+
+    def _settings(self, backend, n_movies):
+        overrides = dict(BASE_SETTINGS)
+        if backend == 'ann':
+            overrides['RAG_ANN_INDEX'] = True
+        elif backend == 'movie-matrix':
+            overrides['RAG_MOVIE_MATRIX_CACHE_SIZE'] = n_movies
+        elif backend.startswith('two-stage'):
+            overrides['RAG_TWO_STAGE_MOVIES'] = int(backend.split('/')[1])
+        return overrides
+
+    def _backend(self, rag, exact, backend, n_movies):
+        """
+        (search, patches): search(query, query_type, movie_id, k) returns ranked
+        section ids; patches swap in the backend's fresh process-wide state
+        """
+        if backend == 'numpy':
+            vectors = rag.embed_query
+            return (lambda query, query_type, movie_id, k: exact.search(vectors(query), query_type, k, movie_id)), []
+
+        patches = []
+        if backend == 'ann':
+            from services.ann_index import SectionANNIndex
+
+            index = SectionANNIndex(dim=rag.embedding_dim)
+            started = time.time()
+            index.build()
+            self.stdout.write(f"    (ann index built in {time.time() - started:.1f}s)")
+            patches.append(mock.patch('services.ann_index._section_index', index))
+        elif backend == 'movie-matrix':
+            from services.movie_matrix_cache import MovieMatrixCache
+
+            patches.append(mock.patch('services.rag_service._movie_matrix_cache', MovieMatrixCache(max_movies=n_movies)))
+
+        def search(query, query_type, movie_id, k):
+            return [section.id for section in rag.search_with_priority(query, k, movie_id)]
+
+        return search, patches
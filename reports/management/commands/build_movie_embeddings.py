@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from reports.models import MovieEmbedding
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-movie centroid embeddings for two-stage global retrieval (RAG_TWO_STAGE_MOVIES)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movie-id', type=int, nargs='+', help='Only these movies (default: all)')
+
+    def handle(self, *args, **options):
+        from services.rag_service import invalidate_retrieval_caches, refresh_movie_embeddings
+
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR("Movie centroids require PostgreSQL with pgvector"))
+            return
+
+        started = time.time()
+        written = refresh_movie_embeddings(options['movie_id'])
+        # Global rankings cached before the rebuild came from the old centroids
+        invalidate_retrieval_caches(options['movie_id'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {written} movie centroids written in {time.time() - started:.2f}s "
+            f"({MovieEmbedding.objects.count()} in total)"
+        ))
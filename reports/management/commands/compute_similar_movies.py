@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reports.models import MovieEmbedding, SimilarMovie
+import time
+
+
+class Command(BaseCommand):
+    help = 'Precompute "similar movies" from movie centroids and genres; by default only lists affected by changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every movie instead of the stale ones')
+        parser.add_argument('--count', type=int, help='Neighbours per movie (default: SIMILAR_MOVIES_COUNT)')
+        parser.add_argument(
+            '--genre-weight',
+            type=float,
+            help='Share of the score from genre overlap (default: SIMILAR_MOVIES_GENRE_WEIGHT)'
+        )
+        parser.add_argument('--batch-size', type=int, default=512, help='Movies scored per matrix product')
+
+    def handle(self, *args, **options):
+        from services.similar_movies import compute_similar_movies, refresh_stale_similar_movies
+
+        if not MovieEmbedding.objects.exists():
+            self.stdout.write(self.style.WARNING(
+                "⚠️  No movie centroids yet: run `manage.py build_movie_embeddings` first"
+            ))
+            return
+
+        count = options['count'] or settings.SIMILAR_MOVIES_COUNT
+        genre_weight = options['genre_weight']
+        if genre_weight is None:
+            genre_weight = settings.SIMILAR_MOVIES_GENRE_WEIGHT
+
+        started = time.time()
+        if options['full']:
+            MovieEmbedding.objects.update(similar_stale=False)
+            written = compute_similar_movies(None, count, genre_weight, options['batch_size'])
+            SimilarMovie.objects.filter(movie__centroid__isnull=True).delete()
+        else:
+            written = refresh_stale_similar_movies(count, genre_weight, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {written} neighbour lists written in {time.time() - started:.2f}s "
+            f"({count} per movie, genre weight {genre_weight})"
+        ))
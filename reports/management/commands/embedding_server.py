@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from urllib.parse import urlparse
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = 'Run the shared embedding server (one model copy for all web workers, see RAG_EMBEDDING_SERVER)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            type=str,
+            help='Unix socket path (default: taken from RAG_EMBEDDING_SERVER when it is a unix:// URL)'
+        )
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Listen address when not on a unix socket')
+        parser.add_argument('--port', type=int, default=8601, help='Listen port when not on a unix socket')
+        parser.add_argument('--max-batch', type=int, default=32, help='Most texts encoded in one forward pass')
+        parser.add_argument(
+            '--max-wait-ms',
+            type=float,
+            default=5,
+            help='How long a request waits for others to join its batch'
+        )
+
+    def handle(self, *args, **options):
+        from services.embedding_backends import load_backend
+        from services.embedding_server import EmbeddingApp, make_server
+        from services.rag_service import RAGService
+
+        socket_path = options['socket']
+        host, port = options['host'], options['port']
+
+        configured = urlparse(settings.RAG_EMBEDDING_SERVER)
+        if not socket_path and configured.scheme == 'unix':
+            socket_path = configured.path
+        elif not socket_path and configured.scheme == 'http' and configured.port:
+            host, port = configured.hostname, configured.port
+
+        # The server always encodes in-process, whatever RAG_EMBEDDING_SERVER says
+        rag = RAGService()
+        started = time.time()
+        model = load_backend(
+            settings.RAG_EMBEDDING_BACKEND,
+            rag.model_name,
+            onnx_model_dir=settings.RAG_ONNX_MODEL_DIR,
+            onnx_quantized=settings.RAG_ONNX_QUANTIZED,
+            threads=settings.RAG_EMBEDDING_THREADS
+        )
+        model.encode(['warm up'], show_progress_bar=False)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {rag.model_name} ({settings.RAG_EMBEDDING_BACKEND}) ready in {time.time() - started:.2f}s"
+        ))
+
+        app = EmbeddingApp(model, max_batch_size=options['max_batch'], max_wait_ms=options['max_wait_ms'])
+        server = make_server(app, socket_path=socket_path, host=host, port=port)
+        address = f"unix://{socket_path}" if socket_path else f"http://{host}:{port}"
+
+        self.stdout.write("="*70)
+        self.stdout.write(f"🚀 Embedding server on {address} (pid {os.getpid()})")
+        self.stdout.write(f"   Batches up to {options['max_batch']} texts, {options['max_wait_ms']}ms wait")
+        self.stdout.write(f"   Point workers at it with RAG_EMBEDDING_SERVER={address}")
+        self.stdout.write("="*70)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.stdout.write(self.style.WARNING("\n⚠️  Embedding server stopped"))
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reports.models import MovieSection
+from services.chunking import chunk_text
+import json
+import os
+import numpy as np
+
+SAMPLE_TEXTS = [
+    "What happens at the end of the movie?",
+    "Who directed the film and who composed the score?",
+    "The cinematography relies on long takes and natural light.",
+    "The film explores themes of hope, isolation and redemption.",
+]
+
+
+def sample_texts(n):
+    """Passages from stored sections, or built-in sentences on an empty database"""
+    texts = []
+    for content in MovieSection.objects.values_list('content', flat=True)[:n]:
+        texts.extend(passage for _, passage in chunk_text(content))
+        if len(texts) >= n:
+            break
+    return texts[:n] or SAMPLE_TEXTS
+
+
+class Command(BaseCommand):
+    help = 'Export the embedding model to ONNX (optionally int8) and check it matches the torch model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=settings.RAG_ONNX_MODEL_DIR,
+            help='Directory for model.onnx, tokenizer and config (default: RAG_ONNX_MODEL_DIR)'
+        )
+        parser.add_argument('--quantize', action='store_true', help='Also write a dynamic int8 model.int8.onnx')
+        parser.add_argument('--opset', type=int, default=14, help='ONNX opset version')
+        parser.add_argument(
+            '--min-similarity',
+            type=float,
+            default=0.99,
+            help='Lowest acceptable cosine similarity to the torch embedding of the same text'
+        )
+        parser.add_argument('--samples', type=int, default=64, help='Texts used for the compatibility check')
+
+    def handle(self, *args, **options):
+        import torch
+        from sentence_transformers.models import Normalize, Pooling
+        from services.embedding_backends import (
+            ONNX_CONFIG_FILE, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE, OnnxBackend, load_torch_backend
+        )
+        from services.rag_service import RAGService
+
+        rag = RAGService()
+        output = options['output']
+        os.makedirs(output, exist_ok=True)
+
+        self.stdout.write(f"Loading {rag.model_name} (torch)...")
+        model = load_torch_backend(rag.model_name)
+        transformer = model[0]
+        tokenizer = transformer.tokenizer
+
+        pooling = next(m for m in model if isinstance(m, Pooling))
+        if pooling.pooling_mode_cls_token:
+            pooling_mode = 'cls'
+        elif pooling.pooling_mode_mean_tokens:
+            pooling_mode = 'mean'
+        else:
+            self.stdout.write(self.style.ERROR(f"Unsupported pooling: {pooling.get_pooling_mode_str()}"))
+            return
+
+        config = {
+            'model_name': rag.model_name,
+            'dimension': model.get_sentence_embedding_dimension(),
+            'max_seq_length': model.get_max_seq_length(),
+            'pooling': pooling_mode,
+            'normalize': any(isinstance(m, Normalize) for m in model),
+            'pad_token': tokenizer.pad_token,
+            'pad_token_id': tokenizer.pad_token_id,
+        }
+
+        # Export only the transformer; pooling and normalization run in NumPy
+        dummy = tokenizer(['export sample', 'a longer export sample sentence'], padding=True, return_tensors='pt')
+        input_names = [name for name in ['input_ids', 'attention_mask', 'token_type_ids'] if name in dummy]
+
+        class TokenEmbeddings(torch.nn.Module):
+            def __init__(self, auto_model):
+                super().__init__()
+                self.auto_model = auto_model
+
+            def forward(self, *inputs):
+                return self.auto_model(**dict(zip(input_names, inputs))).last_hidden_state
+
+        model_path = os.path.join(output, ONNX_MODEL_FILE)
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+
+        self.stdout.write("Exporting transformer to ONNX...")
+        with torch.no_grad():
+            torch.onnx.export(
+                TokenEmbeddings(transformer.auto_model).eval(),
+                tuple(dummy[name] for name in input_names),
+                model_path,
+                input_names=input_names,
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic_axes,
+                opset_version=options['opset'],
+                dynamo=False
+            )
+
+        tokenizer.backend_tokenizer.save(os.path.join(output, 'tokenizer.json'))
+        with open(os.path.join(output, ONNX_CONFIG_FILE), 'w') as f:
+            json.dump(config, f, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {model_path} ({os.path.getsize(model_path) / 1024 / 1024:.1f} MB)"))
+
+        variants = [('fp32', False)]
+        if options['quantize']:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantized_path = os.path.join(output, ONNX_QUANTIZED_MODEL_FILE)
+            quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {quantized_path} ({os.path.getsize(quantized_path) / 1024 / 1024:.1f} MB)"
+            ))
+            variants.append(('int8', True))
+
+        # Stored vectors came from torch, so ONNX must land close enough to reuse them
+        texts = sample_texts(options['samples'])
+        reference = model.encode(texts, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=True)
+
+        self.stdout.write(f"\n🔍 COMPATIBILITY ({len(texts)} texts, cosine to torch):")
+        failed = False
+        for label, quantized in variants:
+            backend = OnnxBackend(output, quantized=quantized)
+            embeddings = backend.encode(texts, normalize_embeddings=True)
+            similarity = np.sum(reference * embeddings, axis=1)
+
+            line = f"  {label}: min {similarity.min():.5f}  mean {similarity.mean():.5f}"
+            if similarity.min() < options['min_similarity']:
+                failed = True
+                self.stdout.write(self.style.ERROR(f"{line}  ✗ below {options['min_similarity']}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{line}  ✓"))
+
+        if failed:
+            self.stdout.write(self.style.ERROR(
+                "\n✗ Export is not compatible with stored embeddings; do not enable it without re-embedding"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                "\n✓ Compatible: set RAG_EMBEDDING_BACKEND=onnx (RAG_ONNX_QUANTIZED=True for int8)"
+            ))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from reports.models import MovieSection, SectionChunk
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Split sections into overlapping passages and embed each one (for RAG_CHUNKS_ENABLED)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--section-id', type=int, help='Chunk a specific section')
+        parser.add_argument('--movie-id', type=int, help='Chunk sections of a specific movie')
+        parser.add_argument('--all', action='store_true', help='Re-sync every section; unchanged passages keep their embeddings')
+        parser.add_argument('--force', action='store_true', help='Delete existing chunks and re-embed everything')
+        parser.add_argument('--batch-size', type=int, help='Sections per batch (default: RAG_EMBEDDING_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        # Import here to avoid loading model on Django startup
+        from services.rag_service import RAGService
+
+        self.stdout.write("Loading embedding model...")
+        try:
+            rag = RAGService()
+            rag.load_model()
+            self.stdout.write(self.style.SUCCESS("✓ Model loaded"))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Failed to load model: {e}"))
+            return
+
+        if options['section_id']:
+            sections = MovieSection.objects.filter(id=options['section_id'])
+        elif options['movie_id']:
+            sections = MovieSection.objects.filter(movie_id=options['movie_id'])
+        elif options['all'] or options['force']:
+            sections = MovieSection.objects.all()
+        else:
+            sections = MovieSection.objects.filter(chunks__isnull=True)
+
+        if options['force']:
+            deleted, _ = SectionChunk.objects.filter(section__in=sections).delete()
+            self.stdout.write(self.style.WARNING(f"Deleted {deleted} existing chunks"))
+
+        total = sections.count()
+        if total == 0:
+            self.stdout.write(self.style.WARNING("No sections to process"))
+            return
+
+        self.stdout.write(f"\nProcessing {total} sections...\n")
+
+        success = 0
+        failed = 0
+
+        sections = sections.select_related('movie').defer('embedding').order_by('id')
+
+        for i, (section, error) in enumerate(rag.sync_section_chunks(sections.iterator(), options['batch_size']), 1):
+            self.stdout.write(f"[{i}/{total}] {section.movie.title} - {section.get_section_type_display()}")
+
+            if error is None:
+                success += 1
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"  ✗ Error: {error}"))
+
+        # Summary
+        self.stdout.write("\n" + "="*60)
+        self.stdout.write(self.style.SUCCESS(f"✓ Success: {success}"))
+        if failed > 0:
+            self.stdout.write(self.style.ERROR(f"✗ Failed: {failed}"))
+        self.stdout.write(f"Chunks stored: {SectionChunk.objects.count()}")
+        self.stdout.write("="*60)
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from reports.models import MovieSection
-import numpy as np
+from reports.signals import bulk_section_writes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,19 +13,19 @@ class Command(BaseCommand):
         parser.add_argument('--section-id', type=int, help='Generate for specific section')
         parser.add_argument('--movie-id', type=int, help='Generate for specific movie')
         parser.add_argument('--force', action='store_true', help='Regenerate all embeddings')
+        parser.add_argument(
+            '--include-unchanged',
+            action='store_true',
+            help='Also re-encode sections whose content and model have not changed since they were embedded'
+        )
+        parser.add_argument('--batch-size', type=int, help='Sections per forward pass (default: RAG_EMBEDDING_BATCH_SIZE)')
     
+    @bulk_section_writes()
     def handle(self, *args, **options):
         # Import here to avoid loading model on Django startup
-        from sentence_transformers import SentenceTransformer
+        from services.rag_service import RAGService
         
-        # Load model once
-        self.stdout.write("Loading embedding model...")
-        try:
-            model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-            self.stdout.write(self.style.SUCCESS("✓ Model loaded"))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Failed to load model: {e}"))
-            return
+        rag = RAGService()
         
         # Get sections to process
         if options['section_id']:
@@ -37,41 +37,49 @@ class Command(BaseCommand):
         else:
             sections = MovieSection.objects.filter(embedding__isnull=True)
         
+        selected = sections.count()
+        if not options['include_unchanged']:
+            sections = rag.needs_embedding(sections)
+        
         total = sections.count()
+        skipped = selected - total
+        if skipped:
+            self.stdout.write(f"Skipping {skipped} sections already embedded from the same content and model")
+        
         if total == 0:
             self.stdout.write(self.style.WARNING("No sections to process"))
             return
         
+        # Load model once, and only when there is something to encode
+        self.stdout.write("Loading embedding model...")
+        try:
+            rag.load_model()
+            self.stdout.write(self.style.SUCCESS("✓ Model loaded"))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Failed to load model: {e}"))
+            return
+        
         self.stdout.write(f"\nProcessing {total} sections...\n")
         
         success = 0
         failed = 0
         
-        for i, section in enumerate(sections, 1):
-            try:
-                self.stdout.write(f"[{i}/{total}] {section.movie.title} - {section.get_section_type_display()}")
-                
-                # Generate embedding
-                embedding = model.encode(
-                    section.content,
-                    convert_to_numpy=True,
-                    show_progress_bar=False
-                )
-                
-                # Save
-                section.embedding = embedding.astype('float32')
-                section.save(update_fields=['embedding'])
-                
+        sections = sections.select_related('movie').order_by('id')
+        
+        for i, (section, error) in enumerate(rag.embed_sections(sections.iterator(), options['batch_size']), 1):
+            self.stdout.write(f"[{i}/{total}] {section.movie.title} - {section.get_section_type_display()}")
+            
+            if error is None:
                 success += 1
-                self.stdout.write(self.style.SUCCESS(f"  ✓ Generated ({len(embedding)} dims)"))
-                
-            except Exception as e:
+                self.stdout.write(self.style.SUCCESS(f"  ✓ Generated ({rag.embedding_dim} dims)"))
+            else:
                 failed += 1
-                self.stdout.write(self.style.ERROR(f"  ✗ Error: {e}"))
+                self.stdout.write(self.style.ERROR(f"  ✗ Error: {error}"))
         
         # Summary
         self.stdout.write("\n" + "="*60)
         self.stdout.write(self.style.SUCCESS(f"✓ Success: {success}"))
+        self.stdout.write(f"Skipped (unchanged): {skipped}")
         if failed > 0:
             self.stdout.write(self.style.ERROR(f"✗ Failed: {failed}"))
         self.stdout.write(f"Success rate: {(success/total*100):.1f}%")
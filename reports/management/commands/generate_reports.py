@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from movies.models import Movie
 from reports.models import MovieSection
+from reports.signals import bulk_section_writes
 from services.openrouter_service import OpenRouterService
 from services.rag_service import RAGService
 import time
@@ -14,6 +15,7 @@ class Command(BaseCommand):
         parser.add_argument('--limit', type=int, default=5, help='Limit number of movies to process')
         parser.add_argument('--skip-embeddings', action='store_true', help='Skip embedding generation')
     
+    @bulk_section_writes()
     def handle(self, *args, **options):
         openrouter = OpenRouterService()
         rag = RAGService()
@@ -41,6 +43,7 @@ class Command(BaseCommand):
         ]
         
         total_generated = 0
+        total_embedded = 0
         
         for movie in movies:
             self.stdout.write(f"\nProcessing: {movie.title} ({movie.year})")
@@ -53,6 +56,8 @@ class Command(BaseCommand):
                 'plot_summary': movie.plot_summary
             }
             
+            created_sections = []
+            
             for section_type in section_types:
                 if MovieSection.objects.filter(movie=movie, section_type=section_type).exists():
                     self.stdout.write(f"  - {section_type}: already exists")
@@ -64,23 +69,17 @@ class Command(BaseCommand):
                     content = openrouter.generate_movie_section(movie_data, section_type)
                     
                     if content:
-                        embedding = None
-                        
-                        if not options['skip_embeddings']:
-                            self.stdout.write(f"    - Generating embedding...")
-                            embedding = rag.generate_embedding(content)
-                        
-                        MovieSection.objects.create(
+                        section = MovieSection.objects.create(
                             movie=movie,
                             section_type=section_type,
                             content=content,
-                            embedding=embedding
+                            embedding=None
                         )
+                        created_sections.append(section)
                         
                         total_generated += 1
-                        emb_status = 'yes' if embedding is not None else 'no'
                         self.stdout.write(self.style.SUCCESS(
-                            f"    ✓ Generated ({len(content.split())} words, embedding: {emb_status})"
+                            f"    ✓ Generated ({len(content.split())} words)"
                         ))
                     else:
                         self.stdout.write(self.style.ERROR(f"    ✗ Failed to generate"))
@@ -89,5 +88,18 @@ class Command(BaseCommand):
                     
                 except Exception as e:
                     self.stdout.write(self.style.ERROR(f"    ✗ Error: {e}"))
+            
+            # Embed all new sections of the movie in one batch
+            if created_sections and not options['skip_embeddings']:
+                self.stdout.write(f"  - Generating {len(created_sections)} embeddings...")
+                
+                for section, error in rag.embed_sections(created_sections):
+                    if error is None:
+                        total_embedded += 1
+                    else:
+                        self.stdout.write(self.style.ERROR(
+                            f"    ✗ Embedding failed for {section.section_type}: {error}"
+                        ))
         
-        self.stdout.write(self.style.SUCCESS(f"\nTotal sections generated: {total_generated}"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"\nTotal sections generated: {total_generated}"))
+        self.stdout.write(self.style.SUCCESS(f"Total embeddings generated: {total_embedded}"))
@@ -0,0 +1,221 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reports import benchmarks
+import asyncio
+import httpx
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+QUESTIONS = [
+    'What happens at the ending',
+    'How was the cinematography and camera work',
+    'What do the themes mean',
+    'Who directed it and who is in the cast',
+    'Tell me about this movie',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrent-chat capacity of one worker, WSGI (gunicorn, sync views) against ASGI '
+        '(uvicorn, async views), with the LLM replaced by a local stand-in of fixed latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--deployments',
+            nargs='+',
+            choices=['wsgi', 'asgi'],
+            default=['wsgi', 'asgi'],
+            help='Deployments to start and measure, one worker each'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 8, 32, 128, 256],
+            help='Chats kept in flight at each step'
+        )
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds per concurrency step')
+        parser.add_argument('--llm-latency', type=float, default=2.0, help='Seconds the stand-in LLM takes per answer')
+        parser.add_argument(
+            '--max-p95',
+            type=float,
+            help='Latency a step must stay within to count towards capacity (default: 2x --llm-latency + 1s)'
+        )
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='gthread threads of the WSGI worker')
+        parser.add_argument('--wsgi-app', default='flickora.wsgi:application')
+        parser.add_argument('--asgi-app', default='flickora.asgi:application')
+        parser.add_argument('--port', type=int, default=8700, help='First port the deployments listen on')
+        parser.add_argument('--path', default='/api/chat/send/', help='Chat endpoint to load')
+        parser.add_argument('--movie-id', type=int, help='Movie-scoped chats (default: global chat)')
+        parser.add_argument('--startup-timeout', type=float, default=180.0, help='Seconds to wait for /healthz/ready')
+        parser.add_argument('--json', type=str, help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        max_p95 = options['max_p95'] or 2 * options['llm_latency'] + 1
+        # One log line per request would bury the report
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+
+        llm = benchmarks.StandInLLM(latency=options['llm_latency']).start()
+
+        self.stdout.write("="*70)
+        self.stdout.write("CHAT LOAD TEST (one worker per deployment)")
+        self.stdout.write("="*70)
+        self.stdout.write(f"  Stand-in LLM: {llm.base_url} ({options['llm_latency']:.1f}s per answer)")
+        self.stdout.write(f"  Endpoint: {options['path']}, {options['duration']:.0f}s per step, capacity at p95 <= {max_p95:.1f}s")
+
+        report = []
+        try:
+            for offset, deployment in enumerate(options['deployments']):
+                port = options['port'] + offset
+                server = self._start(deployment, port, llm, options)
+                try:
+                    base_url = f"http://127.0.0.1:{port}"
+                    if not self._wait_ready(server, base_url, options['startup_timeout']):
+                        self.stdout.write(self.style.ERROR(f"✗ {deployment} did not become ready, see {server.log_path}"))
+                        continue
+
+                    self.stdout.write(f"\n🚀 {deployment} ({self._describe(deployment, options)}, log {server.log_path})")
+                    for concurrency in options['concurrency']:
+                        llm.reset_counters()
+                        step = asyncio.run(self._run_step(base_url, concurrency, options))
+                        step.update({
+                            'deployment': deployment,
+                            'concurrency': concurrency,
+                            'llm_peak_in_flight': llm.peak_in_flight,
+                            'llm_connections': llm.connections,
+                        })
+                        report.append(step)
+                        self._print_step(step, max_p95)
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+        finally:
+            llm.stop()
+
+        self.stdout.write("\n" + "="*70)
+        for deployment in options['deployments']:
+            steps = [
+                step for step in report
+                if step['deployment'] == deployment and not step['errors'] and step['p95_ms'] / 1000 <= max_p95
+            ]
+            if steps:
+                best = max(steps, key=lambda step: step['concurrency'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"✓ {deployment}: {best['concurrency']} concurrent chats per worker "
+                    f"({best['throughput']:.1f} chats/s, p95 {best['p95_ms'] / 1000:.2f}s)"
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(f"⚠️  {deployment}: no step within p95 {max_p95:.1f}s without errors"))
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✓ Results written to {options['json']}"))
+        self.stdout.write("="*70)
+
+    def _describe(self, deployment, options):
+        if deployment == 'wsgi':
+            return f"gunicorn gthread, {options['wsgi_threads']} threads, sync views"
+        return f"uvicorn, async views, {settings.CHAT_POOL_THREADS} pool threads"
+
+    def _start(self, deployment, port, llm, options):
+        env = dict(
+            os.environ,
+            OPENROUTER_BASE_URL=llm.base_url,
+            OPENROUTER_API_KEY=settings.OPENROUTER_API_KEY or 'stand-in',
+            # Every chat must reach the LLM
+            RAG_ANSWER_CACHE_SIZE='0',
+            CHAT_ASYNC_VIEWS='True' if deployment == 'asgi' else 'False',
+        )
+
+        if deployment == 'wsgi':
+            command = [
+                sys.executable, '-m', 'gunicorn', options['wsgi_app'],
+                '--workers', '1',
+                '--threads', str(options['wsgi_threads']),
+                '--bind', f"127.0.0.1:{port}",
+                '--timeout', '300',
+            ]
+        else:
+            command = [
+                sys.executable, '-m', 'uvicorn', options['asgi_app'],
+                '--workers', '1',
+                '--host', '127.0.0.1',
+                '--port', str(port),
+                '--no-access-log',
+            ]
+
+        log_path = os.path.join(tempfile.gettempdir(), f"loadtest_chat_{deployment}.log")
+        with open(log_path, 'w') as log:
+            server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        server.log_path = log_path
+        return server
+
+    def _wait_ready(self, server, base_url, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                return False
+            try:
+                if httpx.get(f"{base_url}/healthz/ready", timeout=5).status_code == 200:
+                    return True
+            except httpx.HTTPError:
+                pass
+            time.sleep(1)
+        return False
+
+    async def _run_step(self, base_url, concurrency, options):
+        """Closed loop: `concurrency` clients, each sending its next chat as soon as the last one returns"""
+        latencies, errors = [], 0
+        counter = iter(range(10**9))
+        deadline = time.monotonic() + options['duration']
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as client:
+            async def user():
+                nonlocal errors
+                while time.monotonic() < deadline:
+                    # Distinct questions, so query embedding and retrieval caches miss
+                    i = next(counter)
+                    payload = {'message': f"{QUESTIONS[i % len(QUESTIONS)]} #{i}", 'movie_id': options['movie_id']}
+                    started = time.monotonic()
+                    try:
+                        response = await client.post(options['path'], json=payload)
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok:
+                        latencies.append(time.monotonic() - started)
+                    else:
+                        errors += 1
+
+            started = time.monotonic()
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+            elapsed = time.monotonic() - started
+
+        summary = benchmarks.latency_summary(latencies) if latencies else {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'mean': 0.0}
+        return {
+            'completed': len(latencies),
+            'errors': errors,
+            'throughput': len(latencies) / elapsed,
+            **{f"{name}_ms": value for name, value in summary.items()},
+        }
+
+    def _print_step(self, step, max_p95):
+        line = (
+            f"    {step['concurrency']:>4} in flight  {step['throughput']:6.1f} chats/s  "
+            f"p50 {step['p50_ms'] / 1000:6.2f}s  p95 {step['p95_ms'] / 1000:6.2f}s  "
+            f"errors {step['errors']:>4}  LLM calls in flight {step['llm_peak_in_flight']:>4}  "
+            f"on {step['llm_connections']:>4} connections"
+        )
+        if step['errors'] or step['p95_ms'] / 1000 > max_p95:
+            self.stdout.write(self.style.WARNING(line))
+        else:
+            self.stdout.write(line)
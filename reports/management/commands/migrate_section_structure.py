@@ -4,8 +4,9 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from reports.models import MovieSection
 from movies.models import Movie
+from reports.signals import bulk_section_writes
 from services.openrouter_service import OpenRouterService
-from services.rag_service import RAGService
+from services.rag_service import RAGService, invalidate_retrieval_caches
 import time
 
 
@@ -29,6 +30,7 @@ class Command(BaseCommand):
             help='Process specific movie only'
         )
     
+    @bulk_section_writes()
     def handle(self, *args, **options):
         self.stdout.write("="*70)
         self.stdout.write("SECTION STRUCTURE MIGRATION")
@@ -76,6 +78,10 @@ class Command(BaseCommand):
                 self.stdout.write(f"  {old_type} → {new_type}: {count} sections")
                 total_renamed += count
         
+        # update() sends no signals; section types change the rerank weights
+        if total_renamed:
+            invalidate_retrieval_caches()
+        
         return total_renamed
     
     def _generate_missing_sections(self, movies):
@@ -103,6 +109,8 @@ class Command(BaseCommand):
                 'plot_summary': movie.plot_summary
             }
             
+            created_sections = []
+            
             for section_type in new_sections:
                 if MovieSection.objects.filter(movie=movie, section_type=section_type).exists():
                     self.stdout.write(f"  ✓ {section_type}: already exists")
@@ -115,16 +123,14 @@ class Command(BaseCommand):
                     content = openrouter.generate_movie_section(movie_data, section_type)
                     
                     if content:
-                        # Generate embedding
-                        embedding = rag.generate_embedding(content)
-                        
-                        # Save
-                        MovieSection.objects.create(
+                        # Save (embeddings are generated per movie below)
+                        section = MovieSection.objects.create(
                             movie=movie,
                             section_type=section_type,
                             content=content,
-                            embedding=embedding
+                            embedding=None
                         )
+                        created_sections.append(section)
                         
                         total_generated += 1
                         word_count = len(content.split())
@@ -138,6 +144,13 @@ class Command(BaseCommand):
                     
                 except Exception as e:
                     self.stdout.write(self.style.ERROR(f"  ✗ Error: {e}"))
+            
+            # Generate embeddings for the new sections in one batch
+            for section, error in rag.embed_sections(created_sections):
+                if error is not None:
+                    self.stdout.write(self.style.ERROR(
+                        f"  ✗ Embedding failed for {section.section_type}: {error}"
+                    ))
         
         return total_generated
     
@@ -0,0 +1,128 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Func, Q
+from reports.models import MovieSection, SectionChunk
+from services.rag_service import RAGService, invalidate_retrieval_caches, refresh_movie_embeddings
+import numpy as np
+
+
+class Command(BaseCommand):
+    help = 'Re-normalize stored section and passage embeddings to unit length in place (for RAG_NORMALIZE_EMBEDDINGS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows updated per transaction'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1e-4,
+            help='Rows whose norm is within this distance of 1.0 are left alone'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count rows that are not unit length'
+        )
+
+    def handle(self, *args, **options):
+        # Passages are ranked with the same metric as sections, so both tables are covered
+        updated = 0
+        for model in (MovieSection, SectionChunk):
+            updated += self._normalize(model, options)
+
+        # bulk_update sends no signals, so cached rankings and centroids are redone here
+        if updated:
+            invalidate_retrieval_caches()
+            refresh_movie_embeddings()
+
+        self.stdout.write(
+            "\nInner-product search needs its own HNSW index: with RAG_NORMALIZE_EMBEDDINGS=True "
+            "run `manage.py vector_index_status --sync-metric-index`"
+        )
+
+    def _normalize(self, model, options):
+        label = model._meta.verbose_name_plural
+        # Only touch rows that still need it, so the command is safe to re-run
+        tolerance = options['tolerance']
+        rows = model.objects.filter(embedding__isnull=False).annotate(
+            norm=Func(F('embedding'), function='vector_norm', output_field=FloatField())
+        ).filter(
+            Q(norm__gt=1.0 + tolerance) | Q(norm__lt=1.0 - tolerance)
+        )
+
+        total = rows.count()
+        embedded = model.objects.filter(embedding__isnull=False).count()
+
+        self.stdout.write(f"\nEmbedded {label}: {embedded}")
+        self.stdout.write(f"Not unit length: {total}")
+
+        if total == 0:
+            self._tag_normalized(model)
+            self.stdout.write(self.style.SUCCESS(f"✓ All {label} embeddings are already normalized"))
+            return 0
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("DRY RUN - No data was changed"))
+            return 0
+
+        batch_size = options['batch_size']
+        ids = list(rows.order_by('id').values_list('id', flat=True))
+        updated = 0
+        skipped = 0
+
+        for start in range(0, len(ids), batch_size):
+            batch_ids = ids[start:start + batch_size]
+
+            with transaction.atomic():
+                batch = list(
+                    model.objects.filter(id__in=batch_ids)
+                    .select_for_update()
+                    .only('id', 'embedding')
+                )
+
+                changed = []
+                for row in batch:
+                    vector = np.asarray(row.embedding, dtype='float32')
+                    norm = np.linalg.norm(vector)
+                    if norm == 0:
+                        skipped += 1
+                        continue
+                    row.embedding = vector / norm
+                    changed.append(row)
+
+                model.objects.bulk_update(changed, ['embedding'])
+                updated += len(changed)
+
+            self.stdout.write(f"  Progress: {updated + skipped}/{total}")
+
+        self._tag_normalized(model)
+
+        # Dead row versions keep their old, large-norm vectors in the HNSW
+        # graph and crowd out live rows under <#> until they are vacuumed
+        if connection.vendor == 'postgresql':
+            self.stdout.write("Vacuuming table to drop stale index entries...")
+            with connection.cursor() as cursor:
+                cursor.execute(f'VACUUM ANALYZE "{model._meta.db_table}"')
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Normalized {updated} {label} embeddings"))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"⚠️  Skipped {skipped} zero vectors"))
+        return updated
+
+    def _tag_normalized(self, model):
+        """
+        Unit-length rows are what the encoder returns with normalization on,
+        so relabel them and embedding commands will not re-encode them;
+        untagged rows predate model tracking and came from the same model
+        """
+        rag = RAGService()
+        plain_model_id = rag.model_name
+        rag.normalize = True
+
+        return model.objects.filter(
+            embedding__isnull=False, embedding_model__in=[plain_model_id, '']
+        ).update(embedding_model=rag.embedding_model_id)
@@ -0,0 +1,190 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from reports.models import SectionEmbedding
+from reports.signals import bulk_section_writes
+import hashlib
+import time
+
+# pgvector cannot HNSW-index vectors with more dimensions than this
+HNSW_MAX_DIM = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        'Embed sections with the next model version into the SectionEmbedding shadow table; '
+        'resumable, re-run until coverage is 100% and then set RAG_SERVE_NEXT_EMBEDDINGS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', type=str, help='Model to embed with (default: RAG_NEXT_EMBEDDING_MODEL)')
+        parser.add_argument('--dim', type=int, help='Its embedding size (default: RAG_NEXT_EMBEDDING_DIM)')
+        parser.add_argument('--limit', type=int, help='Stop after this many sections (the next run picks up from there)')
+        parser.add_argument('--batch-size', type=int, help='Sections per forward pass (default: RAG_EMBEDDING_BATCH_SIZE)')
+        parser.add_argument('--fetch-size', type=int, default=500, help='Sections read from the database at a time')
+        parser.add_argument('--status', action='store_true', help='Report coverage per version and exit')
+        parser.add_argument('--no-index', action='store_true', help='Do not build the HNSW index once coverage is complete')
+
+    @bulk_section_writes()
+    def handle(self, *args, **options):
+        from services.embedding_versions import (
+            current_version, next_version, serving_version, stale_sections, version_coverage
+        )
+        from services.rag_service import RAGService
+
+        version = next_version(options['model'], options['dim'])
+        current = current_version()
+
+        self.stdout.write("="*70)
+        self.stdout.write("EMBEDDING MODEL VERSIONS")
+        self.stdout.write("="*70)
+        self.stdout.write(f"  Current: {current.id} ({current.dim} dims, MovieSection.embedding)")
+        self.stdout.write(f"  Serving: {serving_version().id}")
+
+        if options['status']:
+            self._report_versions()
+            return
+
+        if version is None:
+            self.stdout.write(self.style.ERROR("Set RAG_NEXT_EMBEDDING_MODEL or pass --model"))
+            return
+
+        if version.id == current.id:
+            self.stdout.write(self.style.ERROR(f"{version.id} is the current version, nothing to re-embed"))
+            return
+
+        rag = RAGService(version=version)
+        embedded, total = version_coverage(version)
+        remaining = total - embedded
+        self.stdout.write(f"  Next:    {version.id} ({version.dim} dims), {embedded}/{total} sections up to date")
+
+        if remaining:
+            self.stdout.write("\nLoading embedding model...")
+            try:
+                probe = rag.load_model().encode(['probe'], convert_to_numpy=True, show_progress_bar=False)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Failed to load model: {e}"))
+                return
+
+            if probe.shape[1] != version.dim:
+                self.stdout.write(self.style.ERROR(
+                    f"{version.model_name} returns {probe.shape[1]} dims, not {version.dim}; "
+                    f"set RAG_NEXT_EMBEDDING_DIM or pass --dim"
+                ))
+                return
+            self.stdout.write(self.style.SUCCESS("✓ Model loaded"))
+
+            limit = min(remaining, options['limit']) if options['limit'] else remaining
+            self.stdout.write(f"\nEmbedding {limit} of {remaining} remaining sections...\n")
+            done, failed = self._reembed(rag, stale_sections(version), limit, embedded, total, options)
+            embedded += done
+        else:
+            done = failed = 0
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS(f"✓ Embedded: {done}"))
+        if failed:
+            self.stdout.write(self.style.ERROR(f"✗ Failed: {failed} (retried on the next run)"))
+        self.stdout.write(f"Coverage: {embedded}/{total} ({embedded / total * 100 if total else 100:.1f}%)")
+
+        if embedded < total:
+            self.stdout.write(self.style.WARNING("⚠️  Not complete: run the command again to resume"))
+        else:
+            if not options['no_index']:
+                self._build_index(version)
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {version.id} covers every section: set RAG_SERVE_NEXT_EMBEDDINGS=True "
+                f"and restart the workers to switch retrieval"
+            ))
+        self.stdout.write("="*70)
+
+    def _reembed(self, rag, stale, limit, embedded, total, options):
+        """
+        Walks the stale sections in id order, fetch_size at a time; rows
+        written by an earlier (interrupted) run are no longer stale, so
+        every run continues where the last one stopped
+        """
+        done = failed = 0
+        last_id = 0
+        started = time.monotonic()
+        reported = started
+
+        while done + failed < limit:
+            batch = list(
+                stale.filter(id__gt=last_id).only('id', 'movie_id', 'content').order_by('id')
+                [:min(options['fetch_size'], limit - done - failed)]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for section, error in rag.embed_sections(batch, options['batch_size']):
+                if error is None:
+                    done += 1
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"  ✗ Section {section.id}: {error}"))
+
+            if time.monotonic() - reported >= 5:
+                reported = time.monotonic()
+                self._report_progress(embedded + done, total, done, limit - done - failed, reported - started)
+
+        self._report_progress(embedded + done, total, done, 0, time.monotonic() - started)
+        return done, failed
+
+    def _report_progress(self, embedded, total, done, left, elapsed):
+        rate = done / elapsed if elapsed else 0.0
+        eta = f"{left / rate:.0f}s" if rate else '?'
+        self.stdout.write(
+            f"  {embedded}/{total} ({embedded / total * 100:.1f}%)  "
+            f"{rate:.1f} sections/s  ETA {eta}"
+        )
+
+    def _report_versions(self):
+        from services.embedding_versions import EmbeddingVersion, version_coverage
+
+        rows = SectionEmbedding.objects.values('model_version').annotate(rows=Count('id')).order_by('model_version')
+        if not rows:
+            self.stdout.write("\n  No shadow versions stored")
+
+        for row in rows:
+            # Coverage counts rows whose content hash still matches the section
+            model_version = row['model_version']
+            version = EmbeddingVersion(
+                model_version.removesuffix('+normalized'), None, model_version.endswith('+normalized'), True
+            )
+            embedded, total = version_coverage(version)
+            self.stdout.write(
+                f"\n  {row['model_version']}: {row['rows']} rows, {embedded}/{total} sections up to date"
+            )
+        self.stdout.write("="*70)
+
+    def _build_index(self, version):
+        """
+        Partial HNSW index over the version's rows, on the same cast
+        RAGService._versioned_search orders by
+        """
+        if connection.vendor != 'postgresql':
+            return
+
+        if version.dim > HNSW_MAX_DIM:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  {version.dim} dims is over the HNSW limit ({HNSW_MAX_DIM}), searches will scan"
+            ))
+            return
+
+        table = SectionEmbedding._meta.db_table
+        name = f"sectionembedding_hnsw_{hashlib.md5(version.id.encode()).hexdigest()[:12]}"
+        opclass = 'vector_ip_ops' if version.normalize else 'vector_cosine_ops'
+        model_version = version.id.replace("'", "''")
+
+        self.stdout.write(f"\nBuilding index {name}...")
+        started = time.time()
+        with connection.cursor() as cursor:
+            # CONCURRENTLY keeps the table writable; it cannot take bound parameters
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" '
+                f'USING hnsw ((embedding::vector({version.dim})) {opclass}) '
+                f"WHERE model_version = '{model_version}'"
+            )
+        self.stdout.write(self.style.SUCCESS(f"✓ Index ready in {time.time() - started:.1f}s"))
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from reports.models import MovieSection
+from reports.signals import bulk_section_writes
 from services.rag_service import RAGService
-from django.db import transaction
 
 class Command(BaseCommand):
     help = 'Regenerate embeddings for existing movie sections'
@@ -15,10 +15,16 @@ class Command(BaseCommand):
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=50,
-            help='Number of sections to process in each batch'
+            default=None,
+            help='Sections per forward pass (default: RAG_EMBEDDING_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--include-unchanged',
+            action='store_true',
+            help='Also re-encode sections whose content and model have not changed since they were embedded'
         )
     
+    @bulk_section_writes()
     def handle(self, *args, **options):
         rag = RAGService()
         
@@ -30,51 +36,44 @@ class Command(BaseCommand):
             sections = MovieSection.objects.filter(embedding__isnull=True)
             self.stdout.write(f"Generating embeddings for {sections.count()} sections without embeddings...")
         
-        if not sections.exists():
+        selected = sections.count()
+        if not options['include_unchanged']:
+            sections = rag.needs_embedding(sections)
+        
+        total = sections.count()
+        skipped = selected - total
+        if skipped:
+            self.stdout.write(f"Skipping {skipped} sections already embedded from the same content and model")
+        
+        if total == 0:
             self.stdout.write(self.style.SUCCESS('No sections need embedding generation!'))
             return
         
         batch_size = options['batch_size']
-        total = sections.count()
         processed = 0
         failed = 0
         
-        # Process in batches
-        for i in range(0, total, batch_size):
-            batch = sections[i:i + batch_size]
-            
-            for section in batch:
-                try:
-                    self.stdout.write(f"Processing: {section.movie.title} - {section.get_section_type_display()}")
-                    print("1")
-                    
-                    # Generate embedding
-                    embedding = rag.generate_embedding(section.content)
-                    print("2")
-                    # Save with embedding
-                    section.embedding = embedding
-                    print("3")
-                    section.save(update_fields=['embedding'])
-                    print("4")
-                    
-                    processed += 1
-                    print("5")
-                    
-                    if processed % 10 == 0:
-                        self.stdout.write(self.style.SUCCESS(f"  Progress: {processed}/{total}"))
-                        print("6")
-                    print("7")
-                    
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"  ✗ Error: {e}: {e.__traceback__}"))
-                    failed += 1
-            
-            self.stdout.write(f"Batch {i//batch_size + 1} completed")
+        # Stream through one cursor: offset slices of a queryset filtered on
+        # embedding__isnull would skip rows as earlier batches get embeddings
+        sections = sections.select_related('movie').order_by('id')
+        
+        for section, error in rag.embed_sections(sections.iterator(), batch_size):
+            if error is None:
+                processed += 1
+                
+                if processed % 10 == 0:
+                    self.stdout.write(self.style.SUCCESS(f"  Progress: {processed}/{total}"))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f"  ✗ Error: {section.movie.title} - {section.get_section_type_display()}: {error}"
+                ))
+                failed += 1
         
         # Final stats
         self.stdout.write(self.style.SUCCESS(f"\n✓ Completed!"))
         self.stdout.write(f"  Processed: {processed}")
         self.stdout.write(f"  Failed: {failed}")
+        self.stdout.write(f"  Skipped (unchanged): {skipped}")
         self.stdout.write(f"  Success rate: {(processed/(processed+failed)*100):.1f}%")
         
         # Verify
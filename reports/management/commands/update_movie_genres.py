@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from movies.models import Movie, Genre
+from reports.signals import bulk_section_writes
 from services.tmdb_service import TMDBService
 import time
 
@@ -13,6 +14,7 @@ class Command(BaseCommand):
             help='Update specific movie by ID'
         )
     
+    @bulk_section_writes()
     def handle(self, *args, **options):
         tmdb = TMDBService()
         
@@ -0,0 +1,220 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from importlib import import_module
+from reports.models import MovieSection
+from services.rag_service import RAGService, sync_metric_indexes
+import numpy as np
+import re
+import time
+
+# Expression indexes RAG_QUANTIZATION searches through, defined by this migration
+QUANTIZED_MIGRATION = 'reports.migrations.0010_quantized_embedding_indexes'
+QUANTIZED_INDEXES = {
+    'halfvec': 'moviesection_embedding_half_hnsw',
+    'binary': 'moviesection_embedding_bit_hnsw',
+}
+
+
+class Command(BaseCommand):
+    help = 'Report pgvector index size, build time and whether retrieval uses the index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            type=str,
+            help='Embed this text for the EXPLAIN (default: random vector, no model load)'
+        )
+        parser.add_argument(
+            '--movie-id',
+            type=int,
+            help='Explain the movie-scoped retrieval query instead of global chat'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=5,
+            help='Number of results the chat asks for (index scan fetches k*3)'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (executes the query)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='REINDEX CONCURRENTLY each vector index and report the build time'
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Create the quantized indexes migration 0010 skipped (pgvector was older than 0.7)'
+        )
+        parser.add_argument(
+            '--sync-metric-index',
+            action='store_true',
+            help='Build the HNSW index for the metric RAG_NORMALIZE_EMBEDDINGS selects and drop the other one'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR("Vector indexes require PostgreSQL with pgvector"))
+            return
+
+        table = MovieSection._meta.db_table
+
+        self.stdout.write("="*70)
+        self.stdout.write("VECTOR INDEX STATUS")
+        self.stdout.write("="*70)
+
+        if options['create_missing']:
+            self._create_missing()
+
+        if options['sync_metric_index']:
+            self._sync_metric_index()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            row = cursor.fetchone()
+            self.stdout.write(f"\n  pgvector version: {row[0] if row else 'not installed'}")
+
+            cursor.execute(
+                """
+                SELECT c.relname, am.amname, pg_relation_size(c.oid), i.indisvalid
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_am am ON am.oid = c.relam
+                WHERE i.indrelid = %s::regclass AND am.amname IN ('hnsw', 'ivfflat')
+                ORDER BY c.relname
+                """,
+                [table]
+            )
+            indexes = cursor.fetchall()
+
+            cursor.execute('SELECT pg_relation_size(%s::regclass)', [table])
+            table_size = cursor.fetchone()[0]
+
+        total = MovieSection.objects.count()
+        embedded = MovieSection.objects.filter(embedding__isnull=False).count()
+
+        self.stdout.write(f"  Sections: {total} ({embedded} with embeddings)")
+        self.stdout.write(f"  Table size: {self._size(table_size)}")
+
+        self.stdout.write(f"\n📦 INDEXES:")
+        if not indexes:
+            self.stdout.write(self.style.ERROR("  No HNSW/IVFFlat index on the embedding column"))
+
+        for name, method, size, valid in indexes:
+            status = self.style.SUCCESS("valid") if valid else self.style.ERROR("INVALID (rebuild it)")
+            self.stdout.write(f"  {name} ({method}): {self._size(size)} - {status}")
+
+        metric_index, unused_index = 'moviesection_embedding_hnsw', 'moviesection_embedding_hnsw_ip'
+        if settings.RAG_NORMALIZE_EMBEDDINGS:
+            metric_index, unused_index = unused_index, metric_index
+        if metric_index not in {name for name, _, _, _ in indexes}:
+            self.stdout.write(self.style.WARNING(
+                f"  ⚠️  {metric_index} (the metric RAG_NORMALIZE_EMBEDDINGS ranks with) is missing: "
+                f"run with --sync-metric-index"
+            ))
+        elif unused_index in {name for name, _, _, _ in indexes}:
+            self.stdout.write(self.style.WARNING(
+                f"  ⚠️  {unused_index} is not used by searches but still costs memory and writes: "
+                f"run with --sync-metric-index to drop it"
+            ))
+
+        quantized_index = QUANTIZED_INDEXES.get(settings.RAG_QUANTIZATION)
+        if quantized_index and quantized_index not in {name for name, _, _, _ in indexes}:
+            self.stdout.write(self.style.WARNING(
+                f"  ⚠️  RAG_QUANTIZATION={settings.RAG_QUANTIZATION} but {quantized_index} is missing: "
+                f"searches scan the table. Run with --create-missing (needs pgvector >= 0.7)"
+            ))
+
+        if options['rebuild']:
+            self.stdout.write(f"\n🔨 REBUILD:")
+            for name, method, _, _ in indexes:
+                started = time.time()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'REINDEX INDEX CONCURRENTLY "{name}"')
+                    cursor.execute('SELECT pg_relation_size(%s::regclass)', [name])
+                    size = cursor.fetchone()[0]
+                self.stdout.write(self.style.SUCCESS(
+                    f"  ✓ {name}: built in {time.time() - started:.2f}s ({self._size(size)})"
+                ))
+
+        self._explain(options, [name for name, _, _, _ in indexes])
+
+    def _sync_metric_index(self):
+        metric = 'inner product' if settings.RAG_NORMALIZE_EMBEDDINGS else 'cosine'
+        self.stdout.write(f"\n🔨 METRIC INDEXES ({metric}):")
+
+        started = time.time()
+        created, dropped = sync_metric_indexes()
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f"  ✓ Built {name}"))
+        for name in dropped:
+            self.stdout.write(f"  Dropped {name}")
+        if not created and not dropped:
+            self.stdout.write("  Already in sync")
+        else:
+            self.stdout.write(f"  Done in {time.time() - started:.2f}s")
+
+    def _create_missing(self):
+        migration = import_module(QUANTIZED_MIGRATION)
+
+        self.stdout.write(f"\n🔨 QUANTIZED INDEXES:")
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with connection.schema_editor(atomic=False) as schema_editor:
+            if not migration.supports_quantization(schema_editor):
+                self.stdout.write(self.style.ERROR("  Requires pgvector >= 0.7 (ALTER EXTENSION vector UPDATE)"))
+                return
+
+            for name, expression in migration.INDEXES.items():
+                started = time.time()
+                schema_editor.execute(migration.index_sql(name, expression))
+                self.stdout.write(self.style.SUCCESS(f"  ✓ {name} ({time.time() - started:.2f}s)"))
+
+    def _explain(self, options, index_names):
+        rag = RAGService()
+
+        if options['query']:
+            query_embedding = rag.generate_embedding(options['query'])
+        else:
+            query_embedding = np.random.default_rng(0).normal(size=rag.embedding_dim).astype('float32')
+
+        queryset = rag._pgvector_reranked_queryset(
+            query_embedding, 'general', options['k'], options['movie_id']
+        )
+
+        self.stdout.write(f"\n🔍 RETRIEVAL QUERY PLAN:")
+        min_ef_search = rag._shortlist_size(options['k']*3) if settings.RAG_QUANTIZATION else None
+        tuning = rag._search_tuning(min_ef_search)
+        if settings.RAG_QUANTIZATION:
+            self.stdout.write(f"  Quantization: {settings.RAG_QUANTIZATION} (shortlist {min_ef_search})")
+        if tuning:
+            self.stdout.write("  Settings: " + ", ".join(f"{k}={v}" for k, v in tuning.items()))
+
+        with transaction.atomic():
+            rag.apply_search_tuning(min_ef_search)
+            plan = queryset.explain(analyze=options['analyze'])
+
+        for line in plan.splitlines():
+            # Elide the 384-float query vector and bit-string literals
+            line = re.sub(r"'\[[^\]]*\]'", "'[...]'", line)
+            self.stdout.write("    " + re.sub(r"'[01]{16,}'", "'...'", line))
+
+        used = [name for name in index_names if name in plan]
+        if used:
+            self.stdout.write(self.style.SUCCESS(f"\n  ✓ Planner uses index: {', '.join(used)}"))
+        else:
+            self.stdout.write(self.style.WARNING(
+                "\n  ⚠️  Planner does not use a vector index (sequential scan). "
+                "Small tables and movie-scoped queries are expected to scan."
+            ))
+
+    def _size(self, num_bytes):
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if num_bytes < 1024:
+                return f"{num_bytes:.1f} {unit}"
+            num_bytes /= 1024
+        return f"{num_bytes:.1f} TB"
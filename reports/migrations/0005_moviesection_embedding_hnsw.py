@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-17 21:04
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+import pgvector.django.indexes
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("reports", "0004_alter_moviesection_section_type"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="moviesection",
+            index=pgvector.django.indexes.HnswIndex(
+                ef_construction=64,
+                fields=["embedding"],
+                m=16,
+                name="moviesection_embedding_hnsw",
+                opclasses=["vector_cosine_ops"],
+            ),
+        ),
+    ]
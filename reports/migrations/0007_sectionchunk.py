@@ -0,0 +1,92 @@
+# Generated by Django 4.2.16 on 2026-10-17 21:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import pgvector.django.indexes
+import pgvector.django.vector
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0004_movieview"),
+        ("reports", "0006_moviesection_embedding_hnsw_ip"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SectionChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "section_type",
+                    models.CharField(
+                        choices=[
+                            ("production", "Production & Release"),
+                            ("plot_structure", "Plot & Structure"),
+                            ("cast_crew", "Cast & Crew"),
+                            ("characters", "Characters & Relationships"),
+                            ("visual_technical", "Visual & Technical Mastery"),
+                            ("themes", "Themes & Symbolism"),
+                            ("reception", "Critical Reception & Analysis"),
+                            ("legacy", "Cultural Impact & Legacy"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("chunk_index", models.IntegerField()),
+                ("start_char", models.IntegerField(default=0)),
+                ("content", models.TextField()),
+                (
+                    "embedding",
+                    pgvector.django.vector.VectorField(
+                        blank=True, dimensions=384, null=True
+                    ),
+                ),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="section_chunks",
+                        to="movies.movie",
+                    ),
+                ),
+                (
+                    "section",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="reports.moviesection",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["section", "chunk_index"],
+                "indexes": [
+                    pgvector.django.indexes.HnswIndex(
+                        ef_construction=64,
+                        fields=["embedding"],
+                        m=16,
+                        name="sectionchunk_embedding_hnsw",
+                        opclasses=["vector_cosine_ops"],
+                    ),
+                    pgvector.django.indexes.HnswIndex(
+                        ef_construction=64,
+                        fields=["embedding"],
+                        m=16,
+                        name="sectionchunk_embedding_hnsw_ip",
+                        opclasses=["vector_ip_ops"],
+                    ),
+                ],
+                "unique_together": {("section", "chunk_index")},
+            },
+        ),
+    ]
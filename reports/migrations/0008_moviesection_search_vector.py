@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-17 21:19
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0007_sectionchunk"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="moviesection",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        # Keep search_vector in sync with content on every insert and update,
+        # including bulk_update and raw SQL that bypass model save()
+        migrations.RunSQL(
+            sql="""
+            CREATE TRIGGER moviesection_search_vector_update
+            BEFORE INSERT OR UPDATE OF content ON reports_moviesection
+            FOR EACH ROW EXECUTE FUNCTION
+            tsvector_update_trigger(search_vector, 'pg_catalog.english', content);
+
+            UPDATE reports_moviesection
+            SET search_vector = to_tsvector('pg_catalog.english', content);
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS moviesection_search_vector_update
+            ON reports_moviesection;
+            """,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-17 21:19
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+import django.contrib.postgres.indexes
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("reports", "0008_moviesection_search_vector"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="moviesection",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="moviesection_search_gin"
+            ),
+        ),
+    ]
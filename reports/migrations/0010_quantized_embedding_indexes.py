@@ -0,0 +1,74 @@
+from django.db import migrations
+import warnings
+
+# Expression indexes over the float32 column: the graph stores only the
+# compact codes, the heap keeps full precision for rescoring. halfvec and
+# binary_quantize need pgvector >= 0.7, so they live outside Meta.indexes
+# and are skipped on older servers; the migration is still recorded as
+# applied, so after upgrading create them with
+# `manage.py vector_index_status --create-missing`.
+INDEXES = {
+    "moviesection_embedding_half_hnsw": (
+        "(embedding::halfvec(384)) halfvec_cosine_ops"
+    ),
+    "moviesection_embedding_bit_hnsw": (
+        "(binary_quantize(embedding)::bit(384)) bit_hamming_ops"
+    ),
+}
+
+
+def supports_quantization(schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return False
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+
+    if row is None:
+        return False
+    major, minor = (int(part) for part in row[0].split(".")[:2])
+    return (major, minor) >= (0, 7)
+
+
+def index_sql(name, expression):
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+        f"ON reports_moviesection USING hnsw ({expression}) "
+        f"WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def create_indexes(apps, schema_editor):
+    if not supports_quantization(schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            warnings.warn(
+                "Skipped the quantized embedding indexes: they need pgvector >= 0.7. "
+                "RAG_QUANTIZATION scans the table until they exist; after upgrading "
+                "pgvector run `manage.py vector_index_status --create-missing`."
+            )
+        return
+
+    for name, expression in INDEXES.items():
+        schema_editor.execute(index_sql(name, expression))
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("reports", "0009_moviesection_search_gin"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-17 21:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0010_quantized_embedding_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="moviesection",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="moviesection",
+            name="embedding_model",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
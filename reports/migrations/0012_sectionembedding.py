@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-17 21:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+import pgvector.django.vector
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0011_moviesection_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SectionEmbedding",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_version", models.CharField(max_length=255)),
+                ("embedding", pgvector.django.vector.VectorField()),
+                ("content_hash", models.CharField(max_length=32)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "section",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="versioned_embeddings",
+                        to="reports.moviesection",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["model_version"], name="reports_sec_model_v_63c8f6_idx"
+                    )
+                ],
+                "unique_together": {("section", "model_version")},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.16 on 2026-10-17 22:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import pgvector.django.indexes
+import pgvector.django.vector
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0004_movieview"),
+        ("reports", "0012_sectionembedding"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MovieEmbedding",
+            fields=[
+                (
+                    "movie",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="centroid",
+                        serialize=False,
+                        to="movies.movie",
+                    ),
+                ),
+                ("embedding", pgvector.django.vector.VectorField(dimensions=384)),
+                ("section_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    pgvector.django.indexes.HnswIndex(
+                        ef_construction=64,
+                        fields=["embedding"],
+                        m=16,
+                        name="movieembedding_hnsw",
+                        opclasses=["vector_cosine_ops"],
+                    )
+                ],
+            },
+        ),
+    ]
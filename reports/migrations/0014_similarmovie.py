@@ -0,0 +1,56 @@
+# Generated by Django 4.2.16 on 2026-10-17 22:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0004_movieview"),
+        ("reports", "0013_movieembedding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movieembedding",
+            name="similar_stale",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.CreateModel(
+            name="SimilarMovie",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.IntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_movies",
+                        to="movies.movie",
+                    ),
+                ),
+                (
+                    "similar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_to",
+                        to="movies.movie",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["movie", "rank"],
+                "unique_together": {("movie", "rank")},
+            },
+        ),
+    ]
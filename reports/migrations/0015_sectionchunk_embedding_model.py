@@ -0,0 +1,43 @@
+# Generated by Django 4.2.16 on 2026-10-17 22:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def tag_existing_chunks(apps, schema_editor):
+    """
+    Label stored passage vectors with the current model id so the next
+    chunk sync keeps them. Under RAG_NORMALIZE_EMBEDDINGS only unit-length
+    ones qualify; the rest stay untagged and are renormalized by
+    `manage.py normalize_embeddings` or re-encoded on the next sync.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    model_id = settings.RAG_EMBEDDING_MODEL
+    unit_only = ""
+    if settings.RAG_NORMALIZE_EMBEDDINGS:
+        model_id += "+normalized"
+        unit_only = "AND abs(vector_norm(embedding) - 1.0) <= 1e-4"
+
+    schema_editor.execute(
+        f"UPDATE reports_sectionchunk SET embedding_model = %s "
+        f"WHERE embedding IS NOT NULL {unit_only}",
+        [model_id],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0014_similarmovie"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sectionchunk",
+            name="embedding_model",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.RunPython(tag_existing_chunks, migrations.RunPython.noop),
+    ]
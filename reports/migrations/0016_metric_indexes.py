@@ -0,0 +1,68 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:01
+
+from django.db import migrations
+
+# Retrieval ranks with one metric (inner product under RAG_NORMALIZE_EMBEDDINGS,
+# cosine otherwise), so only its HNSW index is needed on each table. This
+# migration only stops declaring them on the models: migrating drops nothing,
+# since which index is unused depends on settings. Dropping it is an explicit
+# step, `manage.py vector_index_status --sync-metric-index`, which manages
+# these indexes from here on. Migrating back recreates whichever is missing.
+INDEXES = {
+    "reports_moviesection": {
+        "vector_cosine_ops": "moviesection_embedding_hnsw",
+        "vector_ip_ops": "moviesection_embedding_hnsw_ip",
+    },
+    "reports_sectionchunk": {
+        "vector_cosine_ops": "sectionchunk_embedding_hnsw",
+        "vector_ip_ops": "sectionchunk_embedding_hnsw_ip",
+    },
+}
+
+
+def restore_both_metrics(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table, indexes in INDEXES.items():
+        for opclass, name in indexes.items():
+            schema_editor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} USING hnsw (embedding {opclass}) "
+                f"WITH (m = 16, ef_construction = 64)"
+            )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("reports", "0015_sectionchunk_embedding_model"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name="moviesection",
+                    name="moviesection_embedding_hnsw",
+                ),
+                migrations.RemoveIndex(
+                    model_name="moviesection",
+                    name="moviesection_embedding_hnsw_ip",
+                ),
+                migrations.RemoveIndex(
+                    model_name="sectionchunk",
+                    name="sectionchunk_embedding_hnsw",
+                ),
+                migrations.RemoveIndex(
+                    model_name="sectionchunk",
+                    name="sectionchunk_embedding_hnsw_ip",
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(migrations.RunPython.noop, restore_both_metrics),
+            ],
+        ),
+    ]
@@ -1,6 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from movies.models import Movie
-from pgvector.django import VectorField
+from pgvector.django import VectorField, HnswIndex
 
 class MovieSection(models.Model):
     SECTION_TYPES = [
@@ -21,6 +23,12 @@ class MovieSection(models.Model):
     key_topics = models.JSONField(default=list, blank=True)
     generated_at = models.DateTimeField(auto_now_add=True)
     embedding = VectorField(dimensions=384, null=True, blank=True)
+    # What the stored embedding was computed from: MD5 of that content and
+    # RAGService.embedding_model_id, so unchanged rows are not re-encoded
+    content_hash = models.CharField(max_length=32, blank=True, default='')
+    embedding_model = models.CharField(max_length=255, blank=True, default='')
+    # Maintained from content by a database trigger (migration 0008)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         unique_together = ['movie', 'section_type']
@@ -28,6 +36,8 @@ class MovieSection(models.Model):
         indexes = [
             models.Index(fields=['section_type']),
             models.Index(fields=['generated_at']),
+            # HNSW on embedding: one per metric in use (services.rag_service.sync_metric_indexes)
+            GinIndex(name='moviesection_search_gin', fields=['search_vector']),
         ]
     
     def __str__(self):
@@ -59,4 +69,93 @@ class MovieSection(models.Model):
             'reception': 400,
             'legacy': 400,
         }
-        return targets.get(self.section_type, 500)
\ No newline at end of file
+        return targets.get(self.section_type, 500)
+
+class SectionChunk(models.Model):
+    """Overlapping passage of a section, embedded on its own for retrieval"""
+    section = models.ForeignKey(MovieSection, on_delete=models.CASCADE, related_name='chunks')
+    # Denormalized from the section so chunk search filters and reranks without a join
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='section_chunks')
+    section_type = models.CharField(max_length=50, choices=MovieSection.SECTION_TYPES)
+    chunk_index = models.IntegerField()
+    start_char = models.IntegerField(default=0)
+    content = models.TextField()
+    embedding = VectorField(dimensions=384, null=True, blank=True)
+    # RAGService.embedding_model_id, so a model or normalization change re-encodes the passage
+    embedding_model = models.CharField(max_length=255, blank=True, default='')
+    
+    class Meta:
+        unique_together = ['section', 'chunk_index']
+        ordering = ['section', 'chunk_index']
+    
+    def __str__(self):
+        return f"{self.section} - chunk {self.chunk_index}"
+
+class MovieEmbedding(models.Model):
+    """
+    Mean of a movie's section embeddings, kept current by signals: the
+    first stage of two-stage global retrieval (RAG_TWO_STAGE_MOVIES) and
+    the vector behind SimilarMovie
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='centroid')
+    embedding = VectorField(dimensions=384)
+    section_count = models.IntegerField(default=0)
+    # Set when the centroid or the movie's genres change, cleared once its
+    # SimilarMovie neighbours are recomputed (`manage.py compute_similar_movies`)
+    similar_stale = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            HnswIndex(
+                name='movieembedding_hnsw',
+                fields=['embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_cosine_ops'],
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.movie} - centroid of {self.section_count} sections"
+
+class SimilarMovie(models.Model):
+    """
+    Precomputed neighbour of a movie by centroid similarity and genre
+    overlap, rank 1 being the closest (services.similar_movies)
+    """
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='similar_movies')
+    similar = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='similar_to')
+    rank = models.IntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        unique_together = ['movie', 'rank']
+        ordering = ['movie', 'rank']
+    
+    def __str__(self):
+        return f"{self.movie} -> {self.similar} (#{self.rank})"
+
+class SectionEmbedding(models.Model):
+    """
+    A section's embedding under another model version than
+    MovieSection.embedding holds: filled by `manage.py reembed_sections`
+    while the current version keeps serving (see services.embedding_versions)
+    """
+    section = models.ForeignKey(MovieSection, on_delete=models.CASCADE, related_name='versioned_embeddings')
+    # RAGService.embedding_model_id of the version
+    model_version = models.CharField(max_length=255)
+    # No fixed dimensions, so versions of any size share the table; searches
+    # cast to the version's size to use its partial HNSW index
+    embedding = VectorField()
+    content_hash = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['section', 'model_version']
+        indexes = [
+            models.Index(fields=['model_version']),
+        ]
+    
+    def __str__(self):
+        return f"{self.section} - {self.model_version}"
@@ -0,0 +1,199 @@
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from movies.models import Movie
+from .models import MovieEmbedding, MovieSection
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=MovieSection)
+def section_saved(sender, instance, update_fields=None, **kwargs):
+    from services.ann_index import get_section_index
+
+    index = get_section_index()
+    if index is None or not index.is_ready:
+        return
+
+    if update_fields is not None and 'embedding' not in update_fields:
+        return
+
+    section_id, movie_id, embedding = instance.id, instance.movie_id, instance.embedding
+    transaction.on_commit(lambda: index.upsert(section_id, movie_id, embedding))
+
+
+@receiver(post_save, sender=MovieSection)
+def section_chunks_sync(sender, instance, update_fields=None, **kwargs):
+    if not settings.RAG_CHUNKS_ENABLED:
+        return
+
+    if update_fields is not None and 'content' not in update_fields:
+        return
+
+    def sync():
+        from services.rag_service import RAGService
+
+        for section, error in RAGService().sync_section_chunks([instance]):
+            if error is not None:
+                logger.error(f"Chunk sync failed for section {section.id}: {error}")
+
+    transaction.on_commit(sync)
+
+
+@receiver(post_delete, sender=MovieSection)
+def section_deleted(sender, instance, **kwargs):
+    from services.ann_index import get_section_index
+
+    index = get_section_index()
+    if index is None or not index.is_ready:
+        return
+
+    section_id = instance.id
+    transaction.on_commit(lambda: index.remove(section_id))
+
+
+# Fields that change which sections a search returns or how they rank
+RETRIEVAL_FIELDS = {'embedding', 'content', 'section_type', 'movie', 'movie_id'}
+
+
+@receiver(post_save, sender=MovieSection)
+def section_saved_search_caches(sender, instance, created=False, update_fields=None, **kwargs):
+    from services.rag_service import invalidate_retrieval_caches
+
+    if not created and update_fields is not None and not RETRIEVAL_FIELDS & set(update_fields):
+        return
+
+    movie_id = instance.movie_id
+    transaction.on_commit(lambda: invalidate_retrieval_caches([movie_id]))
+
+
+@receiver(post_delete, sender=MovieSection)
+def section_deleted_search_caches(sender, instance, **kwargs):
+    from services.rag_service import invalidate_retrieval_caches
+
+    movie_id = instance.movie_id
+    transaction.on_commit(lambda: invalidate_retrieval_caches([movie_id]))
+
+
+# Fields that move a section's vector into or out of a movie's centroid
+CENTROID_FIELDS = {'embedding', 'movie', 'movie_id'}
+
+
+@receiver(post_save, sender=MovieSection)
+def section_saved_movie_embedding(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not CENTROID_FIELDS & set(update_fields):
+        return
+
+    schedule_movie_refresh([instance.movie_id])
+
+
+@receiver(post_delete, sender=MovieSection)
+def section_deleted_movie_embedding(sender, instance, **kwargs):
+    schedule_movie_refresh([instance.movie_id])
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+def movie_genres_changed(sender, instance, action, reverse, pk_set=None, **kwargs):
+    # Genre overlap is part of the similar-movies score
+    if action in ('post_add', 'post_remove'):
+        movie_ids = pk_set if reverse else [instance.pk]
+    elif action == 'pre_clear':
+        movie_ids = list(instance.movies.values_list('id', flat=True)) if reverse else [instance.pk]
+    else:
+        return
+
+    MovieEmbedding.objects.filter(movie_id__in=movie_ids).update(similar_stale=True)
+    schedule_movie_refresh()
+
+
+class MovieRefresh:
+    """
+    Centroid refresh for the movies whose sections changed, then one
+    similar-movies refresh; collected per transaction or bulk block and
+    run once on commit
+    """
+
+    def __init__(self):
+        self.movie_ids = set()
+
+    def __call__(self):
+        from services.rag_service import refresh_movie_embeddings
+
+        if self.movie_ids:
+            try:
+                refresh_movie_embeddings(sorted(self.movie_ids))
+            except Exception as e:
+                logger.error(f"Movie centroid refresh failed: {e}")
+
+        # Picks up the centroids just flagged similar_stale
+        refresh_similar_movies()
+
+
+# Per-thread state of bulk_section_writes(): nesting depth and its MovieRefresh
+_bulk = threading.local()
+
+
+@contextmanager
+def bulk_section_writes():
+    """
+    Defer the centroid and similar-movies refreshes of section and genre
+    writes made in this block to a single one at its end; wrap bulk
+    commands and admin actions in it, since a refresh per saved section
+    rescores the whole catalog each time
+    """
+    outermost = not getattr(_bulk, 'depth', 0)
+    if outermost:
+        _bulk.depth, _bulk.refresh = 0, MovieRefresh()
+
+    _bulk.depth += 1
+    try:
+        yield
+    finally:
+        _bulk.depth -= 1
+        if outermost:
+            refresh, _bulk.refresh = _bulk.refresh, None
+            transaction.on_commit(refresh)
+
+
+def schedule_movie_refresh(movie_ids=()):
+    """
+    Queue a centroid refresh for these movies and a similar-movies refresh:
+    into the open bulk_section_writes() block, else into the one MovieRefresh
+    of the current atomic block (run right away outside a transaction)
+    """
+    if getattr(_bulk, 'depth', 0):
+        _bulk.refresh.movie_ids.update(movie_ids)
+        return
+
+    # Already queued by an earlier write in this atomic block (gone if it rolled
+    # back); atomic(savepoint=False) blocks, as in m2m add(), record None
+    savepoint_ids = set(connection.savepoint_ids) - {None}
+    for entry in connection.run_on_commit:
+        if entry[0] - {None} == savepoint_ids and isinstance(entry[1], MovieRefresh):
+            entry[1].movie_ids.update(movie_ids)
+            return
+
+    refresh = MovieRefresh()
+    refresh.movie_ids.update(movie_ids)
+    transaction.on_commit(refresh)
+
+
+def refresh_similar_movies():
+    """
+    Incremental refresh of neighbour lists after a centroid or genre change
+    (SIMILAR_MOVIES_REFRESH_ON_SAVE); runs after commit, so a failure here
+    is logged and left to `manage.py compute_similar_movies`
+    """
+    from services.similar_movies import refresh_stale_similar_movies
+
+    if not settings.SIMILAR_MOVIES_REFRESH_ON_SAVE or connection.vendor != 'postgresql':
+        return
+
+    try:
+        refresh_stale_similar_movies()
+    except Exception as e:
+        logger.error(f"Similar movies refresh failed: {e}")
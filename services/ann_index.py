@@ -0,0 +1,238 @@
+from django.conf import settings
+import logging
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Global index instance, shared by every RAGService in the process
+_section_index = None
+_section_index_lock = threading.Lock()
+
+
+class SectionANNIndex:
+    """
+    In-process HNSW index (hnswlib) over MovieSection embeddings.
+
+    Labels are MovieSection ids, so hits map straight back to rows.
+    Distances use the cosine space and match pgvector's CosineDistance.
+
+    Signals keep it current with writes made in this process. Writes from
+    other processes (management commands) are seen through the retrieval
+    cache's shared counters when RAG_RETRIEVAL_CACHE is on, otherwise only
+    by the periodic rebuild (RAG_ANN_MAX_AGE).
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.m = settings.RAG_ANN_M
+        self.ef_construction = settings.RAG_ANN_EF_CONSTRUCTION
+        self.ef_search = settings.RAG_ANN_EF_SEARCH
+        self.max_age = settings.RAG_ANN_MAX_AGE
+
+        self._index = None
+        self._lock = threading.RLock()
+        self._rebuilding = False
+        self._section_movie = {}
+        self._movie_sections = {}
+        self.built_at = None
+        self.version = None
+
+    @property
+    def is_ready(self):
+        return self._index is not None
+
+    def __len__(self):
+        return len(self._section_movie)
+
+    def _shared_version(self):
+        """Counters section writes in any process bump (None without RAG_RETRIEVAL_CACHE)"""
+        from services.rag_service import get_retrieval_cache
+
+        cache = get_retrieval_cache()
+        return cache.versions() if cache is not None else None
+
+    def _new_index(self, capacity):
+        import hnswlib
+
+        index = hnswlib.Index(space='cosine', dim=self.dim)
+        index.init_index(
+            max_elements=capacity,
+            ef_construction=self.ef_construction,
+            M=self.m
+        )
+        index.set_ef(self.ef_search)
+        return index
+
+    def build(self, batch_size=5000):
+        """Load every embedded section from the DB and build a fresh index."""
+        from reports.models import MovieSection
+
+        started = time.time()
+        # Read first: a write landing while rows load triggers another rebuild
+        version = self._shared_version()
+        rows = MovieSection.objects.filter(
+            embedding__isnull=False
+        ).values_list('id', 'movie_id', 'embedding').order_by('id')
+
+        total = rows.count()
+        index = self._new_index(max(int(total * 1.2), 1024))
+        section_movie = {}
+        movie_sections = {}
+
+        ids, vectors = [], []
+        for section_id, movie_id, embedding in rows.iterator(chunk_size=batch_size):
+            ids.append(section_id)
+            vectors.append(embedding)
+            section_movie[section_id] = movie_id
+            movie_sections.setdefault(movie_id, set()).add(section_id)
+
+            if len(ids) >= batch_size:
+                index.add_items(np.asarray(vectors, dtype='float32'), ids)
+                ids, vectors = [], []
+
+        if ids:
+            index.add_items(np.asarray(vectors, dtype='float32'), ids)
+
+        with self._lock:
+            self._index = index
+            self._section_movie = section_movie
+            self._movie_sections = movie_sections
+            self.built_at = time.time()
+            self.version = version
+
+        logger.info(
+            f"ANN index built: {len(section_movie)} sections in {time.time() - started:.2f}s"
+        )
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                logger.error(f"ANN index rebuild failed: {e}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name='ann-index-rebuild', daemon=True).start()
+
+    def upsert(self, section_id, movie_id, embedding):
+        with self._lock:
+            if self._index is None:
+                return
+
+            if embedding is None:
+                self._remove_locked(section_id)
+                return
+
+            if self._index.get_current_count() >= self._index.get_max_elements():
+                self._index.resize_index(self._index.get_max_elements() * 2)
+
+            old_movie = self._section_movie.get(section_id)
+            if old_movie is not None and old_movie != movie_id:
+                self._movie_sections.get(old_movie, set()).discard(section_id)
+
+            # Re-adding an existing (or deleted) label updates it in place
+            self._index.add_items(np.asarray([embedding], dtype='float32'), [section_id])
+            self._section_movie[section_id] = movie_id
+            self._movie_sections.setdefault(movie_id, set()).add(section_id)
+
+    def remove(self, section_id):
+        with self._lock:
+            if self._index is None:
+                return
+            self._remove_locked(section_id)
+
+    def _remove_locked(self, section_id):
+        movie_id = self._section_movie.pop(section_id, None)
+        if movie_id is None:
+            return
+
+        self._movie_sections.get(movie_id, set()).discard(section_id)
+        self._index.mark_deleted(section_id)
+
+    def query(self, embedding, k, movie_id=None):
+        """
+        Return [(section_id, cosine_distance), ...] nearest first,
+        or None if the index cannot answer (caller falls back to pgvector).
+        """
+        if self._index is None:
+            # Startup build failed or never ran: build now, serve from pgvector meanwhile
+            self._rebuild_in_background()
+            return None
+
+        if self.version != self._shared_version():
+            # Sections written by another process since the build: serve from pgvector until rebuilt
+            self._rebuild_in_background()
+            return None
+
+        if self.max_age and self.built_at and time.time() - self.built_at > self.max_age:
+            self._rebuild_in_background()
+
+        query = np.asarray(embedding, dtype='float32')
+
+        with self._lock:
+            if movie_id:
+                # A single movie only has a handful of sections: rank them exactly
+                labels = list(self._movie_sections.get(int(movie_id), ()))
+                if not labels:
+                    return []
+
+                vectors = np.asarray(self._index.get_items(labels), dtype='float32')
+                norm = np.linalg.norm(query)
+                similarities = vectors @ (query / norm) if norm else np.zeros(len(labels))
+                order = np.argsort(-similarities)[:k]
+                return [(labels[i], float(1.0 - similarities[i])) for i in order]
+
+            count = len(self._section_movie)
+            if count == 0:
+                return []
+
+            k = min(k, count)
+            if k > self.ef_search:
+                self._index.set_ef(k)
+
+            try:
+                labels, distances = self._index.knn_query(query, k=k)
+            except RuntimeError as e:
+                logger.warning(f"ANN query failed, falling back to pgvector: {e}")
+                return None
+            finally:
+                if k > self.ef_search:
+                    self._index.set_ef(self.ef_search)
+
+        return [(int(label), float(dist)) for label, dist in zip(labels[0], distances[0])]
+
+
+def get_section_index():
+    """Return the process-wide index, or None when the ANN index is disabled."""
+    global _section_index
+
+    if not settings.RAG_ANN_INDEX:
+        return None
+
+    if _section_index is None:
+        with _section_index_lock:
+            if _section_index is None:
+                _section_index = SectionANNIndex()
+
+    return _section_index
+
+
+def build_section_index():
+    """Build the index at process startup (no-op when disabled)."""
+    index = get_section_index()
+    if index is None:
+        return
+
+    try:
+        index.build()
+    except Exception as e:
+        # Keep serving through pgvector if the DB is not reachable yet
+        logger.error(f"Could not build ANN index at startup: {e}")
@@ -0,0 +1,144 @@
+from collections import OrderedDict
+import itertools
+import threading
+import time
+import numpy as np
+
+
+class AnswerEntry:
+    def __init__(self, embedding, answer, sources, fingerprint, llm_seconds):
+        self.embedding = embedding
+        self.answer = answer
+        self.sources = sources
+        # {section_id: content hash} of the sections the answer was built from
+        self.fingerprint = fingerprint
+        self.llm_seconds = llm_seconds
+        self.stored_at = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """
+    Bounded, thread-safe cache of chat answers looked up by query
+    similarity rather than exact text, per movie scope (None = global chat).
+
+    A lookup returns the most similar stored answer at or above threshold
+    (cosine), provided `is_valid(entry)` confirms its sources are unchanged;
+    entries that fail it are dropped and counted as stale.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, threshold=0.92):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        # scope -> {entry_id: entry}, plus a stacked embedding matrix built lazily
+        self._scopes = {}
+        self._matrices = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.saved_llm_seconds = 0.0
+
+    @staticmethod
+    def _unit(embedding):
+        embedding = np.asarray(embedding, dtype='float32')
+        return embedding / max(np.linalg.norm(embedding), 1e-12)
+
+    def get(self, scope, embedding, is_valid=None):
+        embedding = self._unit(embedding)
+
+        with self._lock:
+            entry_id, similarity = self._nearest(scope, embedding)
+            entry = self._scopes[scope][entry_id] if entry_id is not None and similarity >= self.threshold else None
+
+            if entry is not None and self.ttl and time.monotonic() - entry.stored_at > self.ttl:
+                self._remove(entry_id)
+                entry = None
+
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Outside the lock: validation may query the database
+        if is_valid is not None and not is_valid(entry):
+            with self._lock:
+                # A concurrent lookup or an eviction may have removed it already
+                if entry_id in self._entries:
+                    self._remove(entry_id)
+                self.stale += 1
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if entry_id in self._entries:
+                self._entries.move_to_end(entry_id)
+            self.hits += 1
+            self.saved_llm_seconds += entry.llm_seconds
+        return entry
+
+    def set(self, scope, embedding, answer, sources, fingerprint, llm_seconds):
+        entry = AnswerEntry(self._unit(embedding), answer, sources, fingerprint, llm_seconds)
+
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (scope, entry)
+            self._scopes.setdefault(scope, {})[entry_id] = entry
+            self._matrices.pop(scope, None)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+        return entry
+
+    def _nearest(self, scope, embedding):
+        entries = self._scopes.get(scope)
+        if not entries:
+            return None, 0.0
+
+        cached = self._matrices.get(scope)
+        if cached is None:
+            ids = list(entries)
+            cached = self._matrices[scope] = (ids, np.stack([entries[i].embedding for i in ids]))
+
+        ids, matrix = cached
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        return ids[best], float(similarities[best])
+
+    def _remove(self, entry_id):
+        removed = self._entries.pop(entry_id, None)
+        if removed is None:
+            return
+        scope = removed[0]
+        entries = self._scopes.get(scope)
+        if entries is not None:
+            entries.pop(entry_id, None)
+            if not entries:
+                del self._scopes[scope]
+        self._matrices.pop(scope, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._matrices.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'saved_llm_seconds': round(self.saved_llm_seconds, 3),
+            }
@@ -1,47 +1,438 @@
-import openai
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from services.rag_service import RAGService
+from django.db import close_old_connections
+from services.answer_cache import SemanticAnswerCache
+from services import llm_clients
+from services.rag_service import get_rag_service
+import asyncio
+import functools
 import logging
 import re
+import threading
+import time
 logger = logging.getLogger(__name__)
 
+# Process-wide semantic cache of LLM answers (None when disabled)
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+# Threads async views run embedding, retrieval and ORM calls on (CHAT_POOL_THREADS)
+_chat_pool = None
+_chat_pool_lock = threading.Lock()
+
+
+def get_answer_cache():
+    global _answer_cache
+    
+    if not settings.RAG_ANSWER_CACHE_SIZE:
+        return None
+    
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticAnswerCache(
+                    max_size=settings.RAG_ANSWER_CACHE_SIZE,
+                    ttl=settings.RAG_ANSWER_CACHE_TTL,
+                    threshold=settings.RAG_ANSWER_CACHE_THRESHOLD
+                )
+    
+    return _answer_cache
+
+
+def get_chat_pool():
+    global _chat_pool
+    
+    if _chat_pool is None:
+        with _chat_pool_lock:
+            if _chat_pool is None:
+                _chat_pool = ThreadPoolExecutor(
+                    max_workers=settings.CHAT_POOL_THREADS,
+                    thread_name_prefix='chat-pool'
+                )
+    
+    return _chat_pool
+
+
+async def run_in_chat_pool(func, *args, **kwargs):
+    """
+    Run blocking func (embedding model, ORM) on the chat pool without
+    blocking the event loop. Database connections belong to the pool's
+    threads, so in-flight chats never hold more than CHAT_POOL_THREADS.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_chat_pool(), functools.partial(_run_with_connection, func, *args, **kwargs))
+
+
+def _run_with_connection(func, *args, **kwargs):
+    # Pool threads outlive requests: apply CONN_MAX_AGE the way request start/end would
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+# What a chat turn has before the LLM call; `cached` is set on an answer-cache
+# hit, and then results and messages are not computed
+ChatTurn = namedtuple('ChatTurn', ['answer_cache', 'query_embedding', 'cached', 'results', 'messages'])
+
+
+ERROR_MESSAGE = "Sorry, I encountered an error. Please try again."
+
+# Template tokens some models leak into their output
+SPECIAL_TOKEN_PATTERNS = [
+    re.compile(r'<[｜|][^>]*[｜|]>'),
+    re.compile(r'</?s>'),
+    re.compile(r'<</?SYS>>'),
+]
+SPECIAL_TOKEN_LITERALS = ('<s>', '</s>', '<<SYS>>', '<</SYS>>')
+
+# Answers are cut after this many sentences
+MAX_ANSWER_SENTENCES = 6
+
+
+def strip_special_tokens(text):
+    for pattern in SPECIAL_TOKEN_PATTERNS:
+        text = pattern.sub('', text)
+    return text
+
+
+def sentence_limit(text):
+    """Index of the period answers are cut after, or None if text is short enough"""
+    position = -2
+    for _ in range(MAX_ANSWER_SENTENCES):
+        position = text.find('. ', position + 2)
+        if position == -1:
+            return None
+    return position
+
+
+def clean_answer(answer):
+    answer = strip_special_tokens(answer.strip()).strip()
+    
+    end = sentence_limit(answer)
+    if end is not None:
+        answer = answer[:end + 1]
+    
+    return answer
+
+
+class StreamingAnswerCleaner:
+    """
+    clean_answer() applied to a completion as it streams in: feed() each
+    delta and show what it returns, then show what finish() returns. The
+    pieces add up to clean_answer() of the whole text; `done` turns true
+    once the sentence limit is reached and the rest can be dropped.
+    """
+    
+    # A '<' with no '>' this far on is text, not the start of a special token
+    MAX_TOKEN_LENGTH = 64
+    
+    def __init__(self):
+        self.pending = ''
+        self.cleaned = ''
+        self.emitted = 0
+        self.done = False
+    
+    @property
+    def answer(self):
+        return self.cleaned[:self.emitted]
+    
+    def feed(self, delta):
+        if self.done:
+            return ''
+        
+        self.pending += delta
+        # A special token may still be arriving: hold back from its '<'
+        cut = self._token_start(self.pending)
+        self._clean(self.pending[:cut])
+        self.pending = self.pending[cut:]
+        
+        return self._emit(final=False)
+    
+    def finish(self):
+        if not self.done:
+            self._clean(self.pending)
+            self.pending = ''
+        
+        return self._emit(final=True)
+    
+    def _token_start(self, text):
+        start = text.find('<', max(len(text) - self.MAX_TOKEN_LENGTH, 0))
+        while start != -1:
+            tail = text[start:]
+            if any(token.startswith(tail) for token in SPECIAL_TOKEN_LITERALS):
+                return start
+            if re.fullmatch(r'<[｜|][^>]*', tail):
+                return start
+            start = text.find('<', start + 1)
+        return len(text)
+    
+    def _clean(self, text):
+        text = strip_special_tokens(text)
+        self.cleaned += text if self.cleaned else text.lstrip()
+    
+    def _emit(self, final):
+        # Trailing whitespace is only shown once more text follows it
+        text = self.cleaned.rstrip()
+        
+        # Searched before the strip: a limit hit by trailing '. ' cuts at the same period
+        end = sentence_limit(self.cleaned)
+        if end is not None:
+            text = text[:end + 1]
+            self.done = True
+        
+        delta = text[self.emitted:]
+        self.emitted = len(text)
+        return delta
+
 
 class ChatService:
     def __init__(self):
-        self.client = openai.OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=settings.OPENROUTER_API_KEY
-        )
+        # Shared by every ChatService in the process, with its connection pool
+        self.client = llm_clients.get_client()
         # self.model = "deepseek/deepseek-chat-v3.1:free"
         self.model = "meta-llama/llama-3.3-8b-instruct:free"
 
-        self.rag = RAGService()
+        self.rag = get_rag_service()
     
     def chat(self, user_message, movie_id=None):
         """
         Enhanced chat with better context retrieval
         """
-        if movie_id:
-            results = self.rag.search_with_scores(user_message, k=3, movie_id=movie_id)
-        else:
-            results = self.rag.search_with_scores(user_message, k=5, movie_id=None)
+        turn = self._prepare(user_message, movie_id)
+        if turn.cached is not None:
+            return {
+                'message': turn.cached.answer,
+                'sources': list(turn.cached.sources)
+            }
         
-        sections = [r['section'] for r in results]
+        try:
+            started = time.perf_counter()
+            response = self._complete(turn.messages)
+            
+            llm_seconds = time.perf_counter() - started
+            answer = clean_answer(response.choices[0].message.content)
+            
+            self._store_answer(turn, movie_id, answer, llm_seconds)
+            
+            return {
+                'message': answer,
+                'sources': turn.results
+            }
+        
+        except Exception as e:
+            logger.error(f"Chat error: {e}")
+            return {
+                'message': ERROR_MESSAGE,
+                'sources': []
+            }
+    
+    async def achat(self, user_message, movie_id=None):
+        """
+        chat() for async views: the answer-cache lookup, embedding and
+        retrieval run on the chat pool and the completion on AsyncOpenAI,
+        so no thread waits on the LLM
+        """
+        turn = await run_in_chat_pool(self._prepare, user_message, movie_id)
+        if turn.cached is not None:
+            return {
+                'message': turn.cached.answer,
+                'sources': list(turn.cached.sources)
+            }
         
+        try:
+            started = time.perf_counter()
+            response = await self._acomplete(turn.messages)
+            
+            llm_seconds = time.perf_counter() - started
+            answer = clean_answer(response.choices[0].message.content)
+            
+            await run_in_chat_pool(self._store_answer, turn, movie_id, answer, llm_seconds)
+            
+            return {
+                'message': answer,
+                'sources': turn.results
+            }
+        
+        except Exception as e:
+            logger.error(f"Chat error: {e}")
+            return {
+                'message': ERROR_MESSAGE,
+                'sources': []
+            }
+    
+    def stream_chat(self, user_message, movie_id=None):
+        """
+        chat() as it happens, for the SSE endpoint. Yields (event, data):
+        ('sources', results) once retrieval is done, ('token', text) as the
+        completion streams in, cleaned incrementally, then ('done', {...})
+        with the whole answer, or ('error', message).
+        """
+        started = time.perf_counter()
+        
+        turn = self._prepare(user_message, movie_id)
+        if turn.cached is not None:
+            yield from self._cached_events(turn.cached, started)
+            return
+        
+        retrieval_seconds = time.perf_counter() - started
+        yield 'sources', turn.results
+        
+        cleaner = StreamingAnswerCleaner()
+        ttft = None
+        stream = None
+        try:
+            llm_started = time.perf_counter()
+            stream = self._complete(turn.messages, stream=True)
+            
+            for chunk in stream:
+                text = self._feed_chunk(cleaner, chunk)
+                if text:
+                    ttft = ttft or time.perf_counter() - started
+                    yield 'token', text
+                
+                if cleaner.done:
+                    # Past the sentence limit: stop paying for tokens nobody sees
+                    break
+            
+            text = cleaner.finish()
+            if text:
+                ttft = ttft or time.perf_counter() - started
+                yield 'token', text
+            
+            llm_seconds = time.perf_counter() - llm_started
+        
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield 'error', ERROR_MESSAGE
+            return
+        
+        finally:
+            if stream is not None:
+                stream.close()
+        
+        self._log_stream(movie_id, retrieval_seconds, ttft, llm_seconds)
+        self._store_answer(turn, movie_id, cleaner.answer, llm_seconds)
+        
+        yield 'done', {'message': cleaner.answer, 'sources': turn.results, 'ttft': ttft}
+    
+    async def astream_chat(self, user_message, movie_id=None):
+        """stream_chat() for async views, on the chat pool and AsyncOpenAI"""
+        started = time.perf_counter()
+        
+        turn = await run_in_chat_pool(self._prepare, user_message, movie_id)
+        if turn.cached is not None:
+            for event in self._cached_events(turn.cached, started):
+                yield event
+            return
+        
+        retrieval_seconds = time.perf_counter() - started
+        yield 'sources', turn.results
+        
+        cleaner = StreamingAnswerCleaner()
+        ttft = None
+        stream = None
+        try:
+            llm_started = time.perf_counter()
+            stream = await self._acomplete(turn.messages, stream=True)
+            
+            async for chunk in stream:
+                text = self._feed_chunk(cleaner, chunk)
+                if text:
+                    ttft = ttft or time.perf_counter() - started
+                    yield 'token', text
+                
+                if cleaner.done:
+                    break
+            
+            text = cleaner.finish()
+            if text:
+                ttft = ttft or time.perf_counter() - started
+                yield 'token', text
+            
+            llm_seconds = time.perf_counter() - llm_started
+        
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield 'error', ERROR_MESSAGE
+            return
+        
+        finally:
+            if stream is not None:
+                await stream.close()
+        
+        self._log_stream(movie_id, retrieval_seconds, ttft, llm_seconds)
+        await run_in_chat_pool(self._store_answer, turn, movie_id, cleaner.answer, llm_seconds)
+        
+        yield 'done', {'message': cleaner.answer, 'sources': turn.results, 'ttft': ttft}
+    
+    def _prepare(self, user_message, movie_id):
+        """Answer-cache lookup, then retrieval and prompt on a miss: everything before the LLM call"""
+        answer_cache = get_answer_cache()
+        query_embedding = None
+        if answer_cache is not None:
+            query_embedding = self.rag.embed_query(user_message)
+            cached = answer_cache.get(movie_id, query_embedding, is_valid=self._sources_unchanged)
+            if cached is not None:
+                logger.info(f"Answer cache hit (movie {movie_id}), skipped {cached.llm_seconds:.2f}s LLM call")
+                return ChatTurn(answer_cache, query_embedding, cached, None, None)
+        
+        results = self._retrieve(user_message, movie_id)
+        messages = self._build_messages(user_message, movie_id, results)
+        return ChatTurn(answer_cache, query_embedding, None, results, messages)
+    
+    def _store_answer(self, turn, movie_id, answer, llm_seconds):
+        if turn.answer_cache is not None and turn.results:
+            turn.answer_cache.set(
+                movie_id, turn.query_embedding, answer, turn.results,
+                self._source_fingerprint(r['section_id'] for r in turn.results), llm_seconds
+            )
+    
+    def _cached_events(self, cached, started):
+        sources = list(cached.sources)
+        yield 'sources', sources
+        yield 'token', cached.answer
+        yield 'done', {'message': cached.answer, 'sources': sources, 'ttft': time.perf_counter() - started}
+    
+    def _feed_chunk(self, cleaner, chunk):
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        return cleaner.feed(delta) if delta else ''
+    
+    def _log_stream(self, movie_id, retrieval_seconds, ttft, llm_seconds):
+        logger.info(
+            f"Chat stream (movie {movie_id}): retrieval {retrieval_seconds:.2f}s, "
+            f"first token {f'{ttft:.2f}s' if ttft is not None else 'never'}, LLM {llm_seconds:.2f}s"
+        )
+    
+    def _retrieve(self, user_message, movie_id):
+        k = 3 if movie_id else 5
+        
+        if settings.RAG_CHUNKS_ENABLED:
+            # Only the matching passages go into the prompt
+            return self.rag.search_chunks_with_scores(user_message, k=k, movie_id=movie_id)
+        
+        # Only the prefix of each section that goes into the prompt is fetched
+        content_chars = self._get_context_lengths(movie_id)
+        return self.rag.search_with_scores(user_message, k=k, movie_id=movie_id, content_chars=content_chars)
+    
+    def _build_messages(self, user_message, movie_id, results):
         context_parts = []
-        for s in sections:
-            content_length = self._get_context_length(s.section_type, movie_id)
+        for r in results:
+            s = r['section']
             
             context_parts.append(
                 f"[{s.movie.title} - {s.get_section_type_display()}]\n"
-                f"{s.content[:content_length]}"
+                f"{r['content']}"
             )
         
         context = "\n\n---\n\n".join(context_parts)
         
         if movie_id:
             from movies.models import Movie
-            movie = Movie.objects.get(id=movie_id)
+            # Sections come with their movie already joined in
+            movie = results[0]['section'].movie if results else Movie.objects.get(id=movie_id)
             system_prompt = f"""You are a knowledgeable movie assistant discussing "{movie.title}" ({movie.year}).
 
 Context from the movie analysis:
@@ -71,40 +462,26 @@ CRITICAL RULES:
 
 Answer based STRICTLY on this context."""
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=250,
-                temperature=0.7,
-                top_p=0.9
-            )
-            
-            answer = response.choices[0].message.content.strip()
-            
-            answer = re.sub(r'<[｜|][^>]*[｜|]>', '', answer)
-            answer = re.sub(r'</?s>', '', answer)
-            answer = re.sub(r'<</?SYS>>', '', answer)
-            answer = answer.strip()
-            
-            sentences = answer.split('. ')
-            if len(sentences) > 6:
-                answer = '. '.join(sentences[:6]) + '.'
-            
-            return {
-                'message': answer,
-                'sources': results
-            }
-            
-        except Exception as e:
-            logger.error(f"Chat error: {e}")
-            return {
-                'message': "Sorry, I encountered an error. Please try again.",
-                'sources': []
-            }
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+    
+    def _complete(self, messages, **kwargs):
+        return self.client.chat.completions.create(**self._completion_args(messages, **kwargs))
+    
+    async def _acomplete(self, messages, **kwargs):
+        return await llm_clients.get_async_client().chat.completions.create(**self._completion_args(messages, **kwargs))
+    
+    def _completion_args(self, messages, **kwargs):
+        return {
+            'model': self.model,
+            'messages': messages,
+            'max_tokens': 250,
+            'temperature': 0.7,
+            'top_p': 0.9,
+            **kwargs
+        }
     
     def _get_context_length(self, section_type, movie_id):
         """
@@ -129,6 +506,28 @@ Answer based STRICTLY on this context."""
             else:
                 return 400
     
+    def _source_fingerprint(self, section_ids):
+        """Content hash per section, computed in the database so content is not fetched"""
+        from django.db.models.functions import MD5
+        from reports.models import MovieSection
+        
+        return dict(
+            MovieSection.objects.filter(id__in=set(section_ids)).annotate(
+                current_hash=MD5('content')
+            ).values_list('id', 'current_hash')
+        )
+    
+    def _sources_unchanged(self, entry):
+        return self._source_fingerprint(entry.fingerprint) == entry.fingerprint
+    
+    def _get_context_lengths(self, movie_id):
+        from reports.models import MovieSection
+        
+        return {
+            section_type: self._get_context_length(section_type, movie_id)
+            for section_type, _ in MovieSection.SECTION_TYPES
+        }
+    
     def process_message(self, message, movie_id=None, conversation_id=None):
         """
         Process message and return result (for API compatibility)
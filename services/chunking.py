@@ -0,0 +1,27 @@
+import re
+
+_WORD = re.compile(r'\S+')
+
+
+def chunk_text(text, max_words=120, overlap_words=30):
+    """
+    Split text into overlapping windows of at most max_words words.
+
+    all-MiniLM-L6-v2 truncates at 256 word pieces, so windows are kept well
+    under that. Returns a list of (start_char, passage) tuples; passages are
+    sliced from the original text, so whitespace and punctuation survive.
+    """
+    words = list(_WORD.finditer(text or ''))
+    if not words:
+        return []
+    
+    step = max(1, max_words - overlap_words)
+    chunks = []
+    
+    for start in range(0, len(words), step):
+        window = words[start:start + max_words]
+        chunks.append((window[0].start(), text[window[0].start():window[-1].end()]))
+        if start + max_words >= len(words):
+            break
+    
+    return chunks
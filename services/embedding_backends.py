@@ -0,0 +1,231 @@
+"""
+Embedding backends behind RAGService.load_model().
+
+Every backend exposes the subset of SentenceTransformer.encode() that
+RAGService uses, so callers do not care which one is loaded:
+
+    encode(sentences, batch_size=32, convert_to_numpy=True,
+           show_progress_bar=False, normalize_embeddings=False)
+
+torch  - the sentence-transformers model (default)
+onnx   - ONNX Runtime session over a model exported with
+         `manage.py export_onnx_model`; no torch import at all
+remote - client of `manage.py embedding_server` (RAG_EMBEDDING_SERVER),
+         falling back to an in-process model when the server is down
+
+Backends with fork_safe = False hold thread pools or sockets that must be
+rebuilt in each forked worker (see rag_service.reset_model_after_fork).
+"""
+from urllib.parse import urlparse
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_CONFIG_FILE = 'embedding_config.json'
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_QUANTIZED_MODEL_FILE = 'model.int8.onnx'
+
+
+def load_torch_backend(model_name, threads=None):
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    model = SentenceTransformer(model_name)
+    model.eval()
+    return model
+
+
+class OnnxBackend:
+    """
+    Transformer forward pass in ONNX Runtime; tokenization, pooling and
+    normalization reproduce the sentence-transformers pipeline in NumPy
+    """
+
+    fork_safe = False
+
+    def __init__(self, model_dir, quantized=False, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE)) as f:
+            self.config = json.load(f)
+
+        self.max_seq_length = self.config['max_seq_length']
+        self.pooling = self.config['pooling']
+        self.normalize = self.config['normalize']
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.config['pad_token_id'], pad_token=self.config['pad_token'])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def eval(self):
+        return self
+
+    def get_max_seq_length(self):
+        return self.max_seq_length
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=False):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(texts), self.config['dimension']), dtype='float32')
+
+        for start in range(0, len(texts), batch_size):
+            embeddings[start:start + batch_size] = self._encode_batch(texts[start:start + batch_size])
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+
+        inputs = {
+            'input_ids': np.array([e.ids for e in encodings], dtype='int64'),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype='int64'),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype='int64'),
+        }
+        inputs = {name: value for name, value in inputs.items() if name in self.input_names}
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = inputs['attention_mask'][..., None].astype('float32')
+
+        if self.pooling == 'cls':
+            pooled = token_embeddings[:, 0]
+        else:
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if self.normalize:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+        return pooled.astype('float32')
+
+
+class RemoteBackend:
+    """
+    HTTP client of the embedding server over a unix socket or localhost,
+    with one keep-alive connection pool per process. When the server cannot
+    be reached it encodes in-process with the `fallback` loader, and only
+    retries the server after retry_after seconds.
+    """
+
+    fork_safe = False
+
+    def __init__(self, url, fallback, timeout=5.0, retry_after=30.0):
+        import httpx
+
+        self.url = url
+        self.retry_after = retry_after
+        self._fallback_loader = fallback
+        self._fallback = None
+        self._fallback_lock = threading.Lock()
+        self._down_until = 0.0
+
+        parsed = urlparse(url)
+        if parsed.scheme == 'unix':
+            transport = httpx.HTTPTransport(uds=parsed.path)
+            base_url = 'http://embedding-server'
+        else:
+            transport = httpx.HTTPTransport()
+            base_url = url
+
+        self.client = httpx.Client(
+            base_url=base_url,
+            transport=transport,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 1.0))
+        )
+
+    def eval(self):
+        return self
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=False):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        embeddings = None
+        if time.monotonic() >= self._down_until:
+            try:
+                embeddings = self._encode_remote(texts)
+            except Exception as e:
+                self._down_until = time.monotonic() + self.retry_after
+                logger.warning(
+                    f"Embedding server {self.url} unavailable ({e}); "
+                    f"encoding in-process for the next {self.retry_after:.0f}s"
+                )
+
+        if embeddings is None:
+            embeddings = np.asarray(
+                self._local().encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False),
+                dtype='float32'
+            )
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+    def _encode_remote(self, texts):
+        response = self.client.post('/encode', json={'texts': texts})
+        response.raise_for_status()
+
+        rows, dimension = (int(n) for n in response.headers['X-Embedding-Shape'].split(','))
+        return np.frombuffer(response.content, dtype='<f4').reshape(rows, dimension).astype('float32')
+
+    def _local(self):
+        if self._fallback is None:
+            with self._fallback_lock:
+                if self._fallback is None:
+                    self._fallback = self._fallback_loader()
+        return self._fallback
+
+
+def load_backend(name, model_name, onnx_model_dir=None, onnx_quantized=False, threads=None,
+                 server_url=None, server_timeout=5.0):
+    """
+    Build the named backend; an ONNX backend that cannot load (missing
+    export, onnxruntime not installed) falls back to torch. With
+    server_url, returns a RemoteBackend whose in-process fallback is the
+    named backend, loaded only if the server is ever unreachable.
+    """
+    if server_url:
+        return RemoteBackend(
+            server_url,
+            fallback=lambda: load_backend(name, model_name, onnx_model_dir, onnx_quantized, threads),
+            timeout=server_timeout
+        )
+
+    if name == 'onnx':
+        try:
+            backend = OnnxBackend(onnx_model_dir, quantized=onnx_quantized, threads=threads)
+            logger.info(f"Loaded ONNX embedding backend from {onnx_model_dir} (quantized={onnx_quantized})")
+            return backend
+        except Exception as e:
+            logger.error(f"ONNX backend unavailable, falling back to torch: {e}")
+    elif name != 'torch':
+        raise ValueError(f"Unknown embedding backend: {name}")
+
+    return load_torch_backend(model_name, threads=threads)
@@ -0,0 +1,116 @@
+from concurrent.futures import Future
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Collects concurrent single-text encode requests into one batched forward pass.
+
+    A background thread takes the first queued text, then keeps collecting
+    for up to max_wait_ms or until max_batch_size texts are queued, encodes
+    them together and resolves each caller's future with its own row.
+    While traffic is light (the last batch held a single text) it does not
+    wait at all, so an idle server answers with no added latency.
+    """
+
+    def __init__(self, encode_batch, max_batch_size=16, max_wait_ms=5):
+        self._encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_batch_size = 0
+
+        self.batches = 0
+        self.items = 0
+        self.full_batches = 0
+        self.max_queue_wait = 0.0
+
+    def encode(self, text, timeout=None):
+        return self.submit(text).result(timeout=timeout)
+
+    def submit(self, text):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.monotonic()))
+        return future
+
+    def _ensure_worker(self):
+        # Threads do not survive fork: start one per process on first use
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name='embedding-batcher', daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+
+        wait = self.max_wait if self._last_batch_size > 1 else 0
+        deadline = time.monotonic() + wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+
+            try:
+                embeddings = self._encode_batch([text for text, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Batched query embedding failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                embeddings = None
+
+            if embeddings is not None:
+                for (_, future, _), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+
+            self._last_batch_size = len(batch)
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                if len(batch) >= self.max_batch_size:
+                    self.full_batches += 1
+                oldest = max(started - queued_at for _, _, queued_at in batch)
+                self.max_queue_wait = max(self.max_queue_wait, oldest)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+                'fill_rate': self.items / (self.batches * self.max_batch_size) if self.batches else 0.0,
+                'full_batches': self.full_batches,
+                'max_queue_wait_ms': self.max_queue_wait * 1000,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+            }
@@ -0,0 +1,127 @@
+"""
+Standalone embedding server (`manage.py embedding_server`).
+
+One process owns the model; web workers, admin actions and commands send
+texts to it (RAG_EMBEDDING_SERVER) instead of each loading their own copy.
+Small requests from all clients go through one EmbeddingBatcher, so
+concurrent chat queries from different workers share a forward pass.
+
+    POST /encode   {"texts": [...]} -> float32 little-endian rows,
+                   shape in the X-Embedding-Shape header ("n,dim")
+    GET  /health   model and batching stats as JSON
+
+Embeddings are returned unnormalized; clients normalize if they need to.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from services.embedding_batcher import EmbeddingBatcher
+import json
+import logging
+import os
+import socketserver
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingApp:
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5, timeout=30):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.requests = 0
+        self.texts = 0
+        self.batcher = EmbeddingBatcher(self._encode, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def _encode(self, texts):
+        return np.asarray(
+            self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False),
+            dtype='float32'
+        )
+
+    def encode(self, texts):
+        self.requests += 1
+        self.texts += len(texts)
+
+        # Bulk requests (commands, admin) are already batches of their own
+        if len(texts) >= self.max_batch_size:
+            return self._encode(texts)
+
+        futures = [self.batcher.submit(text) for text in texts]
+        return np.stack([future.result(timeout=self.timeout) for future in futures])
+
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'requests': self.requests,
+            'texts': self.texts,
+            'batcher': self.batcher.stats(),
+        }
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients reuse one connection per worker
+    protocol_version = 'HTTP/1.1'
+    server_version = 'flickora-embeddings'
+
+    def do_POST(self):
+        if self.path != '/encode':
+            return self._send_json(404, {'error': 'not found'})
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            texts = json.loads(self.rfile.read(length))['texts']
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError('texts must be a list of strings')
+        except (ValueError, KeyError) as e:
+            return self._send_json(400, {'error': str(e)})
+
+        try:
+            embeddings = self.server.app.encode(texts) if texts else np.zeros((0, 0), dtype='float32')
+        except Exception as e:
+            logger.error(f"Encode failed: {e}")
+            return self._send_json(500, {'error': str(e)})
+
+        body = embeddings.astype('<f4').tobytes()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Embedding-Shape', f"{embeddings.shape[0]},{embeddings.shape[1]}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send_json(404, {'error': 'not found'})
+        self._send_json(200, self.server.app.stats())
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(app, socket_path=None, host='127.0.0.1', port=8601):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, EmbeddingRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), EmbeddingRequestHandler)
+        server.daemon_threads = True
+
+    server.app = app
+    return server
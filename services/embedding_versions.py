@@ -0,0 +1,120 @@
+from collections import namedtuple
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import MD5
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Size of MovieSection.embedding, which holds the current version
+PRIMARY_DIM = 384
+
+# Version retrieval serves in this process, decided on first use
+_serving_version = None
+_serving_version_lock = threading.Lock()
+
+
+class EmbeddingVersion(namedtuple('EmbeddingVersion', ['model_name', 'dim', 'normalize', 'shadow'])):
+    """
+    A vector space sections and queries are embedded in. The current
+    version lives in MovieSection.embedding; shadow versions in
+    SectionEmbedding rows keyed on `id`.
+    """
+    __slots__ = ()
+
+    @property
+    def id(self):
+        # Same value as RAGService.embedding_model_id
+        return f"{self.model_name}+normalized" if self.normalize else self.model_name
+
+
+def current_version():
+    return EmbeddingVersion(settings.RAG_EMBEDDING_MODEL, PRIMARY_DIM, settings.RAG_NORMALIZE_EMBEDDINGS, False)
+
+
+def next_version(model_name=None, dim=None):
+    """The version being built in the shadow table, or None if none is configured"""
+    model_name = model_name or settings.RAG_NEXT_EMBEDDING_MODEL
+    if not model_name:
+        return None
+
+    return EmbeddingVersion(
+        model_name,
+        dim or settings.RAG_NEXT_EMBEDDING_DIM,
+        settings.RAG_NORMALIZE_EMBEDDINGS,
+        True
+    )
+
+
+def stale_sections(version, queryset=None):
+    """
+    Sections of queryset with no SectionEmbedding row for version, or one
+    computed from different content; compared in the database
+    """
+    from reports.models import MovieSection, SectionEmbedding
+
+    if queryset is None:
+        queryset = MovieSection.objects.all()
+
+    fresh = SectionEmbedding.objects.filter(
+        section=OuterRef('pk'),
+        model_version=version.id,
+        content_hash=OuterRef('current_hash')
+    )
+    return queryset.annotate(current_hash=MD5('content')).exclude(Exists(fresh))
+
+
+def version_coverage(version):
+    """(up-to-date sections, all sections) for a shadow version"""
+    from reports.models import MovieSection
+
+    total = MovieSection.objects.count()
+    return total - stale_sections(version).count(), total
+
+
+def serving_version():
+    """
+    Version this process embeds queries with and searches: the next one
+    when RAG_SERVE_NEXT_EMBEDDINGS is on and it covers every section,
+    otherwise the current one. Decided once per process, so a worker
+    switches all its searches at once and never mixes the two spaces;
+    workers started before coverage reached 100% switch on restart.
+    """
+    global _serving_version
+
+    if _serving_version is None:
+        with _serving_version_lock:
+            if _serving_version is None:
+                _serving_version = _choose_serving_version()
+
+    return _serving_version
+
+
+def reset_serving_version():
+    global _serving_version
+
+    with _serving_version_lock:
+        _serving_version = None
+
+
+def _choose_serving_version():
+    current, upcoming = current_version(), next_version()
+
+    if not settings.RAG_SERVE_NEXT_EMBEDDINGS or upcoming is None:
+        return current
+
+    if settings.RAG_CHUNKS_ENABLED:
+        logger.error(f"Not serving {upcoming.id}: passage chunks are only embedded with {current.id}")
+        return current
+
+    embedded, total = version_coverage(upcoming)
+    if embedded < total:
+        logger.warning(
+            f"Not serving {upcoming.id} yet: {embedded}/{total} sections embedded, "
+            f"run `manage.py reembed_sections`; serving {current.id}"
+        )
+        return current
+
+    logger.info(f"Serving embedding version {upcoming.id} ({total} sections)")
+    return upcoming
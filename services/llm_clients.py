@@ -0,0 +1,105 @@
+"""
+Process-wide OpenAI clients for the LLM API (OpenRouter), shared by every
+service so TCP/TLS connections stay open across requests and commands.
+The async client is kept per event loop; set_transport() swaps the HTTP
+transport underneath both, for tests and benchmarks.
+"""
+from django.conf import settings
+import asyncio
+import httpx
+import importlib.util
+import logging
+import openai
+import os
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Sync client and the process it was built in: connections must not cross a fork
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+# AsyncOpenAI client per event loop: its connections cannot be used from another loop
+_async_clients = weakref.WeakKeyDictionary()
+
+# Transports injected by set_transport() (None = real network)
+_transport = None
+_async_transport = None
+
+
+def http2_available():
+    """HTTP/2 needs the optional h2 package"""
+    return importlib.util.find_spec('h2') is not None
+
+
+def _http_options():
+    return {
+        'limits': httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY
+        ),
+        'timeout': httpx.Timeout(settings.LLM_READ_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+        'http2': settings.LLM_HTTP2 and http2_available(),
+    }
+
+
+def get_client():
+    global _client, _client_pid
+    
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                options = _http_options()
+                _client = openai.OpenAI(
+                    base_url=settings.OPENROUTER_BASE_URL,
+                    api_key=settings.OPENROUTER_API_KEY,
+                    http_client=openai.DefaultHttpxClient(transport=_transport, **options)
+                )
+                _client_pid = pid
+                logger.info(
+                    f"LLM client for {settings.OPENROUTER_BASE_URL}: "
+                    f"{settings.LLM_MAX_CONNECTIONS} connections, http2={options['http2']}"
+                )
+    
+    return _client
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = openai.AsyncOpenAI(
+            base_url=settings.OPENROUTER_BASE_URL,
+            api_key=settings.OPENROUTER_API_KEY,
+            http_client=openai.DefaultAsyncHttpxClient(transport=_async_transport, **_http_options())
+        )
+    
+    return client
+
+
+def set_transport(transport=None, async_transport=None):
+    """
+    Send LLM requests through these httpx transports (e.g. httpx.MockTransport,
+    which serves both) instead of the network; async_transport defaults to
+    transport. Call with no arguments to go back to the network.
+    """
+    global _transport, _async_transport
+    
+    _transport = transport
+    _async_transport = async_transport or transport
+    reset_clients()
+
+
+def reset_clients():
+    """Drop the clients so the next call builds them from current settings"""
+    global _client, _client_pid
+    
+    with _client_lock:
+        _client = None
+        _client_pid = None
+    _async_clients.clear()
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+import threading
+import time
+import numpy as np
+
+
+class MovieMatrix:
+    """
+    One movie's embedded sections: ids, types and a (n_sections, dim)
+    float32 matrix, plus the section rows themselves (movie joined in, no
+    embedding) so a search can answer without the database
+    """
+
+    def __init__(self, sections, embeddings, version=None):
+        self.sections = sections
+        self.ids = np.array([section.id for section in sections], dtype='int64')
+        self.section_types = [section.section_type for section in sections]
+        matrix = np.asarray(embeddings, dtype='float32')
+        # Keep the width when there are no rows: reshape(0, -1) is ambiguous
+        self.matrix = matrix.reshape(len(sections), matrix.shape[-1])
+        self.matrix.flags.writeable = False
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + sum(len(section.content) for section in self.sections)
+
+
+class MovieMatrixCache:
+    """
+    Bounded, thread-safe LRU of MovieMatrix entries keyed on movie id, with
+    optional TTL. An entry whose version differs from the caller's (see
+    RetrievalCache.versions) is treated as a miss. Ids are keyed as ints:
+    requests send them as strings, signals as ints.
+    """
+
+    def __init__(self, max_movies=256, ttl=None):
+        self.max_movies = max_movies
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, movie_id, version=None):
+        movie_id = int(movie_id)
+        with self._lock:
+            entry = self._entries.get(movie_id)
+            if entry is not None and (
+                entry.version != version
+                or (self.ttl and time.monotonic() - entry.loaded_at > self.ttl)
+            ):
+                del self._entries[movie_id]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(movie_id)
+            self.hits += 1
+            return entry
+
+    def set(self, movie_id, entry):
+        movie_id = int(movie_id)
+        with self._lock:
+            self._entries[movie_id] = entry
+            self._entries.move_to_end(movie_id)
+
+            while len(self._entries) > self.max_movies:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return entry
+
+    def invalidate(self, movie_ids=None):
+        with self._lock:
+            if movie_ids is None:
+                self._entries.clear()
+            else:
+                for movie_id in movie_ids:
+                    self._entries.pop(int(movie_id), None)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'movies': len(self._entries),
+                'max_movies': self.max_movies,
+                'bytes': sum(entry.nbytes for entry in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
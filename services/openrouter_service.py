@@ -1,15 +1,11 @@
-import openai
-from django.conf import settings
+from services import llm_clients
 import logging
 
 logger = logging.getLogger(__name__)
 
 class OpenRouterService:
     def __init__(self):
-        self.client = openai.OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=settings.OPENROUTER_API_KEY
-        )
+        self.client = llm_clients.get_client()
         self.model = "google/gemma-3-4b-it:free"
     
     def generate_movie_section(self, movie_data, section_type):
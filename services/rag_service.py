@@ -1,41 +1,423 @@
-from sentence_transformers import SentenceTransformer
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Func, Value, When
+from django.db.models.functions import MD5, Cast, Left, Length
 import logging
-from pgvector.django import CosineDistance
+from pgvector.django import BitField, CosineDistance, HalfVectorField, HammingDistance, MaxInnerProduct, VectorField
+from pgvector.utils import HalfVector
+from services.embedding_backends import load_backend
+from services.embedding_cache import EmbeddingCache
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_versions import current_version, serving_version, stale_sections
+from services.movie_matrix_cache import MovieMatrix, MovieMatrixCache
+from services.retrieval_cache import RetrievalCache
+import copy
+import hashlib
 import threading
+import time
+import numpy as np
+import re
 
 logger = logging.getLogger(__name__)
 
 # Global model instance and lock for thread safety
 _model = None
 _model_lock = threading.Lock()
+_model_load_seconds = None
+
+# Process-wide LRU of query embeddings (None when disabled)
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+# Process-wide micro-batchers for concurrent query embeddings, one per embedding version
+_query_batchers = {}
+_query_batcher_lock = threading.Lock()
+
+# Cache of ranked section ids per query and movie (None when disabled)
+_retrieval_cache = None
+_retrieval_cache_lock = threading.Lock()
+
+# Per-movie section embedding matrices for movie-scoped search (None when disabled)
+_movie_matrix_cache = None
+_movie_matrix_cache_lock = threading.Lock()
+
+# Shared RAGService per embedding version (chat requests use the serving one)
+_rag_services = {}
+_rag_services_lock = threading.Lock()
+
+# Per query type multipliers applied to similarity when reranking sections
+SECTION_WEIGHTS = {
+    'plot': {
+        'plot_structure': 3.5,
+        'characters': 2.0,
+        'themes': 1.5,
+        'production': 1.0,
+        'cast_crew': 0.8,
+        'visual_technical': 0.5,
+        'reception': 0.5,
+        'legacy': 0.5,
+    },
+    'technical': {
+        'visual_technical': 3.5,
+        'production': 2.0,
+        'cast_crew': 1.5,
+        'themes': 1.0,
+        'plot_structure': 0.8,
+        'characters': 0.5,
+        'reception': 0.5,
+        'legacy': 0.5,
+    },
+    'analysis': {
+        'themes': 3.5,
+        'characters': 2.5,
+        'visual_technical': 2.0,
+        'plot_structure': 1.5,
+        'cast_crew': 1.0,
+        'production': 0.8,
+        'reception': 0.8,
+        'legacy': 1.0,
+    },
+    'facts': {
+        'production': 3.5,
+        'cast_crew': 2.5,
+        'reception': 2.0,
+        'legacy': 1.5,
+        'plot_structure': 1.0,
+        'characters': 0.8,
+        'visual_technical': 0.8,
+        'themes': 0.5,
+    },
+    'general': {
+        'plot_structure': 2.2,
+        'themes': 1.8,
+        'characters': 1.6,
+        'visual_technical': 1.4,
+        'production': 1.2,
+        'cast_crew': 1.2,
+        'reception': 1.0,
+        'legacy': 1.0,
+    }
+}
+
+# Reciprocal rank fusion constant: score = sum of 1 / (RRF_K + rank) over lists
+RRF_K = 60
+
+_LEXEME = re.compile(r'[a-z0-9]+')
+
+# pgvector's hnsw.ef_search default; an HNSW scan returns at most this many rows
+HNSW_DEFAULT_EF_SEARCH = 40
+
+
+def model_status():
+    return {
+        'loaded': _model is not None,
+        'backend': settings.RAG_EMBEDDING_BACKEND,
+        'load_seconds': _model_load_seconds,
+    }
+
+
+def preload_model():
+    """
+    Load and warm up the embedding model at startup (RAG_PRELOAD_MODEL)
+    so no chat request pays for it
+    """
+    rag = RAGService()
+    rag.load_model()
+    warm_up = rag.warm_up()
+    logger.info(f"Embedding model preloaded: load {_model_load_seconds:.2f}s, warm-up {warm_up * 1000:.0f}ms")
+
+
+def reset_model_after_fork():
+    """
+    Run in each worker forked from a preloading master. Torch weights stay
+    shared copy-on-write; ONNX Runtime thread pools and embedding-server
+    connections do not survive fork, so those backends are rebuilt in the
+    child (cheap for both). Returns the warm-up time in seconds, or None if
+    nothing was preloaded.
+    """
+    global _model
+    
+    if _model is None:
+        return None
+    
+    if not getattr(_model, 'fork_safe', True):
+        with _model_lock:
+            _model = None
+    
+    rag = RAGService()
+    rag.load_model()
+    return rag.warm_up()
+
+
+def get_query_cache():
+    global _query_cache
+    
+    if not settings.RAG_QUERY_CACHE_SIZE:
+        return None
+    
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = EmbeddingCache(
+                    max_size=settings.RAG_QUERY_CACHE_SIZE,
+                    ttl=settings.RAG_QUERY_CACHE_TTL
+                )
+    
+    return _query_cache
+
+
+def get_query_batcher(version=None):
+    """
+    Micro-batcher encoding queries with version's model (default: the
+    serving version); None when disabled
+    """
+    if not settings.RAG_BATCHER_ENABLED:
+        return None
+    
+    version = version or serving_version()
+    
+    batcher = _query_batchers.get(version)
+    if batcher is None:
+        with _query_batcher_lock:
+            batcher = _query_batchers.get(version)
+            if batcher is None:
+                batcher = _query_batchers[version] = EmbeddingBatcher(
+                    lambda texts: get_rag_service(version).generate_embeddings(texts, batch_size=len(texts)),
+                    max_batch_size=settings.RAG_BATCHER_MAX_BATCH,
+                    max_wait_ms=settings.RAG_BATCHER_MAX_WAIT_MS
+                )
+    
+    return batcher
+
+
+def get_retrieval_cache():
+    global _retrieval_cache
+    
+    if not settings.RAG_RETRIEVAL_CACHE:
+        return None
+    
+    if _retrieval_cache is None:
+        with _retrieval_cache_lock:
+            if _retrieval_cache is None:
+                _retrieval_cache = RetrievalCache(
+                    alias=settings.RAG_RETRIEVAL_CACHE_ALIAS,
+                    ttl=settings.RAG_RETRIEVAL_CACHE_TTL
+                )
+    
+    return _retrieval_cache
+
+
+def get_movie_matrix_cache():
+    global _movie_matrix_cache
+    
+    if not settings.RAG_MOVIE_MATRIX_CACHE_SIZE:
+        return None
+    
+    if _movie_matrix_cache is None:
+        with _movie_matrix_cache_lock:
+            if _movie_matrix_cache is None:
+                _movie_matrix_cache = MovieMatrixCache(
+                    max_movies=settings.RAG_MOVIE_MATRIX_CACHE_SIZE,
+                    ttl=settings.RAG_MOVIE_MATRIX_CACHE_TTL
+                )
+    
+    return _movie_matrix_cache
+
+
+def get_rag_service(version=None):
+    """
+    Process-wide RAGService for version (default: the serving one, so a
+    reset of the serving version switches it too)
+    """
+    version = version or serving_version()
+    
+    service = _rag_services.get(version)
+    if service is None:
+        with _rag_services_lock:
+            service = _rag_services.get(version)
+            if service is None:
+                service = _rag_services[version] = RAGService(version=version)
+    
+    return service
+
+
+
+def sync_metric_indexes():
+    """
+    Build the HNSW index for the metric retrieval ranks with (inner product
+    under RAG_NORMALIZE_EMBEDDINGS, cosine otherwise) on sections and chunks,
+    then drop the other metric's: keeping both doubles index memory and
+    write cost. Returns (created, dropped) index names.
+    """
+    from reports.models import MovieSection, SectionChunk
+    
+    if connection.vendor != 'postgresql':
+        return [], []
+    
+    keep = 'vector_ip_ops' if settings.RAG_NORMALIZE_EMBEDDINGS else 'vector_cosine_ops'
+    tables = {
+        MovieSection._meta.db_table: 'moviesection_embedding_hnsw',
+        SectionChunk._meta.db_table: 'sectionchunk_embedding_hnsw',
+    }
+    
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT indexname FROM pg_indexes WHERE tablename = ANY(%s)', [list(tables)])
+        existing = {row[0] for row in cursor.fetchall()}
+        
+        created, dropped = [], []
+        # Built before the other is dropped, so searches never lose their index
+        for table, prefix in tables.items():
+            name = f"{prefix}_ip" if keep == 'vector_ip_ops' else prefix
+            if name not in existing:
+                cursor.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" '
+                    f'USING hnsw (embedding {keep}) WITH (m = 16, ef_construction = 64)'
+                )
+                created.append(name)
+        
+        for table, prefix in tables.items():
+            name = prefix if keep == 'vector_ip_ops' else f"{prefix}_ip"
+            if name in existing:
+                cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+                dropped.append(name)
+    
+    return created, dropped
+
+def content_hash(content):
+    """MD5 hex digest of section content; matches Postgres md5(content)"""
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def invalidate_retrieval_caches(movie_ids=None):
+    """
+    Drop cached search state for these movies, or for all movies when
+    movie_ids is None; call after section writes that bypass signals
+    """
+    for cache in [get_retrieval_cache(), get_movie_matrix_cache()]:
+        if cache is not None:
+            cache.invalidate(movie_ids)
+
+
+def refresh_movie_embeddings(movie_ids=None):
+    """
+    Recompute the centroid (mean section embedding) of these movies, or of
+    every movie when movie_ids is None, in the database; movies left with
+    no embedded sections lose theirs. Returns the number of centroids written.
+    """
+    from reports.models import MovieEmbedding, MovieSection
+    
+    if connection.vendor != 'postgresql':
+        return 0
+    
+    centroid_table = MovieEmbedding._meta.db_table
+    section_table = MovieSection._meta.db_table
+    params = [list(movie_ids)] if movie_ids is not None else []
+    movie_filter = 'AND {}movie_id = ANY(%s)' if movie_ids is not None else ''
+    
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Plain mean: with unnormalized embeddings, longer section vectors pull
+        # the centroid harder. Its own length does not matter to cosine ranking.
+        cursor.execute(
+            f"""
+            INSERT INTO "{centroid_table}" (movie_id, embedding, section_count, similar_stale, updated_at)
+            SELECT movie_id, avg(embedding), count(*), true, now()
+            FROM "{section_table}"
+            WHERE embedding IS NOT NULL {movie_filter.format('')}
+            GROUP BY movie_id
+            ON CONFLICT (movie_id) DO UPDATE
+            SET embedding = EXCLUDED.embedding,
+                section_count = EXCLUDED.section_count,
+                similar_stale = true,
+                updated_at = EXCLUDED.updated_at
+            """,
+            params
+        )
+        written = cursor.rowcount
+        
+        cursor.execute(
+            f"""
+            DELETE FROM "{centroid_table}" c
+            WHERE NOT EXISTS (
+                SELECT 1 FROM "{section_table}" s
+                WHERE s.movie_id = c.movie_id AND s.embedding IS NOT NULL
+            ) {movie_filter.format('c.')}
+            """,
+            params
+        )
+    
+    return written
 
 
 class RAGService:
-    def __init__(self):
-        self.model_name = "sentence-transformers/all-MiniLM-L6-v2"
-        self.embedding_dim = 384
+    def __init__(self, version=None):
+        """
+        version: an EmbeddingVersion to embed and search with (default: the
+        one this process serves, see services.embedding_versions)
+        """
+        self.version = version or serving_version()
+        self.model_name = self.version.model_name
+        self.embedding_dim = self.version.dim
+        # Unit-length vectors let retrieval use inner product instead of cosine
+        self.normalize = self.version.normalize
+        # Shadow versions are stored in SectionEmbedding rows under this id
+        self.embedding_version = self.version.id if self.version.shadow else None
+        self._private_model = None
+    
+    @property
+    def embedding_model_id(self):
+        """Identifies the vector space: model plus normalization mode"""
+        return f"{self.model_name}+normalized" if self.normalize else self.model_name
 
     def load_model(self):
-        global _model
+        global _model, _model_load_seconds
+        
+        # Re-embedding into a version this process does not serve must not replace its model
+        if self.version != serving_version():
+            if self._private_model is None:
+                logger.info(f"Loading embedding model: {self.model_name} (torch, not served)")
+                self._private_model = self._load_backend()
+            return self._private_model
         
         # Use global singleton model to avoid concurrent loading issues
         if _model is None:
             with _model_lock:
                 # Double-check after acquiring lock
                 if _model is None:
-                    logger.info(f"Loading embedding model: {self.model_name}")
+                    logger.info(f"Loading embedding model: {self.model_name} ({settings.RAG_EMBEDDING_BACKEND})")
+                    started = time.monotonic()
                     try:
-                        # Simple initialization without device specification
-                        _model = SentenceTransformer(self.model_name)
-                        _model.eval()
-                        logger.info("Model loaded successfully")
+                        _model = self._load_backend()
+                        _model_load_seconds = time.monotonic() - started
+                        logger.info(f"Model loaded successfully in {_model_load_seconds:.2f}s")
                     except Exception as e:
                         logger.error(f"Error loading model: {e}")
                         raise
         
         return _model
     
+    def _load_backend(self):
+        if self.version.shadow:
+            # The ONNX export and the embedding server are built for RAG_EMBEDDING_MODEL
+            return load_backend('torch', self.model_name, threads=settings.RAG_EMBEDDING_THREADS)
+        
+        return load_backend(
+            settings.RAG_EMBEDDING_BACKEND,
+            self.model_name,
+            onnx_model_dir=settings.RAG_ONNX_MODEL_DIR,
+            onnx_quantized=settings.RAG_ONNX_QUANTIZED,
+            threads=settings.RAG_EMBEDDING_THREADS,
+            server_url=settings.RAG_EMBEDDING_SERVER,
+            server_timeout=settings.RAG_EMBEDDING_SERVER_TIMEOUT
+        )
+    
+    def warm_up(self):
+        """
+        One throwaway encode so lazy kernel and thread-pool setup is not paid by the first query; returns seconds
+        """
+        started = time.monotonic()
+        self.generate_embedding("warm up")
+        return time.monotonic() - started
+    
     def generate_embedding(self, text):
         try:
             model = self.load_model()
@@ -43,13 +425,256 @@ class RAGService:
                 text,
                 convert_to_numpy=True,
                 show_progress_bar=False,
-                normalize_embeddings=False
+                normalize_embeddings=self.normalize
             )
             return embedding.astype('float32')
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
     
+    def generate_embeddings(self, texts, batch_size=None):
+        """
+        Encode many texts in batches; returns a float32 matrix with one row per text, in input order
+        """
+        texts = list(texts)
+        batch_size = batch_size or settings.RAG_EMBEDDING_BATCH_SIZE
+        embeddings = np.zeros((len(texts), self.embedding_dim), dtype='float32')
+        
+        if not texts:
+            return embeddings
+        
+        try:
+            model = self.load_model()
+            
+            # Similar lengths in a batch means less padding per forward pass
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            
+            for start in range(0, len(order), batch_size):
+                indices = order[start:start + batch_size]
+                embeddings[indices] = model.encode(
+                    [texts[i] for i in indices],
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                    normalize_embeddings=self.normalize
+                )
+            
+            return embeddings
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {e}")
+            raise
+    
+    def needs_embedding(self, queryset):
+        """
+        Sections of queryset whose embedding is missing, was computed from
+        different content, or by a different model; the comparison runs in
+        the database, so unchanged rows are never fetched
+        """
+        if self.embedding_version:
+            return stale_sections(self.version, queryset)
+        
+        return queryset.annotate(
+            current_hash=MD5('content')
+        ).exclude(
+            embedding__isnull=False,
+            embedding_model=self.embedding_model_id,
+            content_hash=F('current_hash')
+        )
+    
+    def embed_sections(self, sections, batch_size=None):
+        """
+        Batch-encode section contents and save each embedding, tagged with
+        the content hash and model it came from (see needs_embedding); for
+        a shadow version into its SectionEmbedding rows.
+        Yields (section, error) per section; error is None on success.
+        """
+        batch_size = batch_size or settings.RAG_EMBEDDING_BATCH_SIZE
+        batch = []
+        
+        for section in sections:
+            batch.append(section)
+            if len(batch) >= batch_size:
+                yield from self._embed_section_batch(batch, batch_size)
+                batch = []
+        
+        if batch:
+            yield from self._embed_section_batch(batch, batch_size)
+    
+    def _embed_section_batch(self, batch, batch_size):
+        try:
+            embeddings = self.generate_embeddings([s.content for s in batch], batch_size)
+        except Exception as e:
+            for section in batch:
+                yield section, e
+            return
+        
+        if self.embedding_version:
+            stored = list(self._store_versioned_embeddings(batch, embeddings))
+            yield from stored
+            if self.version == serving_version():
+                self._embed_current_version([section for section, error in stored if error is None], batch_size)
+            return
+        
+        for section, embedding in zip(batch, embeddings):
+            try:
+                section.embedding = embedding
+                section.content_hash = content_hash(section.content)
+                section.embedding_model = self.embedding_model_id
+                section.save(update_fields=['embedding', 'content_hash', 'embedding_model'])
+                yield section, None
+            except Exception as e:
+                yield section, e
+    
+    def _embed_current_version(self, sections, batch_size):
+        """
+        While a shadow version serves, sections written meanwhile still get a
+        current-version vector in MovieSection.embedding, so switching back
+        does not find them missing
+        """
+        from reports.models import MovieSection
+        
+        current = get_rag_service(current_version())
+        stale = set(
+            current.needs_embedding(
+                MovieSection.objects.filter(id__in=[section.id for section in sections])
+            ).values_list('id', flat=True)
+        )
+        
+        for section, error in current.embed_sections([s for s in sections if s.id in stale], batch_size):
+            if error is not None:
+                logger.error(f"Error embedding section {section.id} with {current.embedding_model_id}: {error}")
+    
+    def _store_versioned_embeddings(self, batch, embeddings):
+        from reports.models import SectionEmbedding
+        
+        try:
+            SectionEmbedding.objects.bulk_create(
+                [
+                    SectionEmbedding(
+                        section=section,
+                        model_version=self.embedding_version,
+                        embedding=embedding,
+                        content_hash=content_hash(section.content)
+                    )
+                    for section, embedding in zip(batch, embeddings)
+                ],
+                update_conflicts=True,
+                unique_fields=['section', 'model_version'],
+                update_fields=['embedding', 'content_hash', 'updated_at']
+            )
+        except Exception as e:
+            for section in batch:
+                yield section, e
+            return
+        
+        # Section signals do not fire for these rows
+        if self.version == serving_version():
+            invalidate_retrieval_caches({section.movie_id for section in batch})
+        
+        for section in batch:
+            yield section, None
+    
+    def sync_section_chunks(self, sections, batch_size=None):
+        """
+        Re-chunk sections and store one embedding per passage. Passages whose
+        text is unchanged keep their stored embedding if it came from this
+        model and normalization mode, so only new or edited passages are
+        encoded. Yields (section, error) per section.
+        """
+        batch_size = batch_size or settings.RAG_EMBEDDING_BATCH_SIZE
+        batch = []
+        
+        for section in sections:
+            batch.append(section)
+            if len(batch) >= batch_size:
+                yield from self._sync_chunk_batch(batch, batch_size)
+                batch = []
+        
+        if batch:
+            yield from self._sync_chunk_batch(batch, batch_size)
+    
+    def _sync_chunk_batch(self, batch, batch_size):
+        from reports.models import SectionChunk
+        from services.chunking import chunk_text
+        
+        existing = {}
+        for chunk in SectionChunk.objects.filter(section__in=batch).order_by('chunk_index'):
+            existing.setdefault(chunk.section_id, []).append(chunk)
+        
+        planned = {}
+        known = {}
+        for section in batch:
+            passages = chunk_text(section.content, settings.RAG_CHUNK_WORDS, settings.RAG_CHUNK_OVERLAP)
+            current = existing.get(section.id, [])
+            
+            # Vectors stored under another model or normalization mode are not reused
+            reusable = [c for c in current if c.embedding is not None and c.embedding_model == self.embedding_model_id]
+            if [c.content for c in current] == [p for _, p in passages] and len(reusable) == len(current):
+                continue
+            
+            planned[section.id] = passages
+            for chunk in reusable:
+                known[chunk.content] = chunk.embedding
+        
+        missing = list({p for passages in planned.values() for _, p in passages if p not in known})
+        
+        try:
+            embeddings = self.generate_embeddings(missing, batch_size)
+        except Exception as e:
+            for section in batch:
+                yield section, e
+            return
+        
+        known.update(zip(missing, embeddings))
+        
+        for section in batch:
+            if section.id not in planned:
+                yield section, None
+                continue
+            
+            try:
+                with transaction.atomic():
+                    SectionChunk.objects.filter(section=section).delete()
+                    SectionChunk.objects.bulk_create([
+                        SectionChunk(
+                            section=section,
+                            movie_id=section.movie_id,
+                            section_type=section.section_type,
+                            chunk_index=i,
+                            start_char=start_char,
+                            content=passage,
+                            embedding=known[passage],
+                            embedding_model=self.embedding_model_id
+                        )
+                        for i, (start_char, passage) in enumerate(planned[section.id])
+                    ])
+                yield section, None
+            except Exception as e:
+                yield section, e
+    
+    def embed_query(self, query):
+        """
+        Embedding for a user query, served from the LRU cache when possible
+        """
+        cache = get_query_cache()
+        if cache is None:
+            return self._encode_query(query)
+        
+        key = cache.make_key(self.embedding_model_id, query)
+        embedding = cache.get(key)
+        if embedding is None:
+            embedding = cache.set(key, self._encode_query(query))
+        
+        return embedding
+    
+    def _encode_query(self, query):
+        # Batched with other queries for the same version, so the same model
+        batcher = get_query_batcher(self.version)
+        if batcher is None:
+            return self.generate_embedding(query)
+        
+        return batcher.encode(query)
+    
     def _classify_query_type(self, query):
         query_lower = query.lower()
         
@@ -76,97 +701,622 @@ class RAGService:
         
         return 'general'
     
-    def search_with_priority(self, query, k=5, movie_id=None):
-        from reports.models import MovieSection
-        
-        query_embedding = self.generate_embedding(query)
+    def search_with_priority(self, query, k=5, movie_id=None, content_chars=None):
         query_type = self._classify_query_type(query)
         
-        queryset = MovieSection.objects.filter(
-            embedding__isnull=False
-        ).annotate(
-            distance=CosineDistance('embedding', query_embedding)
-        )
+        if movie_id is not None and not self._use_hybrid(query_type):
+            results = self._movie_matrix_search(query, query_type, k, movie_id, content_chars)
+            if results is not None:
+                logger.info(f"Query type: {query_type}, Retrieved {len(results)} sections (in memory)")
+                return results
         
-        if movie_id:
+        cache = get_retrieval_cache()
+        if cache is not None:
+            cache_key = cache.make_key(
+                self.embedding_model_id, query, movie_id, k, query_type,
+                config=(settings.RAG_RETRIEVAL_MODE, settings.RAG_QUANTIZATION, settings.RAG_TWO_STAGE_MOVIES)
+            )
+            hits = cache.get(cache_key)
+            if hits is not None:
+                results = self._cached_results(hits, movie_id, content_chars)
+                if results is not None:
+                    logger.info(f"Query type: {query_type}, Retrieved {len(results)} sections (cached)")
+                    return results
+                cache.mark_stale()
+        
+        query_embedding = self.embed_query(query)
+        
+        results = None
+        if self._use_hybrid(query_type):
+            results = self._hybrid_search(query, query_embedding, query_type, k, movie_id, content_chars)
+        
+        if results is None and settings.RAG_ANN_INDEX and not self.embedding_version:
+            candidates = self._ann_candidates(query_embedding, k*3, movie_id, content_chars)
+            if candidates is not None:
+                results = self._rerank(candidates, query_type, k)
+        
+        if results is None:
+            results = self._pgvector_search(query_embedding, query_type, k, movie_id, content_chars)
+        
+        logger.info(f"Query type: {query_type}, Retrieved {len(results)} sections")
+        
+        if cache is not None:
+            cache.set(cache_key, [(s.id, s.distance, s.weighted_score) for s in results])
+        
+        return results
+    
+    def _movie_matrix_search(self, query, query_type, k, movie_id, content_chars=None):
+        """
+        Movie-scoped search over the movie's in-memory embedding matrix: one
+        dot product and the weight rerank, no database round trip once the
+        movie is cached. None when the cache is disabled.
+        """
+        cache = get_movie_matrix_cache()
+        if cache is None:
+            return None
+        
+        # Requests send the id as a string, signals invalidate with an int
+        movie_id = int(movie_id)
+        
+        # Shared counters let writes in other processes reach this worker
+        retrieval_cache = get_retrieval_cache()
+        version = retrieval_cache.versions(movie_id) if retrieval_cache is not None else None
+        
+        entry = cache.get(movie_id, version)
+        if entry is None:
+            entry = cache.set(movie_id, self._load_movie_matrix(movie_id, version))
+        
+        if not len(entry.ids):
+            return []
+        
+        query_embedding = np.asarray(self.embed_query(query), dtype='float32')
+        if not self.normalize:
+            query_embedding = query_embedding / max(np.linalg.norm(query_embedding), 1e-12)
+        
+        # Same candidate set as the SQL path: nearest k*3, then reranked
+        distances = 1.0 - entry.matrix @ query_embedding
+        candidates = np.argsort(distances, kind='stable')[:k*3]
+        
+        weights = SECTION_WEIGHTS.get(query_type, SECTION_WEIGHTS['general'])
+        scored = [
+            (float((1.0 - distances[i]) * weights.get(entry.section_types[i], 1.0)), float(distances[i]), i)
+            for i in candidates
+        ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        
+        results = []
+        for weighted_score, distance, i in scored[:k]:
+            # Cached rows are shared between threads; annotate a copy
+            section = copy.copy(entry.sections[i])
+            section.distance, section.weighted_score = distance, weighted_score
+            if content_chars is not None:
+                section.content_excerpt = section.content[:content_chars.get(section.section_type, len(section.content))]
+            results.append(section)
+        
+        return results
+    
+    def _load_movie_matrix(self, movie_id, version=None):
+        if self.embedding_version:
+            queryset = self._section_queryset().filter(
+                movie_id=movie_id, versioned_embeddings__model_version=self.embedding_version
+            ).annotate(vector=F('versioned_embeddings__embedding'))
+        else:
+            queryset = self._section_queryset().filter(
+                movie_id=movie_id, embedding__isnull=False
+            ).annotate(vector=F('embedding'))
+        
+        sections = list(queryset.order_by('id'))
+        
+        embeddings = np.zeros((len(sections), self.embedding_dim), dtype='float32')
+        for i, section in enumerate(sections):
+            embeddings[i] = section.vector
+            del section.vector
+        
+        # Cosine mode compares unit rows; normalized mode stores them already
+        if not self.normalize:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        
+        return MovieMatrix(sections, embeddings, version)
+    
+    def _cached_results(self, hits, movie_id=None, content_chars=None):
+        """
+        Sections for cached (id, distance, weighted_score) hits, fetched by
+        primary key, or None if any of them is gone or has moved
+        """
+        queryset = self._section_queryset(content_chars)
+        if movie_id is not None:
             queryset = queryset.filter(movie_id=movie_id)
         
-        results = list(queryset.order_by('distance')[:k*3])
-        
-        section_weights = {
-            'plot': {
-                'plot_structure': 3.5,
-                'characters': 2.0,
-                'themes': 1.5,
-                'production': 1.0,
-                'cast_crew': 0.8,
-                'visual_technical': 0.5,
-                'reception': 0.5,
-                'legacy': 0.5,
-            },
-            'technical': {
-                'visual_technical': 3.5,
-                'production': 2.0,
-                'cast_crew': 1.5,
-                'themes': 1.0,
-                'plot_structure': 0.8,
-                'characters': 0.5,
-                'reception': 0.5,
-                'legacy': 0.5,
-            },
-            'analysis': {
-                'themes': 3.5,
-                'characters': 2.5,
-                'visual_technical': 2.0,
-                'plot_structure': 1.5,
-                'cast_crew': 1.0,
-                'production': 0.8,
-                'reception': 0.8,
-                'legacy': 1.0,
-            },
-            'facts': {
-                'production': 3.5,
-                'cast_crew': 2.5,
-                'reception': 2.0,
-                'legacy': 1.5,
-                'plot_structure': 1.0,
-                'characters': 0.8,
-                'visual_technical': 0.8,
-                'themes': 0.5,
-            },
-            'general': {
-                'plot_structure': 2.2,
-                'themes': 1.8,
-                'characters': 1.6,
-                'visual_technical': 1.4,
-                'production': 1.2,
-                'cast_crew': 1.2,
-                'reception': 1.0,
-                'legacy': 1.0,
-            }
-        }
+        sections = queryset.in_bulk([section_id for section_id, _, _ in hits])
+        if len(sections) != len(hits):
+            return None
         
-        weights = section_weights.get(query_type, section_weights['general'])
+        results = []
+        for section_id, distance, weighted_score in hits:
+            section = sections[section_id]
+            section.distance, section.weighted_score = distance, weighted_score
+            results.append(section)
+        
+        return results
+    
+    def _rerank(self, results, query_type, k):
+        weights = SECTION_WEIGHTS.get(query_type, SECTION_WEIGHTS['general'])
         
         for section in results:
             weight = weights.get(section.section_type, 1.0)
             section.weighted_score = (1.0 - section.distance) * weight
         
-        reranked = sorted(results, key=lambda x: x.weighted_score, reverse=True)[:k]
+        return sorted(results, key=lambda x: x.weighted_score, reverse=True)[:k]
+    
+    def _distance_expression(self, query_embedding):
+        if self.normalize:
+            return ExpressionWrapper(
+                MaxInnerProduct('embedding', query_embedding) + Value(1.0),
+                output_field=FloatField()
+            )
+        return CosineDistance('embedding', query_embedding)
+    
+    def _weight_expression(self, query_type):
+        weights = SECTION_WEIGHTS.get(query_type, SECTION_WEIGHTS['general'])
+        return Case(
+            *[When(section_type=section_type, then=Value(weight)) for section_type, weight in weights.items()],
+            default=Value(1.0),
+            output_field=FloatField()
+        )
+    
+    def _section_queryset(self, content_chars=None):
+        """
+        Sections as returned to callers: movie joined in, no embedding, and
+        with content_chars ({section_type: chars}) only the content prefix
+        each type needs, as content_excerpt
+        """
+        from reports.models import MovieSection
+        
+        queryset = MovieSection.objects.select_related('movie').defer('embedding', 'search_vector')
         
-        logger.info(f"Query type: {query_type}, Retrieved {len(reranked)} sections")
+        if content_chars is None:
+            return queryset
         
-        return reranked
+        return queryset.defer('content').annotate(
+            content_excerpt=Left('content', Case(
+                *[When(section_type=section_type, then=Value(chars)) for section_type, chars in content_chars.items()],
+                default=Length('content')
+            ))
+        )
+    
+    def _pgvector_queryset(self, query_embedding, limit, movie_id=None, model=None):
+        """
+        Nearest `limit` sections (or chunks, via model) by raw vector distance (the index-backed scan)
+        """
+        from reports.models import MovieSection
+        
+        model = model or MovieSection
+        
+        if movie_id is None and model is MovieSection and self._use_two_stage():
+            return self._two_stage_queryset(query_embedding, limit)
+        
+        queryset = model.objects.filter(embedding__isnull=False)
+        
+        if settings.RAG_QUANTIZATION and model is MovieSection:
+            # Shortlist from the compact-code index, exact distance decides the top `limit`
+            shortlist = queryset
+            if movie_id:
+                shortlist = shortlist.filter(movie_id=movie_id)
+            shortlist = shortlist.order_by(
+                self._quantized_distance(query_embedding)
+            )[:self._shortlist_size(limit)].values('id')
+            queryset = model.objects.filter(id__in=shortlist)
+        
+        if self.normalize:
+            # <#> is the negative inner product, i.e. -cosine for unit vectors
+            queryset = queryset.annotate(
+                inner_product=MaxInnerProduct('embedding', query_embedding)
+            )
+            order_by = 'inner_product'
+        else:
+            queryset = queryset.annotate(
+                distance=CosineDistance('embedding', query_embedding)
+            )
+            order_by = 'distance'
+        
+        if movie_id:
+            queryset = queryset.filter(movie_id=movie_id)
+        
+        return queryset.order_by(order_by)[:limit]
+    
+    def _use_two_stage(self):
+        # Centroids are averaged from MovieSection.embedding, not from a shadow version
+        return bool(settings.RAG_TWO_STAGE_MOVIES) and not self.embedding_version and connection.vendor == 'postgresql'
+    
+    def _two_stage_queryset(self, query_embedding, limit):
+        """
+        Global search in two stages within one statement: the
+        RAG_TWO_STAGE_MOVIES movies whose centroid is nearest the query, then
+        an exact ranking of only their sections
+        """
+        from reports.models import MovieEmbedding, MovieSection
+        
+        movies = MovieEmbedding.objects.order_by(
+            CosineDistance('embedding', query_embedding)
+        ).values('movie_id')[:settings.RAG_TWO_STAGE_MOVIES]
+        
+        # The + 0 keeps the planner off the section HNSW index, which would
+        # apply the movie filter after its ef_search-bounded scan and lose rows
+        return MovieSection.objects.filter(
+            embedding__isnull=False, movie_id__in=movies
+        ).annotate(
+            distance=ExpressionWrapper(self._distance_expression(query_embedding) + Value(0.0), output_field=FloatField())
+        ).order_by('distance')[:limit]
+    
+    def _quantized_distance(self, query_embedding):
+        """
+        Distance on the codes of migration 0010's expression indexes; the
+        casts must match the index expressions for the planner to use them
+        """
+        if settings.RAG_QUANTIZATION == 'binary':
+            bits = ''.join('1' if x > 0 else '0' for x in query_embedding)
+            return HammingDistance(
+                Cast(Func('embedding', function='binary_quantize'), BitField(length=self.embedding_dim)),
+                Cast(Value(bits), BitField(length=self.embedding_dim))
+            )
+        
+        return CosineDistance(
+            Cast('embedding', HalfVectorField(dimensions=self.embedding_dim)),
+            Cast(Value(HalfVector(query_embedding).to_text()), HalfVectorField(dimensions=self.embedding_dim))
+        )
+    
+    def _shortlist_size(self, limit):
+        return limit * settings.RAG_QUANTIZATION_OVERSAMPLE
+    
+    def _pgvector_reranked_queryset(self, query_embedding, query_type, k, movie_id=None, content_chars=None):
+        """
+        Top k*3 by distance, reranked by section-type weight in SQL; only k rows leave Postgres
+        """
+        candidates = self._pgvector_queryset(query_embedding, k*3, movie_id).values('id')
+        
+        return self._reranked(self._section_queryset(content_chars), candidates, query_embedding, query_type, k)
+    
+    def _pgvector_chunk_queryset(self, query_embedding, query_type, limit, movie_id=None):
+        """
+        Same as _pgvector_reranked_queryset over SectionChunk; each chunk comes with its section and movie
+        """
+        from reports.models import SectionChunk
+        
+        candidates = self._pgvector_queryset(query_embedding, limit*3, movie_id, model=SectionChunk).values('id')
+        queryset = SectionChunk.objects.select_related('section__movie').defer(
+            'embedding', 'section__content', 'section__embedding'
+        )
+        
+        return self._reranked(queryset, candidates, query_embedding, query_type, limit)
+    
+    def _reranked(self, queryset, candidates, query_embedding, query_type, limit):
+        return queryset.filter(
+            id__in=candidates
+        ).annotate(
+            distance=self._distance_expression(query_embedding)
+        ).annotate(
+            weighted_score=ExpressionWrapper(
+                (Value(1.0) - F('distance')) * self._weight_expression(query_type),
+                output_field=FloatField()
+            )
+        ).order_by('-weighted_score', 'distance')[:limit]
+    
+    def _pgvector_search(self, query_embedding, query_type, k, movie_id=None, content_chars=None):
+        if self.embedding_version:
+            return self._versioned_search(query_embedding, query_type, k, movie_id, content_chars)
+        
+        min_ef_search = None
+        if movie_id is None and self._use_two_stage():
+            # The centroid index scan has to return every shortlisted movie
+            min_ef_search = settings.RAG_TWO_STAGE_MOVIES
+        elif settings.RAG_QUANTIZATION:
+            min_ef_search = self._shortlist_size(k*3)
+        
+        return self._tuned_list(
+            self._pgvector_reranked_queryset(query_embedding, query_type, k, movie_id, content_chars),
+            min_ef_search
+        )
+    
+    def _versioned_search(self, query_embedding, query_type, k, movie_id=None, content_chars=None):
+        """
+        Nearest k*3 sections by the served shadow version's SectionEmbedding
+        rows, then the section-type rerank
+        """
+        from reports.models import SectionEmbedding
+        
+        rows = SectionEmbedding.objects.filter(model_version=self.embedding_version)
+        if movie_id:
+            rows = rows.filter(section__movie_id=movie_id)
+        
+        # Must match the expression of the version's partial HNSW index (reembed_sections)
+        vector = Cast('embedding', VectorField(dimensions=self.embedding_dim))
+        if self.normalize:
+            rows = rows.annotate(distance=MaxInnerProduct(vector, query_embedding))
+        else:
+            rows = rows.annotate(distance=CosineDistance(vector, query_embedding))
+        
+        nearest = self._tuned_list(rows.order_by('distance').values_list('section_id', 'distance')[:k*3])
+        sections = self._section_queryset(content_chars).in_bulk([section_id for section_id, _ in nearest])
+        
+        results = []
+        for section_id, distance in nearest:
+            section = sections.get(section_id)
+            if section is None:
+                continue
+            # <#> is -cosine for unit vectors; +1 gives the cosine distance
+            section.distance = distance + 1.0 if self.normalize else distance
+            results.append(section)
+        
+        return self._rerank(results, query_type, k)
+    
+    def _tuned_list(self, queryset, min_ef_search=None):
+        return self._with_search_tuning(lambda: list(queryset), min_ef_search)
+    
+    def _with_search_tuning(self, fetch, min_ef_search=None):
+        if not self._search_tuning(min_ef_search):
+            return fetch()
+        
+        # SET LOCAL only lasts until the end of the enclosing transaction
+        with transaction.atomic():
+            self.apply_search_tuning(min_ef_search)
+            return fetch()
+    
+    def _use_hybrid(self, query_type):
+        mode = settings.RAG_RETRIEVAL_MODE
+        if connection.vendor != 'postgresql':
+            return False
+        # The fused statement reads MovieSection.embedding, which a shadow version is not in
+        if self.embedding_version:
+            return False
+        # Names, titles and figures are what the facts keywords pick out
+        return mode == 'hybrid' or (mode == 'auto' and query_type == 'facts')
+    
+    @staticmethod
+    def _lexical_query(query):
+        """
+        OR of the query's words for to_tsquery; stop words are dropped by the
+        english config and ts_rank_cd rewards documents matching more of them
+        """
+        return ' | '.join(dict.fromkeys(_LEXEME.findall(query.lower())))
+    
+    def _hybrid_sql(self, query, query_embedding, query_type, k, movie_id=None, content_chars=None):
+        """
+        One statement: top k*3 by vector distance and top k*3 by full-text
+        rank, fused with reciprocal rank fusion, weighted by section type,
+        joined to the movie. Returns (sql, params, section_fields, movie_fields).
+        """
+        from movies.models import Movie
+        from reports.models import MovieSection
+        
+        section_table = MovieSection._meta.db_table
+        movie_table = Movie._meta.db_table
+        vector = MovieSection._meta.get_field('embedding').get_db_prep_value(query_embedding, connection)
+        limit = k*3
+        
+        if self.normalize:
+            distance_sql = '(embedding <#> %s::vector)'
+            distance_select = '(s.embedding <#> %s::vector) + 1'
+        else:
+            distance_sql = '(embedding <=> %s::vector)'
+            distance_select = '(s.embedding <=> %s::vector)'
+        
+        movie_filter = 'AND movie_id = %s' if movie_id else ''
+        movie_params = [movie_id] if movie_id else []
+        
+        deferred = {'embedding', 'search_vector'}
+        if content_chars is not None:
+            deferred.add('content')
+        section_fields = [f for f in MovieSection._meta.concrete_fields if f.name not in deferred]
+        movie_fields = list(Movie._meta.concrete_fields)
+        
+        columns = [f's."{f.column}"' for f in section_fields] + [f'm."{f.column}"' for f in movie_fields]
+        columns_params = []
+        
+        if content_chars is not None:
+            columns.append(
+                'left(s.content, CASE s.section_type '
+                + ' '.join(['WHEN %s THEN %s'] * len(content_chars))
+                + ' ELSE length(s.content) END)'
+            )
+            for section_type, chars in content_chars.items():
+                columns_params.extend([section_type, chars])
+        
+        weights = SECTION_WEIGHTS.get(query_type, SECTION_WEIGHTS['general'])
+        weight_sql = 'CASE s.section_type ' + ' '.join(['WHEN %s THEN %s'] * len(weights)) + ' ELSE 1.0 END'
+        weight_params = []
+        for section_type, weight in weights.items():
+            weight_params.extend([section_type, weight])
+        
+        sql = f"""
+            WITH vector_hits AS (
+                SELECT id, row_number() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT id, {distance_sql} AS distance
+                    FROM "{section_table}"
+                    WHERE embedding IS NOT NULL {movie_filter}
+                    ORDER BY distance
+                    LIMIT %s
+                ) nearest
+            ),
+            lexical_hits AS (
+                SELECT id, row_number() OVER (ORDER BY lexical_rank DESC) AS rank
+                FROM (
+                    SELECT id, ts_rank_cd(search_vector, q, 1) AS lexical_rank
+                    FROM "{section_table}", to_tsquery('english', %s) q
+                    WHERE search_vector @@ q {movie_filter}
+                    ORDER BY lexical_rank DESC
+                    LIMIT %s
+                ) matched
+            ),
+            fused AS (
+                SELECT COALESCE(v.id, l.id) AS id,
+                       COALESCE(1.0 / ({RRF_K} + v.rank), 0) + COALESCE(1.0 / ({RRF_K} + l.rank), 0) AS rrf
+                FROM vector_hits v
+                FULL OUTER JOIN lexical_hits l ON l.id = v.id
+            )
+            SELECT {', '.join(columns)},
+                   {distance_select} AS distance,
+                   (f.rrf * {weight_sql})::float8 AS weighted_score
+            FROM fused f
+            JOIN "{section_table}" s ON s.id = f.id
+            JOIN "{movie_table}" m ON m.id = s.movie_id
+            WHERE s.embedding IS NOT NULL
+            ORDER BY weighted_score DESC, distance
+            LIMIT %s
+        """
+        
+        params = (
+            [vector] + movie_params + [limit]
+            + [self._lexical_query(query)] + movie_params + [limit]
+            + columns_params + [vector] + weight_params + [k]
+        )
+        
+        return sql, params, section_fields, movie_fields
+    
+    def _hybrid_search(self, query, query_embedding, query_type, k, movie_id=None, content_chars=None):
+        from movies.models import Movie
+        from reports.models import MovieSection
+        
+        sql, params, section_fields, movie_fields = self._hybrid_sql(
+            query, query_embedding, query_type, k, movie_id, content_chars
+        )
+        
+        def fetch():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+        
+        rows = self._with_search_tuning(fetch)
+        
+        db = connection.alias
+        movie_field = MovieSection._meta.get_field('movie')
+        n_section, n_movie = len(section_fields), len(movie_fields)
+        
+        results = []
+        for row in rows:
+            section = self._from_row(MovieSection, db, section_fields, row[:n_section])
+            movie = self._from_row(Movie, db, movie_fields, row[n_section:n_section + n_movie])
+            movie_field.set_cached_value(section, movie)
+            
+            extra = row[n_section + n_movie:]
+            if content_chars is not None:
+                section.content_excerpt, extra = extra[0], extra[1:]
+            section.distance, section.weighted_score = extra
+            results.append(section)
+        
+        return results
+    
+    @staticmethod
+    def _from_row(model, db, fields, values):
+        # Raw cursors skip the ORM's converters (e.g. JSONField arrives as text)
+        values = [
+            field.from_db_value(value, None, connection) if hasattr(field, 'from_db_value') else value
+            for field, value in zip(fields, values)
+        ]
+        return model.from_db(db, [f.attname for f in fields], values)
+    
+    def _search_tuning(self, min_ef_search=None):
+        if connection.vendor != 'postgresql':
+            return {}
+        
+        tuning = {}
+        if settings.RAG_HNSW_EF_SEARCH:
+            tuning['hnsw.ef_search'] = settings.RAG_HNSW_EF_SEARCH
+        # A shortlist longer than ef_search would be silently cut short
+        if min_ef_search and tuning.get('hnsw.ef_search', HNSW_DEFAULT_EF_SEARCH) < min_ef_search:
+            tuning['hnsw.ef_search'] = min_ef_search
+        if settings.RAG_IVFFLAT_PROBES:
+            tuning['ivfflat.probes'] = settings.RAG_IVFFLAT_PROBES
+        return tuning
+    
+    def apply_search_tuning(self, min_ef_search=None):
+        """
+        Apply pgvector query-time settings to the current transaction in one round trip
+        """
+        tuning = self._search_tuning(min_ef_search)
+        if not tuning:
+            return
+        
+        params = []
+        for name, value in tuning.items():
+            params.extend([name, str(value)])
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT " + ", ".join(["set_config(%s, %s, true)"] * len(tuning)),
+                params
+            )
+    
+    def _ann_candidates(self, query_embedding, limit, movie_id=None, content_chars=None):
+        """
+        Nearest sections from the in-process HNSW index, or None to fall back to pgvector
+        """
+        from services.ann_index import get_section_index
+        
+        index = get_section_index()
+        hits = index.query(query_embedding, limit, movie_id=movie_id) if index else None
+        if hits is None:
+            return None
+        
+        sections = self._section_queryset(content_chars).in_bulk([section_id for section_id, _ in hits])
+        
+        results = []
+        for section_id, distance in hits:
+            section = sections.get(section_id)
+            # Row deleted by another process since the index was built
+            if section is None:
+                continue
+            section.distance = distance
+            results.append(section)
+        
+        return results
+    
+    def search_chunks_with_scores(self, query, k=5, movie_id=None):
+        """
+        Best matching passages, at most one per stretch of a section; same result shape as search_with_scores
+        """
+        query_embedding = self.embed_query(query)
+        query_type = self._classify_query_type(query)
+        
+        # Extra rows leave room to drop overlapping neighbours
+        chunks = self._tuned_list(
+            self._pgvector_chunk_queryset(query_embedding, query_type, k*2, movie_id)
+        )
+        
+        picked = []
+        for chunk in chunks:
+            if any(p.section_id == chunk.section_id and abs(p.chunk_index - chunk.chunk_index) <= 1 for p in picked):
+                continue
+            picked.append(chunk)
+            if len(picked) == k:
+                break
+        
+        logger.info(f"Query type: {query_type}, Retrieved {len(picked)} passages")
+        
+        return [
+            {
+                'section': chunk.section,
+                'section_id': chunk.section_id,
+                'chunk_id': chunk.id,
+                'content': chunk.content,
+                'similarity': 1.0 - chunk.distance,
+                'weighted_score': chunk.weighted_score,
+                'movie_title': chunk.section.movie.title,
+                'section_type': chunk.get_section_type_display()
+            }
+            for chunk in picked
+        ]
     
     def search(self, query, k=5, movie_id=None):
         return self.search_with_priority(query, k, movie_id)
     
-    def search_with_scores(self, query, k=5, movie_id=None):
-        results = self.search_with_priority(query, k, movie_id)
+    def search_with_scores(self, query, k=5, movie_id=None, content_chars=None):
+        results = self.search_with_priority(query, k, movie_id, content_chars)
         
         return [
             {
                 'section': section,
+                'content': section.content_excerpt if content_chars is not None else section.content,
                 'section_id': section.id,
                 'similarity': 1.0 - section.distance,
                 'weighted_score': section.weighted_score,
@@ -0,0 +1,124 @@
+from django.core.cache import caches
+import hashlib
+import json
+import threading
+import time
+
+
+class RetrievalCache:
+    """
+    Cache of retrieval results (section ids and scores only) in a Django
+    cache backend, keyed on the normalized query, movie scope, k and query type.
+
+    Invalidation never deletes entries: every key embeds version counters
+    (per movie, one for global searches, and an epoch for "everything"),
+    and a section write bumps the counters so old keys are never read again
+    and expire on their own. With a shared backend (Redis) a bump from one
+    process is seen by all workers; with the default local-memory cache only
+    by the process that made it.
+    """
+
+    PREFIX = 'rag:retrieval'
+
+    def __init__(self, alias='default', ttl=300):
+        self.alias = alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    @property
+    def cache(self):
+        # Django cache handles are per thread
+        return caches[self.alias]
+
+    def _version_keys(self, movie_id):
+        scope = f"movie:{movie_id}" if movie_id is not None else 'all'
+        return [f"{self.PREFIX}:v:epoch", f"{self.PREFIX}:v:{scope}"]
+
+    def make_key(self, model_name, query, movie_id, k, query_type, config=()):
+        """
+        Versioned key for one search; build it before searching so a write
+        that lands mid-search invalidates the result about to be stored
+        """
+        epoch, scope = self.versions(movie_id)
+
+        # MiniLM is uncased, so case and whitespace do not change the ranking
+        payload = json.dumps([model_name, ' '.join(query.lower().split()), movie_id, k, query_type, list(config)])
+        digest = hashlib.sha1(payload.encode()).hexdigest()
+        return f"{self.PREFIX}:{epoch}:{scope}:{digest}"
+
+    def versions(self, movie_id=None):
+        """
+        (epoch, scope) counters for a movie, or for global searches; they
+        change whenever cached results for that scope must be dropped
+        """
+        version_keys = self._version_keys(movie_id)
+        versions = self.cache.get_many(version_keys)
+
+        for version_key in version_keys:
+            if version_key not in versions:
+                # Unique start value, so a lost counter cannot revive old entries
+                self.cache.add(version_key, time.time_ns(), timeout=None)
+                versions[version_key] = self.cache.get(version_key)
+
+        return versions[version_keys[0]], versions[version_keys[1]]
+
+    def get(self, key):
+        hits = self.cache.get(key)
+        with self._lock:
+            if hits is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return hits
+
+    def set(self, key, hits):
+        """hits: [(section_id, distance, weighted_score), ...] in rank order"""
+        self.cache.set(key, hits, timeout=self.ttl)
+        with self._lock:
+            self.stores += 1
+
+    def mark_stale(self):
+        # A hit whose rows are gone; counted as a miss as well
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+            self.stale += 1
+
+    def invalidate(self, movie_ids=None):
+        """
+        Drop cached results for these movies and for global searches, or
+        for everything when movie_ids is None
+        """
+        if movie_ids is None:
+            keys = [f"{self.PREFIX}:v:epoch"]
+        else:
+            keys = [f"{self.PREFIX}:v:movie:{movie_id}" for movie_id in set(movie_ids)] + [f"{self.PREFIX}:v:all"]
+
+        for key in keys:
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                # Never read yet, so nothing cached under it
+                self.cache.add(key, time.time_ns(), timeout=None)
+
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.alias,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'stores': self.stores,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,145 @@
+"""
+"Similar movies" computed locally: cosine similarity of movie centroids
+(MovieEmbedding) blended with genre overlap (Jaccard), top neighbours
+stored in SimilarMovie so the API answers with one indexed query.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MovieVectors:
+    """Unit centroids and genre memberships of every movie with a centroid"""
+
+    def __init__(self):
+        from movies.models import Movie
+        from reports.models import MovieEmbedding
+
+        rows = list(MovieEmbedding.objects.order_by('movie_id').values_list('movie_id', 'embedding'))
+        self.movie_ids = np.array([movie_id for movie_id, _ in rows], dtype='int64')
+        self.positions = {movie_id: i for i, movie_id in enumerate(self.movie_ids.tolist())}
+
+        matrix = np.asarray([embedding for _, embedding in rows], dtype='float32').reshape(len(rows), -1)
+        self.matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        memberships = list(
+            Movie.genres.through.objects.filter(movie_id__in=self.movie_ids.tolist()).values_list('movie_id', 'genre_id')
+        )
+        columns = {genre_id: i for i, genre_id in enumerate(sorted({genre_id for _, genre_id in memberships}))}
+        self.genres = np.zeros((len(rows), len(columns)), dtype='float32')
+        for movie_id, genre_id in memberships:
+            self.genres[self.positions[movie_id], columns[genre_id]] = 1.0
+        self.genre_counts = self.genres.sum(axis=1)
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def scores(self, rows, genre_weight):
+        """(len(rows), n_movies) blended similarity; a movie never scores against itself"""
+        similarity = self.matrix[rows] @ self.matrix.T
+
+        shared = self.genres[rows] @ self.genres.T
+        union = self.genre_counts[rows, None] + self.genre_counts[None, :] - shared
+        overlap = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+        scores = (1.0 - genre_weight) * similarity + genre_weight * overlap
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+
+def compute_similar_movies(movie_ids=None, count=None, genre_weight=None, batch_size=512, vectors=None):
+    """
+    Recompute and store the neighbour lists of these movies (all movies
+    with a centroid when None), batch_size movies per matrix product.
+    Returns the number of movies whose lists were written.
+    """
+    from reports.models import SimilarMovie
+
+    count = count or settings.SIMILAR_MOVIES_COUNT
+    genre_weight = settings.SIMILAR_MOVIES_GENRE_WEIGHT if genre_weight is None else genre_weight
+    if vectors is None:
+        vectors = MovieVectors()
+
+    if movie_ids is None:
+        rows = np.arange(len(vectors))
+    else:
+        rows = np.array([vectors.positions[m] for m in movie_ids if m in vectors.positions], dtype='int64')
+
+    limit = min(count, len(vectors) - 1)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        scores = vectors.scores(batch, genre_weight)
+
+        entries = []
+        if limit > 0:
+            nearest = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+            for i, row in enumerate(batch):
+                order = nearest[i][np.argsort(-scores[i, nearest[i]], kind='stable')]
+                entries.extend(
+                    SimilarMovie(
+                        movie_id=int(vectors.movie_ids[row]),
+                        similar_id=int(vectors.movie_ids[column]),
+                        rank=rank,
+                        score=float(scores[i, column])
+                    )
+                    for rank, column in enumerate(order, 1)
+                )
+
+        with transaction.atomic():
+            SimilarMovie.objects.filter(movie_id__in=vectors.movie_ids[batch].tolist()).delete()
+            SimilarMovie.objects.bulk_create(entries)
+
+    return len(rows)
+
+
+def refresh_stale_similar_movies(count=None, genre_weight=None, batch_size=512):
+    """
+    Incremental refresh after centroid or genre changes (similar_stale):
+    recomputes the stale movies' lists, plus every list a stale movie now
+    belongs in or has left, so the table matches a full recompute.
+    Returns the number of movies whose lists were written.
+    """
+    from reports.models import MovieEmbedding, SimilarMovie
+
+    count = count or settings.SIMILAR_MOVIES_COUNT
+    genre_weight = settings.SIMILAR_MOVIES_GENRE_WEIGHT if genre_weight is None else genre_weight
+
+    stale = list(MovieEmbedding.objects.filter(similar_stale=True).values_list('movie_id', flat=True))
+
+    # Lists of movies whose centroid is gone, and entries pointing at them
+    SimilarMovie.objects.filter(movie__centroid__isnull=True).delete()
+    orphaned = set(
+        SimilarMovie.objects.filter(similar__centroid__isnull=True).values_list('movie_id', flat=True)
+    )
+    if not stale and not orphaned:
+        return 0
+
+    # Cleared before reading, so a change landing mid-run stays flagged for the next one
+    MovieEmbedding.objects.filter(movie_id__in=stale).update(similar_stale=False)
+
+    vectors = MovieVectors()
+    affected = set(stale) | orphaned
+    affected |= set(SimilarMovie.objects.filter(similar_id__in=stale).values_list('movie_id', flat=True))
+
+    # Lists a stale movie now outscores the weakest entry of (or that have room)
+    weakest = np.full(len(vectors), -np.inf, dtype='float32')
+    for movie_id, lowest, size in SimilarMovie.objects.values('movie_id').annotate(
+        lowest=Min('score'), size=Count('id')
+    ).values_list('movie_id', 'lowest', 'size'):
+        if movie_id in vectors.positions and size >= min(count, len(vectors) - 1):
+            weakest[vectors.positions[movie_id]] = lowest
+
+    stale_rows = np.array([vectors.positions[m] for m in stale if m in vectors.positions], dtype='int64')
+    for start in range(0, len(stale_rows), batch_size):
+        scores = vectors.scores(stale_rows[start:start + batch_size], genre_weight)
+        # Scores are symmetric: how a stale movie ranks for every other movie
+        entering = (scores > weakest[None, :]).any(axis=0)
+        affected |= set(vectors.movie_ids[entering].tolist())
+
+    written = compute_similar_movies(sorted(affected), count, genre_weight, batch_size, vectors)
+    logger.info(f"Similar movies refreshed: {len(stale)} stale, {written} lists rewritten")
+    return written